@@ -311,6 +311,16 @@ CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
 CELERY_TASK_SEND_SENT_EVENT = True
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-routes
+# Each stage of the feed update task graph has its own queue and workers, see Procfile
+CELERY_TASK_ROUTES = {
+    "news_aggregator.feed_service.tasks.update_all_feeds": {"queue": "feeds"},
+    "news_aggregator.feed_service.tasks.update_due_feeds": {"queue": "feeds"},
+    "news_aggregator.feed_service.tasks.fetch_feed": {"queue": "feeds"},
+    "news_aggregator.feed_service.tasks.log_feed_updates": {"queue": "feeds"},
+    "news_aggregator.feed_service.tasks.load_article": {"queue": "articles"},
+    "news_aggregator.feed_service.tasks.analyze": {"queue": "ai"},
+}
 # django-allauth
 # ------------------------------------------------------------------------------
 ACCOUNT_ALLOW_REGISTRATION = env.bool("DJANGO_ACCOUNT_ALLOW_REGISTRATION", True)
@@ -345,3 +355,110 @@ STATICFILES_FINDERS += ["compressor.finders.CompressorFinder"]
 CRON_CLASSES = [
     "news_aggregator.feed_service.cron.UpdateFeedsCronJob",
 ]
+
+# Feed fetching
+# ------------------------------------------------------------------------------
+# Maximum number of feed downloads in flight at once during an update run
+FEED_FETCH_MAX_CONCURRENCY = env.int("FEED_FETCH_MAX_CONCURRENCY", default=50)
+# Maximum number of concurrent downloads against a single host
+FEED_FETCH_PER_HOST_CONCURRENCY = env.int("FEED_FETCH_PER_HOST_CONCURRENCY", default=4)
+# Per-request timeout in seconds
+FEED_FETCH_TIMEOUT = env.float("FEED_FETCH_TIMEOUT", default=30.0)
+FEED_FETCH_USER_AGENT = env(
+    "FEED_FETCH_USER_AGENT",
+    default="Mozilla/5.0 (compatible; news-aggregator/0.1; +https://github.com/Tokyo-AI-TAI/ai-news-aggregator)",
+)
+# Learned selectors of a website feed are dropped for a new Parsera scrape
+# when they find fewer entries than this
+WEBSITE_SELECTOR_MIN_ENTRIES = env.int("WEBSITE_SELECTOR_MIN_ENTRIES", default=3)
+# RSS and Atom feeds are read newest first until this many entries in a row
+# are already known
+FEED_STREAM_STOP_AFTER_KNOWN = env.int("FEED_STREAM_STOP_AFTER_KNOWN", default=3)
+# Number of recent entry URL hashes a feed keeps to recognize known entries
+FEED_RECENT_ENTRY_HASHES = env.int("FEED_RECENT_ENTRY_HASHES", default=200)
+
+# Article loading
+# ------------------------------------------------------------------------------
+# Threads downloading article HTML in parallel
+ARTICLE_LOADER_DOWNLOAD_WORKERS = env.int("ARTICLE_LOADER_DOWNLOAD_WORKERS", default=16)
+# Processes extracting article text from HTML, 0 extracts in the download threads
+ARTICLE_LOADER_PARSE_WORKERS = env.int("ARTICLE_LOADER_PARSE_WORKERS", default=2)
+# Maximum number of concurrent article downloads against a single host
+ARTICLE_DOWNLOAD_PER_HOST_CONCURRENCY = env.int(
+    "ARTICLE_DOWNLOAD_PER_HOST_CONCURRENCY", default=2
+)
+# Per-request timeout in seconds
+ARTICLE_DOWNLOAD_TIMEOUT = env.float("ARTICLE_DOWNLOAD_TIMEOUT", default=30.0)
+# Space requests to a host by the Crawl-delay of its robots.txt, up to the
+# maximum in seconds. robots.txt is read again after ARTICLE_DOWNLOAD_ROBOTS_TTL seconds.
+ARTICLE_DOWNLOAD_RESPECT_ROBOTS = env.bool(
+    "ARTICLE_DOWNLOAD_RESPECT_ROBOTS", default=True
+)
+ARTICLE_DOWNLOAD_MAX_CRAWL_DELAY = env.float(
+    "ARTICLE_DOWNLOAD_MAX_CRAWL_DELAY", default=10.0
+)
+ARTICLE_DOWNLOAD_ROBOTS_TTL = env.int(
+    "ARTICLE_DOWNLOAD_ROBOTS_TTL", default=24 * 60 * 60
+)
+
+# AI processing
+# ------------------------------------------------------------------------------
+# Number of distinct reader interest profiles scored by a single LLM request
+AI_READERS_PER_REQUEST = env.int("AI_READERS_PER_REQUEST", default=10)
+# Number of subscribers analyzed by a single analyze Celery task
+AI_USERS_PER_TASK = env.int("AI_USERS_PER_TASK", default=100)
+# Embedding model for entry-level embeddings, leave empty to skip computing them
+AI_ENTRY_EMBEDDING_MODEL = env("AI_ENTRY_EMBEDDING_MODEL", default="")
+# Persistent cache of LLM responses keyed by a hash of the request
+AI_RESPONSE_CACHE_ENABLED = env.bool("AI_RESPONSE_CACHE_ENABLED", default=True)
+AI_RESPONSE_CACHE_TTL = env.int("AI_RESPONSE_CACHE_TTL", default=7 * 24 * 60 * 60)
+AI_RESPONSE_CACHE_MAX_ENTRIES = env.int("AI_RESPONSE_CACHE_MAX_ENTRIES", default=50000)
+# Rate limits of the OpenAI account and the number of requests kept in flight
+AI_REQUESTS_PER_MINUTE = env.int("AI_REQUESTS_PER_MINUTE", default=500)
+AI_TOKENS_PER_MINUTE = env.int("AI_TOKENS_PER_MINUTE", default=200000)
+AI_MAX_CONCURRENT_REQUESTS = env.int("AI_MAX_CONCURRENT_REQUESTS", default=32)
+# Maximum number of article content tokens put into a prompt, content is
+# stripped of boilerplate and trimmed to whole paragraphs to fit
+AI_CONTENT_MAX_TOKENS = env.int("AI_CONTENT_MAX_TOKENS", default=4000)
+# Per-model overrides of AI_CONTENT_MAX_TOKENS, e.g. "gpt-4o=6000,gpt-4o-mini=8000"
+AI_CONTENT_MAX_TOKENS_PER_MODEL = env.dict(
+    "AI_CONTENT_MAX_TOKENS_PER_MODEL", cast={"value": int}, default={}
+)
+# AI results are written to the database in bulk, every this many rows or seconds
+AI_INTERACTION_FLUSH_ROWS = env.int("AI_INTERACTION_FLUSH_ROWS", default=1000)
+AI_INTERACTION_FLUSH_SECONDS = env.float("AI_INTERACTION_FLUSH_SECONDS", default=5.0)
+
+# Feed update pipeline
+# ------------------------------------------------------------------------------
+# Worker threads of each update_feeds stage: feed parsing, article extraction
+# and AI processing. Stages are connected by queues of FEED_PIPELINE_QUEUE_SIZE
+# items, a full queue slows down the stages before it.
+FEED_PIPELINE_UPDATE_WORKERS = env.int("FEED_PIPELINE_UPDATE_WORKERS", default=4)
+FEED_PIPELINE_EXTRACT_WORKERS = env.int("FEED_PIPELINE_EXTRACT_WORKERS", default=4)
+FEED_PIPELINE_AI_WORKERS = env.int("FEED_PIPELINE_AI_WORKERS", default=2)
+FEED_PIPELINE_QUEUE_SIZE = env.int("FEED_PIPELINE_QUEUE_SIZE", default=100)
+# Entries handed to a single extraction and AI call
+FEED_PIPELINE_EXTRACT_BATCH_SIZE = env.int(
+    "FEED_PIPELINE_EXTRACT_BATCH_SIZE", default=16
+)
+FEED_PIPELINE_AI_BATCH_SIZE = env.int("FEED_PIPELINE_AI_BATCH_SIZE", default=20)
+
+# Feed polling
+# ------------------------------------------------------------------------------
+# Every feed is polled about once per FEED_POLL_TARGET_ENTRIES expected new
+# entries, based on a moving average of its publish rate, and within the
+# minimum and maximum intervals (in minutes). New feeds start at the default.
+FEED_POLL_MIN_INTERVAL = env.int("FEED_POLL_MIN_INTERVAL", default=15)
+FEED_POLL_MAX_INTERVAL = env.int("FEED_POLL_MAX_INTERVAL", default=24 * 60)
+FEED_POLL_DEFAULT_INTERVAL = env.int("FEED_POLL_DEFAULT_INTERVAL", default=60)
+FEED_POLL_TARGET_ENTRIES = env.float("FEED_POLL_TARGET_ENTRIES", default=1.0)
+# Weight of the latest fetch in the publish rate moving average
+FEED_POLL_RATE_SMOOTHING = env.float("FEED_POLL_RATE_SMOOTHING", default=0.3)
+# Minutes a dispatched feed isn't dispatched again while it's being fetched
+FEED_POLL_LEASE = env.int("FEED_POLL_LEASE", default=30)
+
+# Home timeline
+# ------------------------------------------------------------------------------
+# Hours after which an entry's relevance counts half as much in the top stories
+# ranking. Run rebuild_timelines --clear after changing it.
+HOME_TOP_STORIES_HALF_LIFE = env.float("HOME_TOP_STORIES_HALF_LIFE", default=12.0)
@@ -39,9 +39,8 @@ CACHES = {
     },
 }
 
-# Disable Celery and run tasks synchronously
-CELERY_TASK_ALWAYS_EAGER = True
-CELERY_TASK_EAGER_PROPAGATES = True
+# Tasks run on the Celery workers of the Procfile
+CELERY_TASK_ALWAYS_EAGER = False
 
 # SECURITY
 # ------------------------------------------------------------------------------
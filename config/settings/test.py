@@ -34,5 +34,10 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore[index]
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "http://media.testserver"
+
+# CELERY
+# ------------------------------------------------------------------------------
+# Keep eager chords and task results in memory instead of Redis
+CELERY_RESULT_BACKEND = "cache+memory://"
 # Your stuff...
 # ------------------------------------------------------------------------------
@@ -13,6 +13,11 @@ uv run python manage.py compress
 # Run check
 uv run python manage.py check --deploy
 
+# Start Celery workers, one per feed update stage (see CELERY_TASK_ROUTES)
+uv run celery -A config.celery_app worker --detach -Q celery,feeds -n feeds@%h --loglevel=info --logfile=/proc/1/fd/1
+uv run celery -A config.celery_app worker --detach -Q articles -n articles@%h --concurrency=16 --loglevel=info --logfile=/proc/1/fd/1
+uv run celery -A config.celery_app worker --detach -Q ai -n ai@%h --concurrency=4 --loglevel=info --logfile=/proc/1/fd/1
+
 # Start cron
 service cron start
 
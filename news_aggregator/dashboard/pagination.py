@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination for news streams.
+
+Rows are ordered by (field, id) descending, the field being published_at for
+the news stream, and every page starts right after the last row of the
+previous one, so a page costs the same however deep it is: no COUNT(*) and
+no OFFSET.
+"""
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+from django.db.models import QuerySet
+
+
+@dataclass
+class KeysetPage:
+    """A page of entries and the cursor of the page after it"""
+
+    entries: list[models.Model]
+    next_cursor: str = ""
+
+    @property
+    def has_next(self) -> bool:
+        return bool(self.next_cursor)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def encode_cursor(row: models.Model, field: str = "published_at") -> str:
+    value = getattr(row, field)
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    key = f"{value}|{row.pk}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: models.Field) -> tuple[Any, int]:
+    """
+    The value of field and the primary key a cursor points at.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value, pk = key.rsplit("|", 1)
+        return field.to_python(value), int(pk)
+    except (ValueError, UnicodeDecodeError, ValidationError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(
+    queryset: QuerySet,
+    cursor: str = "",
+    per_page: int = 20,
+    field: str = "published_at",
+) -> KeysetPage:
+    """
+    The page of queryset that follows cursor, or the first page if cursor is
+    empty, ordered by field and then the primary key, both descending.
+    The queryset's own ordering is replaced.
+    """
+    queryset = queryset.order_by(f"-{field}", "-pk")
+    if cursor:
+        value, pk = decode_cursor(cursor, queryset.model._meta.get_field(field))
+        # The first condition alone bounds the index range scan
+        queryset = queryset.filter(**{f"{field}__lte": value}).filter(
+            Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+        )
+
+    # One extra row tells whether there's a next page
+    entries = list(queryset[: per_page + 1])
+    if len(entries) <= per_page:
+        return KeysetPage(entries)
+    entries = entries[:per_page]
+    return KeysetPage(entries, next_cursor=encode_cursor(entries[-1], field))
@@ -0,0 +1,174 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from news_aggregator.dashboard.pagination import decode_cursor
+from news_aggregator.dashboard.pagination import keyset_page
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.models import UserTimelineEntry
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.feed_service.tests.factories import UserFeedSubscriptionFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def subscription():
+    subscription = UserFeedSubscriptionFactory()
+    now = timezone.now()
+    timeline.fan_out(
+        FeedEntryFactory(
+            feed=subscription.feed,
+            title=f"Story {n}",
+            published_at=now - timedelta(hours=n),
+        )
+        for n in range(25)
+    )
+    return subscription
+
+
+def titles(response) -> list[str]:
+    return [entry.title for entry in response.context["page"]]
+
+
+def test_home_shows_the_first_page(client, subscription):
+    client.force_login(subscription.user)
+
+    response = client.get(reverse("home"))
+
+    assert titles(response) == [f"Story {n}" for n in range(20)]
+    assert response.context["page"].has_next
+    assert "?after=" in response.content.decode()
+
+
+def test_home_continues_after_the_cursor(client, subscription):
+    client.force_login(subscription.user)
+    cursor = client.get(reverse("home")).context["page"].next_cursor
+
+    response = client.get(reverse("home"), {"after": cursor})
+
+    assert titles(response) == [f"Story {n}" for n in range(20, 25)]
+    assert not response.context["page"].has_next
+    assert "?after=" not in response.content.decode()
+
+
+def test_home_ignores_an_invalid_cursor(client, subscription):
+    client.force_login(subscription.user)
+
+    response = client.get(reverse("home"), {"after": "not a cursor"})
+
+    assert titles(response)[0] == "Story 0"
+
+
+def test_load_more_renders_only_the_entries(client, subscription):
+    client.force_login(subscription.user)
+    cursor = client.get(reverse("home")).context["page"].next_cursor
+
+    response = client.get(
+        reverse("home"),
+        {"after": cursor},
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+
+    assert [template.name for template in response.templates] == [
+        "pages/home_entries.html"
+    ]
+    assert "Story 20" in response.content.decode()
+
+
+def test_home_does_not_count_entries(client, subscription):
+    client.force_login(subscription.user)
+
+    with CaptureQueriesContext(connection) as queries:
+        client.get(reverse("home"))
+
+    assert not [query for query in queries if "COUNT(" in query["sql"]]
+    assert not [query for query in queries if "OFFSET" in query["sql"]]
+
+
+def test_keyset_page_breaks_ties_on_id():
+    published_at = timezone.now()
+    entries = FeedEntryFactory.create_batch(5, published_at=published_at)
+    expected = sorted(entry.pk for entry in entries)[::-1]
+
+    first = keyset_page(FeedEntry.objects.all(), per_page=2)
+    second = keyset_page(FeedEntry.objects.all(), first.next_cursor, per_page=2)
+    third = keyset_page(FeedEntry.objects.all(), second.next_cursor, per_page=2)
+
+    pages = [[entry.pk for entry in page] for page in (first, second, third)]
+    assert pages == [expected[:2], expected[2:4], expected[4:]]
+    assert not third.has_next
+    field = FeedEntry._meta.get_field("published_at")
+    assert decode_cursor(first.next_cursor, field) == (published_at, expected[1])
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("bm90IGEgY3Vyc29y", FeedEntry._meta.get_field("published_at"))
+
+
+def test_top_mode_ranks_by_decayed_relevance(client, subscription):
+    client.force_login(subscription.user)
+    entries = {row.title: row.entry for row in UserTimelineEntry.objects.all()}
+    # Two half-lives old, a very relevant story still beats a fresher, less
+    # relevant one, and both beat the unanalyzed ones
+    for title, score in [("Story 24", 90), ("Story 3", 10)]:
+        UserArticleInteraction.objects.create(
+            user=subscription.user, entry=entries[title], relevance_score=score
+        )
+    timeline.update_interactions(list(UserArticleInteraction.objects.all()))
+
+    response = client.get(reverse("home"), {"mode": "top"})
+
+    assert titles(response)[:3] == ["Story 24", "Story 3", "Story 0"]
+    assert response.context["page"].has_next
+    assert "mode=top&amp;after=" in response.content.decode()
+
+    cursor = response.context["page"].next_cursor
+    response = client.get(reverse("home"), {"mode": "top", "after": cursor})
+    assert len(titles(response)) == 5
+    assert "Story 24" not in titles(response)
+
+
+def test_feed_list_shows_latest_entries_per_feed(client, subscription):
+    other = UserFeedSubscriptionFactory(user=subscription.user)
+    FeedEntryFactory.create_batch(2, feed=other.feed)
+    client.force_login(subscription.user)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("dashboard:feed_list"))
+
+    # The latest entries of all feeds are read by a single windowed query
+    [entries_query] = [
+        query for query in queries if "feed_service_feedentry" in query["sql"]
+    ]
+    assert "ROW_NUMBER() OVER" in entries_query["sql"]
+
+    feeds = {feed.pk: feed for feed in response.context["subscribed_feeds"]}
+    latest = [entry.title for entry in feeds[subscription.feed_id].latest_entries]
+    assert latest == ["Story 0", "Story 1", "Story 2"]
+    assert len(feeds[other.feed_id].latest_entries) == 2
+    # Entry bodies aren't loaded
+    assert (
+        "full_content" in feeds[other.feed_id].latest_entries[0].get_deferred_fields()
+    )
+
+
+def test_feed_detail_is_paginated(client, subscription):
+    client.force_login(subscription.user)
+    url = reverse("dashboard:feed_detail", args=[subscription.feed_id])
+
+    response = client.get(url)
+    assert titles(response) == [f"Story {n}" for n in range(20)]
+    assert "Older entries" in response.content.decode()
+
+    response = client.get(url, {"after": response.context["page"].next_cursor})
+    assert titles(response) == [f"Story {n}" for n in range(20, 25)]
+    assert "Older entries" not in response.content.decode()
+    assert "Newest" in response.content.decode()
@@ -3,30 +3,49 @@ from django.http import HttpResponseNotAllowed
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.shortcuts import render
-from django.core.paginator import Paginator
 from django.db import models
+from django.db.models.functions import Left
 
+from news_aggregator.dashboard.pagination import keyset_page
+from news_aggregator.feed_service import timeline
 from news_aggregator.feed_service.models import Feed
 from news_aggregator.feed_service.models import FeedEntry
 from news_aggregator.feed_service.models import UserFeedSubscription
-from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.models import UserTimelineEntry
+
+
+# Entries shown on each feed card of feed_list
+FEED_LIST_ENTRIES = 3
+# Characters of an entry's content read for its excerpt on feed_detail
+EXCERPT_LENGTH = 1000
 
 
 @login_required
 def feed_list(request):
     """Display list of all feeds that the user has subscribed to."""
+    # Only the latest entries of each feed, with the columns the cards show.
+    # A sliced prefetch is a single query numbering the entries of each feed
+    # with a window function.
+    latest_entries = models.Prefetch(
+        "entries",
+        queryset=FeedEntry.objects.only(
+            "feed_id", "title", "url", "author", "published_at"
+        ).order_by("-published_at", "-id")[:FEED_LIST_ENTRIES],
+        to_attr="latest_entries",
+    )
+
     # Get feeds with active subscriptions
     subscribed_feeds = (
         Feed.objects.filter(subscribers__user=request.user, subscribers__is_active=True)
-        .prefetch_related("entries")
-        .distinct()
+        .only("title", "description", "last_updated")
+        .prefetch_related(latest_entries)
     )
 
     # Get feeds that either have no subscription or only inactive subscriptions
     available_feeds = (
         Feed.objects.filter(is_active=True)
         .exclude(id__in=subscribed_feeds.values("id"))
-        .distinct()
+        .only("title", "description")
     )
 
     return render(
@@ -41,14 +60,30 @@ def feed_list(request):
 
 @login_required
 def feed_detail(request, feed_id):
-    """Display a single feed and all its entries if the user is subscribed."""
+    """Display a single feed and a page of its entries if the user is subscribed."""
     feed = get_object_or_404(
-        Feed.objects.prefetch_related("entries"),
+        Feed.objects.defer("recent_entry_hashes", "listing_selectors"),
         id=feed_id,
         subscribers__user=request.user,
         subscribers__is_active=True,
     )
-    return render(request, "dashboard/feed_detail.html", {"feed": feed})
+    # The start of the content is enough for the excerpt
+    entry_list = feed.entries.only(
+        "title", "translated_title", "url", "author", "published_at", "summary"
+    ).annotate(excerpt=Left("full_content", EXCERPT_LENGTH))
+
+    cursor = request.GET.get("after", "")
+    try:
+        page = keyset_page(entry_list, cursor, per_page=20)
+    except ValueError:
+        cursor = ""
+        page = keyset_page(entry_list, per_page=20)
+
+    return render(
+        request,
+        "dashboard/feed_detail.html",
+        {"feed": feed, "page": page, "is_first_page": not cursor},
+    )
 
 
 @login_required
@@ -66,6 +101,9 @@ def subscribe_feed(request, feed_id):
     if not created and not subscription.is_active:
         subscription.is_active = True
         subscription.save()
+        created = True
+    if created:
+        timeline.add_feed(request.user.pk, feed.pk)
 
     return redirect("dashboard:feed_list")
 
@@ -81,32 +119,41 @@ def unsubscribe_feed(request, feed_id):
     )
     subscription.is_active = False
     subscription.save()
+    timeline.remove_feed(request.user.pk, subscription.feed_id)
     return redirect("dashboard:feed_list")
 
 
 @login_required
 def home(request):
-    """Display a consolidated list of news entries from all subscribed feeds."""
-    # Get all entries from active subscriptions, ordered by publication date
+    """
+    Display a consolidated list of news entries from all subscribed feeds,
+    newest first or, with ?mode=top, by time-decayed relevance.
+    Pages are chained by cursor, and "load more" requests only get the entries.
+    """
+    # The user's timeline holds the entries of their active subscriptions
     entry_list = (
-        FeedEntry.objects.filter(
-            feed__subscribers__user=request.user,
-            feed__subscribers__is_active=True,
-        )
+        UserTimelineEntry.objects.filter(user=request.user)
         .select_related("feed")
-        .prefetch_related(
-            models.Prefetch(
-                "user_interactions",
-                queryset=UserArticleInteraction.objects.filter(user=request.user),
-                to_attr="user_specific_interactions",
-            )
+        .only(
+            "published_at",
+            "title",
+            "url",
+            "summary",
+            "relevance_score",
+            "rank_score",
+            "feed__title",
         )
-        .order_by("-published_at")
     )
-
-    # Add pagination with 20 items per page
-    paginator = Paginator(entry_list, 20)
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
-
-    return render(request, "pages/home.html", {"page_obj": page_obj})
+    mode = request.GET.get("mode", "")
+    field = "rank_score" if mode == "top" else "published_at"
+
+    try:
+        page = keyset_page(entry_list, request.GET.get("after", ""), 20, field)
+    except ValueError:
+        # A mangled cursor starts over from the first page
+        page = keyset_page(entry_list, per_page=20, field=field)
+
+    context = {"page": page, "mode": "top" if mode == "top" else ""}
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return render(request, "pages/home_entries.html", context)
+    return render(request, "pages/home.html", context)
@@ -2,8 +2,12 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 
+from . import timeline
+from .models import AIBatchJob
+from .models import CachedLLMResponse
 from .models import Feed
 from .models import FeedEntry
+from .models import LLMUsage
 from .models import UserFeedSubscription
 from .models import UserArticleInteraction
 
@@ -63,6 +67,7 @@ class FeedAdmin(admin.ModelAdmin):
         "url",
         "feed_type",
         "last_updated",
+        "next_fetch_at",
         "is_active",
         "subscriber_count",
         "entry_count",
@@ -88,12 +93,35 @@ class FeedAdmin(admin.ModelAdmin):
         (
             "Metadata",
             {
-                "fields": ("last_updated", "created_at"),
+                "fields": (
+                    "last_updated",
+                    "created_at",
+                    "etag",
+                    "modified",
+                    "page_fingerprint",
+                    "listing_selectors",
+                ),
+                "classes": ("collapse",),
+            },
+        ),
+        (
+            "Polling",
+            {
+                "fields": ("publish_rate", "last_fetched_at", "next_fetch_at"),
                 "classes": ("collapse",),
             },
         ),
     )
-    readonly_fields = ("last_updated", "created_at")
+    readonly_fields = (
+        "last_updated",
+        "created_at",
+        "etag",
+        "modified",
+        "page_fingerprint",
+        "listing_selectors",
+        "publish_rate",
+        "last_fetched_at",
+    )
 
     @admin.display(description="Active Subscribers")
     def subscriber_count(self, obj):
@@ -169,6 +197,12 @@ class FeedEntryAdmin(admin.ModelAdmin):
                 "classes": ("collapse",),
             },
         ),
+        (
+            "AI Generated Content",
+            {
+                "fields": ("translated_title", "summary"),
+            },
+        ),
         (
             "Processing Status",
             {
@@ -300,12 +334,98 @@ class UserFeedSubscriptionAdmin(admin.ModelAdmin):
         url = reverse("admin:feed_service_feed_change", args=[obj.feed.id])
         return format_html('<a href="{}">{}</a>', url, obj.feed.title)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if "is_active" in form.changed_data or not change:
+            self._sync_timeline(obj.user_id, obj.feed_id, obj.is_active)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        timeline.remove_feed(obj.user_id, obj.feed_id)
+
+    def delete_queryset(self, request, queryset):
+        pairs = list(queryset.values_list("user_id", "feed_id"))
+        super().delete_queryset(request, queryset)
+        for user_id, feed_id in pairs:
+            timeline.remove_feed(user_id, feed_id)
+
+    @staticmethod
+    def _sync_timeline(user_id, feed_id, is_active):
+        if is_active:
+            timeline.add_feed(user_id, feed_id)
+        else:
+            timeline.remove_feed(user_id, feed_id)
+
     @admin.action(description="Activate selected subscriptions")
     def activate_subscriptions(self, request, queryset):
+        pairs = list(queryset.filter(is_active=False).values_list("user_id", "feed_id"))
         updated = queryset.update(is_active=True)
+        for user_id, feed_id in pairs:
+            self._sync_timeline(user_id, feed_id, True)
         self.message_user(request, f"Activated {updated} subscriptions.")
 
     @admin.action(description="Deactivate selected subscriptions")
     def deactivate_subscriptions(self, request, queryset):
+        pairs = list(queryset.filter(is_active=True).values_list("user_id", "feed_id"))
         updated = queryset.update(is_active=False)
+        for user_id, feed_id in pairs:
+            self._sync_timeline(user_id, feed_id, False)
         self.message_user(request, f"Deactivated {updated} subscriptions.")
+
+
+@admin.register(CachedLLMResponse)
+class CachedLLMResponseAdmin(admin.ModelAdmin):
+    list_display = ("key", "model", "hits", "last_used_at", "expires_at")
+    list_filter = ("model",)
+    search_fields = ("key",)
+    readonly_fields = (
+        "key",
+        "model",
+        "response",
+        "hits",
+        "created_at",
+        "last_used_at",
+        "expires_at",
+    )
+    ordering = ("-last_used_at",)
+
+
+@admin.register(AIBatchJob)
+class AIBatchJobAdmin(admin.ModelAdmin):
+    list_display = ("batch_id", "status", "model", "request_count", "created_at")
+    list_filter = ("status", "model")
+    search_fields = ("batch_id",)
+    readonly_fields = (
+        "status",
+        "model",
+        "requests",
+        "input_file_id",
+        "batch_id",
+        "output_file_id",
+        "request_count",
+        "error",
+        "created_at",
+        "submitted_at",
+        "completed_at",
+    )
+    ordering = ("-created_at",)
+
+
+@admin.register(LLMUsage)
+class LLMUsageAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "model",
+        "purpose",
+        "entry",
+        "prompt_tokens",
+        "completion_tokens",
+        "content_tokens",
+        "content_truncated",
+        "batch",
+    )
+    list_filter = ("model", "purpose", "content_truncated", "batch")
+    list_select_related = ("entry",)
+    raw_id_fields = ("entry",)
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
@@ -0,0 +1,161 @@
+import logging
+import multiprocessing
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from newspaper.network import get_html_status
+from newspaper.parsers import get_unicode_html
+
+from news_aggregator.feed_service.downloads import PoliteSession
+from news_aggregator.feed_service.downloads import article_session
+from news_aggregator.feed_service.extraction import extract_article_text
+from news_aggregator.feed_service.models import FeedEntry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArticleLoadResult:
+    """Outcome of loading the full article for a single entry"""
+
+    entry: FeedEntry
+    success: bool
+    error: str = ""
+
+
+class ArticleLoader:
+    """
+    Load full article bodies for many entries at once.
+    HTML is downloaded by a thread pool over a shared PoliteSession, article extraction runs in a process
+    pool and all entries are written back with a single bulk_update.
+    Set parse_workers to 0 to extract articles in the download threads instead,
+    which avoids the process start-up cost for small batches.
+    The process pool is started on first use and reused by every load, close
+    the loader (or use it as a context manager) to stop it.
+    """
+
+    UPDATE_FIELDS = ["full_content", "article_loaded_at", "article_load_error"]
+
+    def __init__(
+        self,
+        download_workers: int | None = None,
+        parse_workers: int | None = None,
+        session: PoliteSession | None = None,
+    ):
+        self.download_workers = (
+            download_workers or settings.ARTICLE_LOADER_DOWNLOAD_WORKERS
+        )
+        self.parse_workers = (
+            settings.ARTICLE_LOADER_PARSE_WORKERS
+            if parse_workers is None
+            else parse_workers
+        )
+        self.session = session or article_session()
+        self._parser: Executor | None = None
+
+    def download_html(self, url: str) -> str:
+        """
+        Download the raw article HTML over the shared PoliteSession.
+        The body is decoded the way newspaper decodes its own downloads.
+        """
+        response = self.session.get(url)
+        if response.status_code != requests.codes.ok:
+            raise ValueError(f"Status code {response.status_code} on URL {url}")
+        html, _, _ = get_html_status(url, response=response)
+        # Only newspaper's own downloads are decoded for it, the body can be bytes
+        html = get_unicode_html(html)
+        if not html:
+            raise ValueError("Empty response")
+        return html
+
+    def _download_and_extract(self, url: str) -> str:
+        return extract_article_text(url, self.download_html(url))
+
+    def _parse_executor(self) -> Executor | None:
+        if not self.parse_workers:
+            return None
+        if self._parser is None:
+            # Spawn instead of fork: the download threads are already running
+            self._parser = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._parser
+
+    def close(self) -> None:
+        if self._parser is not None:
+            self._parser.shutdown()
+            self._parser = None
+
+    def __enter__(self) -> "ArticleLoader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @staticmethod
+    def _apply(entry: FeedEntry, future: Future) -> ArticleLoadResult:
+        try:
+            text = future.result()
+        except Exception as e:
+            text = ""
+            error = f"Failed to load article: {str(e)}"
+        else:
+            error = "" if text else "No article text could be extracted"
+
+        if error:
+            entry.article_load_error = error
+            return ArticleLoadResult(entry=entry, success=False, error=error)
+
+        entry.full_content = text
+        entry.article_loaded_at = timezone.now()
+        entry.article_load_error = ""  # Clear the error message on success
+        return ArticleLoadResult(entry=entry, success=True)
+
+    def load(self, entries: Iterable[FeedEntry]) -> list[ArticleLoadResult]:
+        """
+        Download and extract the article of every entry.
+        Entries are updated in place and saved in bulk.
+        Returns one ArticleLoadResult per entry.
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+
+        results = []
+        parse_executor = self._parse_executor()
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+            if parse_executor is None:
+                futures = {
+                    downloads.submit(self._download_and_extract, entry.url): entry
+                    for entry in entries
+                }
+            else:
+                downloaded = {
+                    downloads.submit(self.download_html, entry.url): entry
+                    for entry in entries
+                }
+                futures = {}
+                for future in as_completed(downloaded):
+                    entry = downloaded[future]
+                    if future.exception() is not None:
+                        results.append(self._apply(entry, future))
+                        continue
+                    parsed = parse_executor.submit(
+                        extract_article_text, entry.url, future.result()
+                    )
+                    futures[parsed] = entry
+
+            for future in as_completed(futures):
+                results.append(self._apply(futures[future], future))
+
+        FeedEntry.objects.bulk_update(entries, self.UPDATE_FIELDS, batch_size=100)
+        return results
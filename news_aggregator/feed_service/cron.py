@@ -1,13 +1,12 @@
 from django_cron import CronJobBase, Schedule
-from django.core.management import call_command
-from django.conf import settings
-from zoneinfo import ZoneInfo
+from news_aggregator.feed_service.tasks import update_due_feeds
 
 
 class UpdateFeedsCronJob(CronJobBase):
-    schedule = Schedule(run_at_times=["00:35", "07:00"])
+    # Every tick only queues the feeds that are due, see feed_service.scheduling
+    schedule = Schedule(run_every_mins=5)
     code = "feed_service.update_feeds_cron"  # a unique code
-    timezone = ZoneInfo("Asia/Tokyo")  # Set to JST
 
     def do(self):
-        call_command("update_feeds")
+        # The work runs on the Celery workers, see feed_service.tasks
+        update_due_feeds.delay()
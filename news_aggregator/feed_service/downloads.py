@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import field
+from functools import cache
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostState:
+    """Politeness bookkeeping of a single host"""
+
+    semaphore: threading.Semaphore
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    crawl_delay: float | None = None  # None until robots.txt has been read
+    robots_checked_at: float = 0.0
+    next_request_at: float = 0.0
+
+
+class PoliteSession:
+    """
+    Thread-safe HTTP client for article downloads.
+    All threads share one requests.Session whose connection pool keeps
+    connections alive, so consecutive articles of a publisher reuse the same
+    TLS connection. Requests against a host are limited to
+    per_host_concurrency at a time and spaced by the Crawl-delay of the
+    host's robots.txt, capped at max_crawl_delay seconds.
+    """
+
+    def __init__(
+        self,
+        per_host_concurrency: int | None = None,
+        pool_size: int | None = None,
+        timeout: float | None = None,
+        max_crawl_delay: float | None = None,
+        respect_robots: bool | None = None,
+    ):
+        self.per_host_concurrency = (
+            per_host_concurrency or settings.ARTICLE_DOWNLOAD_PER_HOST_CONCURRENCY
+        )
+        self.timeout = timeout or settings.ARTICLE_DOWNLOAD_TIMEOUT
+        self.max_crawl_delay = (
+            settings.ARTICLE_DOWNLOAD_MAX_CRAWL_DELAY
+            if max_crawl_delay is None
+            else max_crawl_delay
+        )
+        self.respect_robots = (
+            settings.ARTICLE_DOWNLOAD_RESPECT_ROBOTS
+            if respect_robots is None
+            else respect_robots
+        )
+        self.user_agent = settings.FEED_FETCH_USER_AGENT
+
+        pool_size = pool_size or settings.ARTICLE_LOADER_DOWNLOAD_WORKERS
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {"User-Agent": self.user_agent, "Accept-Encoding": "gzip, deflate"}
+        )
+
+        self._hosts: dict[str, HostState] = defaultdict(
+            lambda: HostState(threading.Semaphore(self.per_host_concurrency))
+        )
+        self._hosts_lock = threading.Lock()
+
+    def _host(self, origin: str) -> HostState:
+        with self._hosts_lock:
+            return self._hosts[origin]
+
+    def _read_crawl_delay(self, origin: str) -> float:
+        try:
+            response = self.session.get(f"{origin}/robots.txt", timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug(f"Couldn't read robots.txt of {origin}: {str(e)}")
+            return 0.0
+        if response.status_code != requests.codes.ok:
+            return 0.0
+
+        robots = RobotFileParser()
+        robots.parse(response.text.splitlines())
+        delay = robots.crawl_delay(self.user_agent)
+        return min(float(delay or 0), self.max_crawl_delay)
+
+    def crawl_delay(self, origin: str) -> float:
+        """Seconds to wait between requests to origin, read from robots.txt once a day."""
+        if not self.respect_robots:
+            return 0.0
+        host = self._host(origin)
+        with host.lock:
+            if (
+                host.crawl_delay is None
+                or time.monotonic() - host.robots_checked_at
+                > settings.ARTICLE_DOWNLOAD_ROBOTS_TTL
+            ):
+                host.crawl_delay = self._read_crawl_delay(origin)
+                host.robots_checked_at = time.monotonic()
+            return host.crawl_delay
+
+    def _wait_turn(self, origin: str) -> None:
+        """Sleep until the crawl delay since the previous request to origin has passed."""
+        delay = self.crawl_delay(origin)
+        host = self._host(origin)
+        with host.lock:
+            now = time.monotonic()
+            start = max(now, host.next_request_at)
+            host.next_request_at = start + delay
+        if start > now:
+            time.sleep(start - now)
+
+    def get(self, url: str) -> requests.Response:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        host = self._host(origin)
+        with host.semaphore:
+            self._wait_turn(origin)
+            return self.session.get(url, timeout=self.timeout)
+
+
+@cache
+def article_session() -> PoliteSession:
+    """One session per process, so connections and robots.txt outlive a single load."""
+    return PoliteSession()
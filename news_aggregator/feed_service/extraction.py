@@ -0,0 +1,231 @@
+"""
+Django-free HTML processing helpers.
+
+Functions in this module are executed in worker processes, so they must not
+import models or touch the database.
+"""
+
+import hashlib
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+
+import lxml.html
+from lxml.etree import ParserError
+from newspaper import Article
+
+# Page chrome left out of the listing fingerprint
+CHROME_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "iframe",
+    "svg",
+    "form",
+    "header",
+    "footer",
+    "nav",
+    "aside",
+]
+# Pages with fewer links are probably rendered by JavaScript, their static
+# HTML says nothing about the listing
+MIN_FINGERPRINT_LINKS = 3
+
+
+def extract_article_text(url: str, html: str) -> str:
+    """Extract the main article text from already downloaded HTML."""
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+
+def normalize_link(base_url: str, href: str) -> str:
+    """
+    Absolute form of a link that identifies its article: utm_* parameters and
+    the fragment are dropped and the host is lowercased. Every website entry
+    is stored with its normalized link, whether it was scraped or extracted.
+    """
+    scheme, netloc, path, query, _ = urlsplit(urljoin(base_url, href.strip()))
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(query) if not k.lower().startswith("utm_")]
+    )
+    return urlunsplit((scheme, netloc.lower(), path, query, ""))
+
+
+def listing_fingerprint(html: bytes | str, base_url: str) -> str:
+    """
+    Fingerprint of the news listing of a web page, to tell whether it changed.
+    Only the links (target and text) of the main content region are hashed,
+    so rotating ads, timestamps, scripts and navigation don't change it.
+    Returns an empty string when the page has too few links to judge.
+    """
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (ParserError, ValueError):
+        return ""
+
+    main = document.xpath("//main | //*[@role='main']")
+    region = main[0] if main else document
+    for element in region.xpath(
+        " | ".join(f"descendant-or-self::{tag}" for tag in CHROME_TAGS)
+    ):
+        if element is not region:
+            element.drop_tree()
+
+    links = []
+    for anchor in region.iterdescendants("a"):
+        href = anchor.get("href", "")
+        text = " ".join(anchor.text_content().split())
+        if not text or not href or href.startswith(("#", "javascript:", "mailto:")):
+            continue
+        links.append(f"{normalize_link(base_url, href)} {text}")
+
+    if len(links) < MIN_FINGERPRINT_LINKS:
+        return ""
+    return hashlib.sha256("\n".join(links).encode()).hexdigest()
+
+
+# Share of the scraped links the learned selectors must find again
+MIN_SELECTOR_RECALL = 0.8
+# Share of the links found by the selectors that must be news links
+MIN_SELECTOR_PRECISION = 0.5
+# Ancestors of a link searched for the element holding its date
+MAX_ITEM_DEPTH = 4
+
+
+def _class_predicate(element) -> str:
+    classes = element.get("class", "").split()
+    if not classes:
+        return ""
+    return f"[contains(concat(' ', normalize-space(@class), ' '), ' {classes[0]} ')]"
+
+
+def _generic_path(element, with_class: bool = False) -> str:
+    """XPath of element without positions, so it matches its siblings too."""
+    steps = []
+    for node in [*reversed(list(element.iterancestors())), element]:
+        steps.append(node.tag + (_class_predicate(node) if with_class else ""))
+    return "/" + "/".join(steps)
+
+
+def _anchor_text(anchor) -> str:
+    return " ".join(anchor.text_content().split())
+
+
+def _published(value: str) -> str:
+    """Keep dates build_feed_entry can parse."""
+    value = value.strip()
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return ""
+    return value
+
+
+def extract_listing(html: bytes | str, base_url: str, selectors: dict) -> list[dict]:
+    """
+    Extract news entries from a listing page with selectors learned by
+    learn_listing_selectors. Returns entries in the format of
+    FeedService.parse_website, or an empty list if the page can't be parsed.
+    """
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (ParserError, ValueError):
+        return []
+    document.make_links_absolute(base_url)
+
+    entries = []
+    seen = set()
+    for anchor in document.xpath(selectors["link"]):
+        link = normalize_link(base_url, anchor.get("href", ""))
+        title = _anchor_text(anchor)
+        if not title or link in seen:
+            continue
+        seen.add(link)
+
+        published = ""
+        if selectors.get("date"):
+            dates = anchor.xpath(selectors["date"])
+            if dates:
+                value = dates[0].get("datetime") or dates[0].text_content()
+                published = _published(value)
+
+        entries.append(
+            {
+                "title": title,
+                "link": link,
+                "description": "",
+                "author": "",
+                "published": published,
+            }
+        )
+    return entries
+
+
+def _date_selector(anchor, links: set[str], base_url: str) -> str:
+    """
+    Relative XPath from a news link to the date of its item: the closest
+    ancestor with a <time> element that holds no other news link.
+    """
+    for depth, ancestor in enumerate(anchor.iterancestors()):
+        if depth >= MAX_ITEM_DEPTH:
+            break
+        item_links = {
+            normalize_link(base_url, a.get("href", ""))
+            for a in ancestor.iterdescendants("a")
+        }
+        if len(item_links & links) > 1:
+            break
+        if next(ancestor.iterdescendants("time"), None) is not None:
+            return f"ancestor::{ancestor.tag}[1]//time"
+    return ""
+
+
+def learn_listing_selectors(
+    html: bytes | str, base_url: str, links: list[str]
+) -> dict | None:
+    """
+    Derive XPath selectors that find the given news links (e.g. found by an
+    LLM scrape) on a listing page, for extract_listing to use on later
+    versions of the page. Returns None when no selector finds enough of the
+    links without also picking up too many other links.
+    """
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (ParserError, ValueError):
+        return None
+    document.make_links_absolute(base_url)
+
+    targets = {normalize_link(base_url, link) for link in links}
+    anchors = [
+        anchor
+        for anchor in document.iter("a")
+        if _anchor_text(anchor)
+        and normalize_link(base_url, anchor.get("href", "")) in targets
+    ]
+    if len(targets) < MIN_FINGERPRINT_LINKS or not anchors:
+        return None
+
+    # Try the most common generic paths first, then the same with classes
+    paths = Counter(_generic_path(anchor) for anchor in anchors)
+    paths.update(_generic_path(anchor, with_class=True) for anchor in anchors)
+    for path, _ in paths.most_common():
+        selectors = {"link": path}
+        found = {entry["link"] for entry in extract_listing(html, base_url, selectors)}
+        if not found:
+            continue
+        recall = len(found & targets) / len(targets)
+        precision = len(found & targets) / len(found)
+        if recall >= MIN_SELECTOR_RECALL and precision >= MIN_SELECTOR_PRECISION:
+            dates = Counter(
+                _date_selector(anchor, targets, base_url) for anchor in anchors
+            )
+            selectors["date"] = dates.most_common(1)[0][0]
+            return selectors
+    return None
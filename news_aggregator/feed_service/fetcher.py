@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import queue
+import threading
+from collections import defaultdict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from dataclasses import dataclass
+from dataclasses import field
+from urllib.parse import urlparse
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks whether the consumer of iter_fetch stopped
+STOP_CHECK_INTERVAL = 0.1
+
+
+class FetchStopped(Exception):
+    """The consumer of iter_fetch stopped iterating."""
+
+
+@dataclass
+class FetchResult:
+    """Raw result of downloading a single feed document"""
+
+    url: str
+    content: bytes = b""
+    status_code: int | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and self.status_code == httpx.codes.OK
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == httpx.codes.NOT_MODIFIED
+
+    @property
+    def etag(self) -> str:
+        return self.headers.get("etag", "")
+
+    @property
+    def modified(self) -> str:
+        return self.headers.get("last-modified", "")
+
+
+class FeedFetcher:
+    """
+    Download many feed documents concurrently over a shared async HTTP client.
+    The number of requests in flight is capped globally and per host, so a
+    single slow or rate-limiting publisher can't monopolize the pool.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        per_host_concurrency: int | None = None,
+        timeout: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.FEED_FETCH_MAX_CONCURRENCY
+        self.per_host_concurrency = (
+            per_host_concurrency or settings.FEED_FETCH_PER_HOST_CONCURRENCY
+        )
+        self.timeout = timeout or settings.FEED_FETCH_TIMEOUT
+        self.transport = transport
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            headers={"User-Agent": settings.FEED_FETCH_USER_AGENT},
+            follow_redirects=True,
+            transport=self.transport,
+        )
+
+    async def _fetch_one(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        global_limit: asyncio.Semaphore,
+        host_limits: dict[str, asyncio.Semaphore],
+        etag: str = "",
+        modified: str = "",
+    ) -> FetchResult:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+
+        host = urlparse(url).netloc.lower()
+        async with global_limit, host_limits[host]:
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                logger.warning("Failed to fetch feed %s: %s", url, str(e))
+                return FetchResult(url=url, error=f"Failed to fetch feed: {e!s}")
+
+        result = FetchResult(
+            url=url,
+            content=response.content,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+        )
+        if response.status_code not in (httpx.codes.OK, httpx.codes.NOT_MODIFIED):
+            result.error = f"Failed to fetch feed: HTTP {response.status_code}"
+        return result
+
+    async def _fetch_each(
+        self,
+        urls: Iterable[str],
+        validators: Mapping[str, tuple[str, str]] | None = None,
+        on_result: Callable[[FetchResult], Awaitable[None]] | None = None,
+    ) -> list[FetchResult]:
+        validators = validators or {}
+        unique_urls = list(dict.fromkeys(urls))
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host_concurrency)
+        )
+
+        async def fetch(client: httpx.AsyncClient, url: str) -> FetchResult:
+            result = await self._fetch_one(
+                client, url, global_limit, host_limits, *validators.get(url, ("", ""))
+            )
+            if on_result is not None:
+                await on_result(result)
+            return result
+
+        # A failing fetch cancels the others, which closes their connections
+        async with self._build_client() as client, asyncio.TaskGroup() as group:
+            tasks = [group.create_task(fetch(client, url)) for url in unique_urls]
+        return [task.result() for task in tasks]
+
+    async def fetch_all(
+        self,
+        urls: Iterable[str],
+        validators: Mapping[str, tuple[str, str]] | None = None,
+    ) -> dict[str, FetchResult]:
+        """
+        Download every URL concurrently.
+        validators optionally maps a URL to the (etag, modified) pair from its
+        previous fetch, turning the request into a conditional GET.
+        Returns a dict mapping each URL to its FetchResult. Network errors are
+        reported on the result instead of being raised.
+        """
+        results = await self._fetch_each(urls, validators)
+        return {result.url: result for result in results}
+
+    def fetch(
+        self,
+        urls: Iterable[str],
+        validators: Mapping[str, tuple[str, str]] | None = None,
+    ) -> dict[str, FetchResult]:
+        """Synchronous entry point for management commands and cron jobs."""
+        return asyncio.run(self.fetch_all(urls, validators))
+
+    def iter_fetch(
+        self,
+        urls: Iterable[str],
+        validators: Mapping[str, tuple[str, str]] | None = None,
+        buffer_size: int | None = None,
+    ) -> Generator[FetchResult, None, None]:
+        """
+        Start downloading every URL in a background event loop and return an
+        iterator over the results in completion order.
+        At most buffer_size finished documents wait to be consumed, a consumer
+        that falls behind stalls the downloads instead of buffering every
+        document in memory. When the consumer stops iterating early, the
+        remaining downloads are cancelled and the background loop ends.
+        """
+        results: queue.Queue = queue.Queue(maxsize=buffer_size or self.max_concurrency)
+        done = object()
+        stopped = threading.Event()
+
+        def put(item: object) -> bool:
+            """Wait for room in the queue unless the consumer stopped. Returns whether the item was queued."""
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=STOP_CHECK_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        async def produce() -> None:
+            loop = asyncio.get_running_loop()
+
+            async def on_result(result: FetchResult) -> None:
+                # Block in an executor thread, the event loop keeps running
+                if not await loop.run_in_executor(None, put, result):
+                    raise FetchStopped
+
+            try:
+                await self._fetch_each(urls, validators, on_result=on_result)
+            except* FetchStopped:
+                logger.debug("Feed fetching stopped by its consumer")
+            finally:
+                await loop.run_in_executor(None, put, done)
+
+        threading.Thread(
+            target=asyncio.run, args=(produce(),), name="feed-fetcher", daemon=True
+        ).start()
+
+        def consume() -> Generator[FetchResult, None, None]:
+            try:
+                while (result := results.get()) is not done:
+                    yield result
+            finally:
+                stopped.set()
+
+        return consume()
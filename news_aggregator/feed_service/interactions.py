@@ -0,0 +1,90 @@
+import logging
+import time
+
+from django.conf import settings
+
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.models import UserArticleInteraction
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionWriter:
+    """
+    Buffer AI results and upsert them as UserArticleInteraction rows in bulk.
+    The buffer is flushed with a single INSERT ... ON CONFLICT DO UPDATE
+    once it holds flush_rows rows or its oldest row is flush_seconds old
+    (checked when rows are added), and when the writer is closed. Each flush
+    also updates the timelines of the users, see timeline.update_interactions.
+
+    Use it as a context manager so the last rows are always written:
+
+        with InteractionWriter() as writer:
+            writer.add(user_id, entry_id, analysis)
+    """
+
+    UPDATE_FIELDS = ["custom_summary", "relevance_score", "translated_title"]
+
+    def __init__(
+        self, flush_rows: int | None = None, flush_seconds: float | None = None
+    ):
+        self.flush_rows = flush_rows or settings.AI_INTERACTION_FLUSH_ROWS
+        self.flush_seconds = (
+            settings.AI_INTERACTION_FLUSH_SECONDS
+            if flush_seconds is None
+            else flush_seconds
+        )
+        self.written = 0
+        self.flushes = 0
+        self._buffer: dict[tuple[int, int], UserArticleInteraction] = {}
+        self._buffered_at = 0.0
+
+    def add(self, user_id: int, entry_id: int, analysis) -> None:
+        """Queue the ArticleAnalysis of a user and entry, flushing if the buffer is due."""
+        if not self._buffer:
+            self._buffered_at = time.monotonic()
+        # A later result for the same pair replaces the queued one, a single
+        # upsert can't touch the same row twice
+        self._buffer[(user_id, entry_id)] = UserArticleInteraction(
+            user_id=user_id,
+            entry_id=entry_id,
+            custom_summary=analysis.summary,
+            relevance_score=analysis.relevance_score,
+            translated_title=analysis.translated_title[
+                : UserArticleInteraction._meta.get_field("translated_title").max_length
+            ],
+        )
+        if (
+            len(self._buffer) >= self.flush_rows
+            or time.monotonic() - self._buffered_at >= self.flush_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write the buffered rows. Returns the number of rows written."""
+        if not self._buffer:
+            return 0
+
+        rows = list(self._buffer.values())
+        UserArticleInteraction.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["user", "entry"],
+            update_fields=self.UPDATE_FIELDS,
+        )
+        timeline.update_interactions(rows)
+        self._buffer = {}
+        self.written += len(rows)
+        self.flushes += 1
+        logger.debug(f"Wrote {len(rows)} article interactions")
+        return len(rows)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "InteractionWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Results computed before a failure are still worth keeping
+        self.close()
@@ -0,0 +1,515 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Literal
+from typing import cast
+
+import openai
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from openai import AsyncOpenAI
+from openai import OpenAI
+from openai.types.chat import ChatCompletionMessageParam
+from pydantic import BaseModel
+
+from news_aggregator.feed_service.models import CachedLLMResponse
+from news_aggregator.feed_service.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _strict_schema(schema: dict) -> dict:
+    """
+    JSON schema of a pydantic model in the form strict structured outputs
+    accept: objects list all their properties as required and allow no
+    others, and defaults are dropped.
+    """
+    strict = {key: value for key, value in schema.items() if key != "default"}
+    for key in ("properties", "$defs"):
+        if key in strict:
+            strict[key] = {
+                name: _strict_schema(value) for name, value in strict[key].items()
+            }
+    if isinstance(strict.get("items"), dict):
+        strict["items"] = _strict_schema(strict["items"])
+    for key in ("anyOf", "allOf"):
+        if key in strict:
+            strict[key] = [_strict_schema(value) for value in strict[key]]
+    if strict.get("type") == "object":
+        strict["additionalProperties"] = False
+        strict["required"] = list(strict.get("properties", {}))
+    return strict
+
+
+def response_format_param(response_format: type[BaseModel]) -> dict:
+    """The json_schema response_format of a request for a pydantic model, for raw request bodies."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": response_format.__name__,
+            "schema": _strict_schema(response_format.model_json_schema()),
+            "strict": True,
+        },
+    }
+
+
+class ResponseCache:
+    """
+    Persistent cache of parsed LLM responses.
+    Entries are keyed by a hash of the model, the messages (system prompt,
+    article content and reader interests) and the response format, expire
+    after AI_RESPONSE_CACHE_TTL seconds and the least recently used entries are
+    evicted once the cache grows past AI_RESPONSE_CACHE_MAX_ENTRIES.
+    Hit and miss counters cover the lifetime of the cache object, which can
+    be shared by several threads.
+    """
+
+    EVICT_EVERY = 100  # Writes between two eviction passes
+
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        ttl: int | None = None,
+        max_entries: int | None = None,
+    ):
+        self.enabled = (
+            settings.AI_RESPONSE_CACHE_ENABLED if enabled is None else enabled
+        )
+        self.ttl = ttl or settings.AI_RESPONSE_CACHE_TTL
+        self.max_entries = max_entries or settings.AI_RESPONSE_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> int:
+        with self._lock:
+            value = getattr(self, counter) + 1
+            setattr(self, counter, value)
+            return value
+
+    @staticmethod
+    def make_key(
+        model: str, messages: list[dict], response_format: type[BaseModel]
+    ) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "response_format": response_format.__name__,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str, response_format: type[BaseModel]) -> BaseModel | None:
+        """Return the cached response for a key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        cached = CachedLLMResponse.objects.filter(
+            key=key, expires_at__gt=timezone.now()
+        ).first()
+        if cached is None:
+            self._count("misses")
+            return None
+
+        try:
+            response = response_format.model_validate(cached.response)
+        except ValueError:
+            # The response format changed since this entry was stored
+            self._count("misses")
+            return None
+
+        CachedLLMResponse.objects.filter(pk=cached.pk).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+        self._count("hits")
+        return response
+
+    def set(self, key: str, model: str, response: BaseModel) -> None:
+        """Store a parsed response, evicting old entries every EVICT_EVERY writes."""
+        if not self.enabled:
+            return
+
+        now = timezone.now()
+        CachedLLMResponse.objects.update_or_create(
+            key=key,
+            defaults={
+                "model": model,
+                "response": response.model_dump(mode="json"),
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl),
+            },
+        )
+        if self._count("_writes") % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete expired entries and the least recently used overflow. Returns the number deleted."""
+        deleted, _ = CachedLLMResponse.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+
+        overflow = CachedLLMResponse.objects.order_by("-last_used_at").values_list(
+            "last_used_at", flat=True
+        )[self.max_entries : self.max_entries + 1]
+        if overflow:
+            trimmed, _ = CachedLLMResponse.objects.filter(
+                last_used_at__lte=overflow[0]
+            ).delete()
+            deleted += trimmed
+        return deleted
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats_line(self) -> str:
+        return (
+            f"LLM response cache: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate)"
+        )
+
+
+def estimate_tokens(messages: list[dict], model: str) -> int:
+    """Prompt size used for rate limiting, including a few tokens of overhead per message."""
+    return sum(count_tokens(message["content"], model) + 4 for message in messages)
+
+
+@dataclass
+class LLMResult:
+    """Parsed structured output of a completion and the tokens it used"""
+
+    parsed: BaseModel
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @classmethod
+    def from_usage(cls, parsed: BaseModel, usage) -> "LLMResult":
+        if usage is None:
+            return cls(parsed)
+        if isinstance(usage, Mapping):
+            return cls(parsed, usage["prompt_tokens"], usage["completion_tokens"])
+        return cls(parsed, usage.prompt_tokens, usage.completion_tokens)
+
+
+def parse_duration(value: str) -> float:
+    """Parse rate-limit reset durations such as "20ms", "1s" or "6m0s" into seconds."""
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    seconds = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value or ""):
+        seconds += float(amount) * units[unit]
+    return seconds
+
+
+class TokenBucket:
+    """
+    Budget of `capacity` units that refills continuously over `period` seconds.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available."""
+        with self._lock:
+            self._refill()
+            # Requests larger than the whole bucket go through once it's full
+            amount = min(amount, self.capacity)
+            return max(0.0, (amount - self.level) / self.rate)
+
+    def consume(self, amount: float) -> None:
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+    def cap(self, remaining: float) -> None:
+        """Lower the level to what the server reports as remaining."""
+        with self._lock:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Schedule requests under a requests-per-minute and a tokens-per-minute budget.
+    The budgets are tightened by the x-ratelimit-* headers of every response,
+    and a 429 pauses all requests for the server's retry-after interval.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ):
+        self.requests = TokenBucket(
+            requests_per_minute or settings.AI_REQUESTS_PER_MINUTE
+        )
+        self.tokens = TokenBucket(tokens_per_minute or settings.AI_TOKENS_PER_MINUTE)
+        self.paused_until = 0.0
+        self._reserve_lock = threading.Lock()
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    def _lock(self) -> asyncio.Lock:
+        # The limiter outlives event loops and may be shared by loops running
+        # in several threads, asyncio locks are bound to a single loop
+        loop = asyncio.get_running_loop()
+        if loop not in self._locks:
+            self._locks[loop] = asyncio.Lock()
+        return self._locks[loop]
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of `tokens` tokens fits in both budgets, then reserve it."""
+        async with self._lock():
+            while True:
+                # Loops in other threads check and reserve the same budgets
+                with self._reserve_lock:
+                    wait = max(
+                        self.paused_until - time.monotonic(),
+                        self.requests.wait_time(1),
+                        self.tokens.wait_time(tokens),
+                    )
+                    if wait <= 0:
+                        self.requests.consume(1)
+                        self.tokens.consume(tokens)
+                        return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Adapt the budgets to the rate-limit headers of a response."""
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            bucket.cap(float(remaining))
+            if float(remaining) <= 0:
+                self.pause(parse_duration(headers.get(f"x-ratelimit-reset-{kind}", "")))
+
+
+class AsyncLLMEngine:
+    """
+    Run many structured-output requests concurrently on AsyncOpenAI.
+    Every request first reserves its share of the rate limits, at most
+    max_in_flight requests are open at once, and rate-limited or transient
+    failures are retried after the server's retry-after delay.
+    """
+
+    RETRYABLE_ERRORS = (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+    COMPLETION_TOKENS_ESTIMATE = 500  # Reserved per request for the response
+
+    def __init__(
+        self,
+        limiter: RateLimiter | None = None,
+        max_in_flight: int | None = None,
+        max_retries: int = 5,
+        client_factory: Callable[[], AsyncOpenAI] | None = None,
+    ):
+        self.limiter = limiter or RateLimiter()
+        self.max_in_flight = max_in_flight or settings.AI_MAX_CONCURRENT_REQUESTS
+        self.max_retries = max_retries
+        self.client_factory = client_factory or (lambda: AsyncOpenAI(max_retries=0))
+
+    @staticmethod
+    def _retry_after(error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        if response is not None:
+            if retry_after_ms := response.headers.get("retry-after-ms"):
+                return float(retry_after_ms) / 1000
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.replace(".", "", 1).isdigit():
+                return float(retry_after)
+        return min(2**attempt, 60)
+
+    async def _run_one(
+        self,
+        client: AsyncOpenAI,
+        in_flight: asyncio.Semaphore,
+        model: str,
+        messages: list[dict],
+        response_format: type[BaseModel],
+    ) -> LLMResult:
+        tokens = estimate_tokens(messages, model) + self.COMPLETION_TOKENS_ESTIMATE
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            try:
+                async with in_flight:
+                    raw = await client.beta.chat.completions.with_raw_response.parse(
+                        model=model,
+                        messages=cast(list[ChatCompletionMessageParam], messages),
+                        response_format=response_format,
+                    )
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_after(e, attempt)
+                logger.warning("LLM request failed (%s), retrying in %.1fs", e, delay)
+                if isinstance(e, openai.RateLimitError):
+                    self.limiter.pause(delay)
+                    continue
+                await asyncio.sleep(delay)
+                continue
+
+            self.limiter.observe(raw.headers)
+            completion = raw.parse()
+            message = completion.choices[0].message
+            if message.refusal:
+                raise ValueError(f"AI refused to process: {message.refusal}")
+            if message.parsed is None:
+                raise ValueError("AI returned no parsed response")
+            return LLMResult.from_usage(message.parsed, completion.usage)
+
+        raise AssertionError("unreachable")
+
+    async def run_all(
+        self, model: str, requests: Sequence[tuple[list[dict], type[BaseModel]]]
+    ) -> list[LLMResult | BaseException]:
+        """Run every (messages, response_format) request, returning results or exceptions in order."""
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        async with self.client_factory() as client:
+            return await asyncio.gather(
+                *(
+                    self._run_one(client, in_flight, model, messages, response_format)
+                    for messages, response_format in requests
+                ),
+                return_exceptions=True,
+            )
+
+    def run(
+        self, model: str, requests: Sequence[tuple[list[dict], type[BaseModel]]]
+    ) -> list[LLMResult | BaseException]:
+        """Synchronous entry point, see run_all."""
+        if not requests:
+            return []
+        return asyncio.run(self.run_all(model, requests))
+
+
+class BatchAPI:
+    """
+    Submit structured-output requests through the OpenAI Batch API, which
+    runs them within 24 hours at half the price of synchronous requests,
+    and read back their parsed results.
+    """
+
+    ENDPOINT: Literal["/v1/chat/completions"] = "/v1/chat/completions"
+    FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(
+        self, client: OpenAI | None = None, completion_window: Literal["24h"] = "24h"
+    ):
+        self.client = client or OpenAI()
+        self.completion_window = completion_window
+
+    def submit(
+        self,
+        model: str,
+        requests: Mapping[str, tuple[list[dict], type[BaseModel]]],
+        metadata: dict[str, str] | None = None,
+    ) -> tuple[str, str]:
+        """
+        Upload the requests, keyed by custom_id, as a JSONL file and create a batch.
+        Returns the (input_file_id, batch_id) pair.
+        """
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": self.ENDPOINT,
+                    "body": {
+                        "model": model,
+                        "messages": messages,
+                        "response_format": response_format_param(response_format),
+                    },
+                },
+                ensure_ascii=False,
+            )
+            for custom_id, (messages, response_format) in requests.items()
+        ]
+        input_file = self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.ENDPOINT,
+            completion_window=self.completion_window,
+            metadata=metadata,
+        )
+        return input_file.id, batch.id
+
+    def retrieve(self, batch_id: str):
+        return self.client.batches.retrieve(batch_id)
+
+    def results(
+        self, batch, formats: Mapping[str, type[BaseModel]]
+    ) -> dict[str, LLMResult | BaseException]:
+        """
+        Parse the output and error files of a finished batch.
+        formats maps each custom_id to its response format. Returns a dict
+        mapping custom_ids to the parsed response or the exception of a failed
+        request; requests the batch never ran are missing.
+        """
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                custom_id = record["custom_id"]
+                if custom_id in formats:
+                    results[custom_id] = self._parse_record(record, formats[custom_id])
+        return results
+
+    @staticmethod
+    def _parse_record(
+        record: dict, response_format: type[BaseModel]
+    ) -> LLMResult | BaseException:
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error")
+            return ValueError(f"Batch request failed: {error}")
+
+        message = response["body"]["choices"][0]["message"]
+        if message.get("refusal"):
+            return ValueError(f"AI refused to process: {message['refusal']}")
+        try:
+            parsed = response_format.model_validate_json(message["content"])
+        except ValueError as e:
+            return e
+        return LLMResult.from_usage(parsed, response["body"].get("usage"))
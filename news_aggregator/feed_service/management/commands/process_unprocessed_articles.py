@@ -2,13 +2,19 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 import logging
 from datetime import timedelta
-from collections import defaultdict
-from django.db.models import Q
+from itertools import groupby
+from itertools import islice
+from operator import itemgetter
+from typing import Any
+from django.db.models import Count
 from news_aggregator.feed_service.models import (
+    AIBatchJob,
+    Feed,
     FeedEntry,
-    UserFeedSubscription,
-    UserArticleInteraction,
 )
+from news_aggregator.feed_service.interactions import InteractionWriter
+from news_aggregator.users.models import User
+from news_aggregator.feed_service.llm import AsyncLLMEngine
 from news_aggregator.feed_service.services import AIService
 
 logger = logging.getLogger(__name__)
@@ -29,110 +35,80 @@ class Command(BaseCommand):
             "--batch-size",
             type=int,
             default=100,
-            help="Number of articles to process in each batch (default: 100)",
+            help="Maximum number of subscribers to process per article (default: 100)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Number of articles planned and processed together (default: 200)",
         )
         parser.add_argument(
             "--reprocess",
             action="store_true",
             help="Reprocess articles even if they were previously processed",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Maximum number of concurrent AI requests (default: AI_MAX_CONCURRENT_REQUESTS)",
+        )
+        parser.add_argument(
+            "--batch",
+            action="store_true",
+            help="Ingest finished OpenAI batch jobs and submit the remaining articles "
+            "as a new batch instead of processing them now",
+        )
 
     def handle(self, *args, **options):
         hours = options["hours"]
         batch_size = options["batch_size"]
         reprocess = options["reprocess"]
         cutoff_time = timezone.now() - timedelta(hours=hours)
-
-        # Initialize feed-level tracking
-        feed_results = defaultdict(
-            lambda: {
-                "title": "",
-                "feed_type": "",
-                "status": "success",
-                "articles_processed": 0,
-                "articles_skipped": 0,
-                "processing_errors": 0,
-                "errors": [],
-            }
+        ai_service = AIService(
+            engine=AsyncLLMEngine(max_in_flight=options["concurrency"])
         )
 
-        # Get recent articles that need processing
-        entries = (
-            FeedEntry.objects.filter(
-                published_at__gte=cutoff_time,
-                article_load_error="",
+        if options["batch"]:
+            # Results of earlier batches first, so they aren't submitted again
+            self.ingest_batches(ai_service)
+
+        # Initialize feed-level tracking, every article counts as skipped until it gets work
+        feed_results: dict[int, dict[str, Any]] = {}
+        feeds = Feed.objects.filter(
+            entries__published_at__gte=cutoff_time,
+            entries__article_load_error="",
+        ).annotate(recent_entries=Count("entries"))
+        for feed in feeds:
+            self.feed_result(feed_results, feed)["articles_skipped"] = (
+                feed.recent_entries
             )
-            .select_related("feed")
-            .order_by("feed_id")
-        )
 
-        total_entries = entries.count()
+        total_entries = sum(r["articles_skipped"] for r in feed_results.values())
         self.stdout.write(
             f"Found {total_entries} articles within the last {hours} hours"
         )
 
-        ai_service = AIService()
-        current_feed = None
-
-        # Process articles grouped by feed
-        for entry in entries:
-            if current_feed != entry.feed:
-                current_feed = entry.feed
-                self.stdout.write(f"\nProcessing feed: {current_feed.title}")
-                feed_results[current_feed.id].update(
-                    {
-                        "title": current_feed.title,
-                        "feed_type": current_feed.get_feed_type_display(),
-                    }
-                )
-
-            # Modified subscribers query to handle reprocessing
-            subscribers_query = UserFeedSubscription.objects.filter(
-                feed=entry.feed,
-                is_active=True,
-            )
-            if not reprocess:
-                subscribers_query = subscribers_query.exclude(
-                    user__article_interactions__entry=entry
-                )
-            subscribers = subscribers_query.select_related("user")
-
-            if not subscribers.exists():
-                feed_results[current_feed.id]["articles_skipped"] += 1
-                continue
-
-            result = feed_results[current_feed.id]
-            for subscription in subscribers[:batch_size]:
-                try:
-                    ai_result = ai_service.process_article_for_user(
-                        entry, subscription.user
-                    )
+        # One anti-join query plans all the work, streamed in chunks of articles
+        pending = AIService.pending_interactions(cutoff_time, reprocess).iterator(
+            chunk_size=2000
+        )
+        chunks = self.work_chunks(pending, batch_size, options["chunk_size"])
 
-                    if ai_result.error:
-                        result["processing_errors"] += 1
-                        result["errors"].append(
-                            f"Error processing {entry.title}: {ai_result.error}"
-                        )
-                        result["status"] = "error"
-                        continue
+        if options["batch"]:
+            self.submit_batch(ai_service, [work for chunk in chunks for work in chunk])
+            return
 
-                    # Update or create the interaction
-                    UserArticleInteraction.objects.update_or_create(
-                        user=subscription.user,
-                        entry=entry,
-                        defaults={
-                            "custom_summary": ai_result.summary,
-                            "relevance_score": ai_result.relevance_score,
-                            "translated_title": ai_result.translated_title,
-                        },
-                    )
-                    result["articles_processed"] += 1
-
-                except Exception as e:
-                    result["processing_errors"] += 1
-                    result["errors"].append(f"Error processing {entry.title}: {str(e)}")
-                    result["status"] = "error"
-                    logger.error(f"Error processing article {entry.pk}: {str(e)}")
+        self.stdout.write(
+            f"Processing articles with up to {ai_service.engine.max_in_flight} concurrent requests"
+        )
+        # Results are upserted in bulk as they come in
+        with InteractionWriter() as writer:
+            for work in chunks:
+                for entry, _ in work:
+                    self.feed_result(feed_results, entry.feed)["articles_skipped"] -= 1
+                self.process_chunk(ai_service, work, feed_results, writer)
 
         # Print detailed report
         self.stdout.write("\n=== Processing Report ===")
@@ -184,5 +160,138 @@ class Command(BaseCommand):
             f"Failed feeds: {error_count}\n"
             f"Total articles processed: {total_processed}\n"
             f"Total articles skipped: {total_skipped}\n"
-            f"Total processing errors: {total_errors}"
+            f"Total processing errors: {total_errors}\n"
+            f"{ai_service.cache.stats_line()}"
+        )
+
+    def ingest_batches(self, ai_service):
+        """Submit jobs that never reached the API and ingest finished ones."""
+        jobs = AIBatchJob.objects.filter(status__in=AIBatchJob.UNFINISHED).order_by(
+            "created_at"
+        )
+        for job in jobs:
+            if job.status == AIBatchJob.Status.PENDING:
+                ai_service.submit_job(job)
+                self.stdout.write(f"Resubmitted batch job {job.pk} as {job.batch_id}")
+                continue
+
+            ingested = ai_service.ingest_batch(job)
+            if ingested is None:
+                self.stdout.write(f"Batch {job.batch_id} is still running")
+                continue
+
+            count, errors = ingested
+            status_style = (
+                self.style.SUCCESS
+                if job.status == AIBatchJob.Status.INGESTED and not errors
+                else self.style.ERROR
+            )
+            self.stdout.write(
+                status_style(
+                    f"Batch {job.batch_id}: {count} interactions saved, {len(errors)} errors"
+                )
+            )
+            for error in errors[: self.MAX_ERRORS_TO_SHOW]:
+                self.stdout.write(f"   - {error}")
+            if len(errors) > self.MAX_ERRORS_TO_SHOW:
+                remaining = len(errors) - self.MAX_ERRORS_TO_SHOW
+                self.stdout.write(f"   ... and {remaining} more errors")
+
+    def submit_batch(self, ai_service, work):
+        job = ai_service.submit_batch(work)
+        if job is None:
+            self.stdout.write("No articles left to submit")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Submitted batch {job.batch_id} with {job.request_count} requests "
+                f"for {len(work)} articles"
+            )
         )
+
+    @staticmethod
+    def feed_result(feed_results, feed):
+        """
+        The report counters of a feed, added on first use so feeds that were
+        added or activated while the command runs are reported too.
+        """
+        return feed_results.setdefault(
+            feed.id,
+            {
+                "title": feed.title,
+                "feed_type": feed.get_feed_type_display(),
+                "status": "success",
+                "articles_processed": 0,
+                "articles_skipped": 0,
+                "processing_errors": 0,
+                "errors": [],
+            },
+        )
+
+    @staticmethod
+    def work_chunks(pairs, max_users, chunk_size):
+        """
+        Group a stream of (entry_id, user_id) pairs ordered by entry into
+        lists of up to chunk_size (entry, users) work items, with at most
+        max_users users per entry. Entries and users are loaded per chunk.
+        """
+
+        def load(user_ids_by_entry):
+            entries = FeedEntry.objects.select_related("feed").in_bulk(
+                user_ids_by_entry
+            )
+            users = User.objects.in_bulk(
+                {user_id for ids in user_ids_by_entry.values() for user_id in ids}
+            )
+            return [
+                (entries[entry_id], [users[user_id] for user_id in user_ids])
+                for entry_id, user_ids in user_ids_by_entry.items()
+            ]
+
+        user_ids_by_entry: dict[int, list[int]] = {}
+        for entry_id, pairs_of_entry in groupby(pairs, key=itemgetter(0)):
+            if len(user_ids_by_entry) == chunk_size:
+                yield load(user_ids_by_entry)
+                user_ids_by_entry = {}
+            user_ids_by_entry[entry_id] = [
+                user_id for _, user_id in islice(pairs_of_entry, max_users)
+            ]
+        if user_ids_by_entry:
+            yield load(user_ids_by_entry)
+
+    def process_chunk(self, ai_service, work, feed_results, writer):
+        try:
+            # All requests run concurrently, one request covers a whole batch of subscribers
+            ai_results = ai_service.process_articles_for_users(work)
+        except Exception as e:
+            logger.error(f"Error processing articles: {str(e)}")
+            for entry, users in work:
+                result = self.feed_result(feed_results, entry.feed)
+                result["processing_errors"] += len(users)
+                result["errors"].append(f"Error processing {entry.title}: {str(e)}")
+                result["status"] = "error"
+            return
+
+        for entry, users in work:
+            result = self.feed_result(feed_results, entry.feed)
+            for user in users:
+                try:
+                    ai_result = ai_results[entry.pk][user.pk]
+
+                    if ai_result.error:
+                        result["processing_errors"] += 1
+                        result["errors"].append(
+                            f"Error processing {entry.title}: {ai_result.error}"
+                        )
+                        result["status"] = "error"
+                        continue
+
+                    # Update or create the interaction
+                    writer.add(user.pk, entry.pk, ai_result)
+                    result["articles_processed"] += 1
+
+                except Exception as e:
+                    result["processing_errors"] += 1
+                    result["errors"].append(f"Error processing {entry.title}: {str(e)}")
+                    result["status"] = "error"
+                    logger.error(f"Error processing article {entry.pk}: {str(e)}")
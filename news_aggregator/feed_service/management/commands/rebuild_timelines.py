@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.models import UserFeedSubscription
+from news_aggregator.feed_service.models import UserTimelineEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild the home timelines of users from their active subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            default=None,
+            help="Only rebuild the timeline of the user with this id",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the existing timeline rows first, to drop stale ones",
+        )
+
+    def handle(self, *args, **options):
+        subscriptions = UserFeedSubscription.objects.filter(is_active=True)
+        rows = UserTimelineEntry.objects.all()
+        if options["user"]:
+            subscriptions = subscriptions.filter(user_id=options["user"])
+            rows = rows.filter(user_id=options["user"])
+
+        if options["clear"]:
+            deleted, _ = rows.delete()
+            self.stdout.write(f"Deleted {deleted} timeline entries")
+
+        total = 0
+        for user_id, feed_id in subscriptions.values_list("user_id", "feed_id"):
+            # Existing rows are left as they are
+            total += timeline.add_feed(user_id, feed_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Added up to {total} timeline entries for {subscriptions.count()} subscriptions"
+            )
+        )
@@ -2,8 +2,8 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 import logging
 from datetime import timedelta
+from news_aggregator.feed_service.articles import ArticleLoader
 from news_aggregator.feed_service.models import FeedEntry
-from news_aggregator.feed_service.services import FeedService
 
 logger = logging.getLogger(__name__)
 
@@ -40,18 +40,26 @@ class Command(BaseCommand):
         still_failed = 0
         all_errors = []
 
-        for entry in failed_entries:
+        # Remember the previous errors, the loader overwrites them in place
+        previous_errors = {
+            entry.pk: entry.article_load_error for entry in failed_entries
+        }
+
+        with ArticleLoader() as loader:
+            load_results = loader.load(failed_entries)
+
+        for load_result in load_results:
+            entry = load_result.entry
             self.stdout.write(f"\nRetrying: {entry.title}")
             self.stdout.write(f"  Feed: {entry.feed.title}")
-            self.stdout.write(f"  Previous error: {entry.article_load_error}")
+            self.stdout.write(f"  Previous error: {previous_errors[entry.pk]}")
 
-            success, error = FeedService.load_article_content(entry)
-            if success:
+            if load_result.success:
                 success_count += 1
                 self.stdout.write(self.style.SUCCESS(f"  ✓ Successfully loaded"))
             else:
                 still_failed += 1
-                error_msg = f"Failed to load {entry.url}: {error}"
+                error_msg = f"Failed to load {entry.url}: {load_result.error}"
                 all_errors.append(error_msg)
                 self.stdout.write(self.style.ERROR(f"  ✗ {error_msg}"))
 
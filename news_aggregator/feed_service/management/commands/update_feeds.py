@@ -1,7 +1,17 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 import logging
+import threading
+from typing import Any
+from openai import OpenAI
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.fetcher import FeedFetcher
+from news_aggregator.feed_service.llm import AsyncLLMEngine
+from news_aggregator.feed_service.llm import ResponseCache
 from news_aggregator.feed_service.models import Feed, FeedEntry
+from news_aggregator.feed_service.pipeline import Pipeline
+from news_aggregator.feed_service.pipeline import Stage
 from news_aggregator.feed_service.services import FeedService
 from news_aggregator.feed_service.services import AIService
 
@@ -13,17 +23,13 @@ class Command(BaseCommand):
     MAX_ERRORS_TO_SHOW = 3
 
     def handle(self, *args, **options):
-        feeds = Feed.objects.filter(is_active=True)
-        self.stdout.write(f"Found {feeds.count()} active feeds to update")
+        feeds = list(Feed.objects.filter(is_active=True))
+        self.stdout.write(f"Found {len(feeds)} active feeds to update")
 
-        # Track results for each feed
-        feed_results = []
-        total_entries = 0
-        total_articles_loaded = 0
-        total_article_errors = 0
-
-        for feed in feeds:
-            result = {
+        # Track results for each feed, updated from the stage worker threads
+        self.results_lock = threading.Lock()
+        self.results_by_feed: dict[int, dict[str, Any]] = {
+            feed.id: {
                 "feed": feed.title,
                 "feed_type": feed.get_feed_type_display(),  # Get human-readable feed type
                 "status": "success",
@@ -32,103 +38,144 @@ class Command(BaseCommand):
                 "article_errors": 0,
                 "errors": [],
             }
+            for feed in feeds
+        }
+        # Every AI worker thread gets its own AIService, they share the
+        # client, the response cache and the engine with its account-wide
+        # rate limits
+        self.ai_client = OpenAI()
+        self.ai_cache = ResponseCache()
+        self.ai_engine = AsyncLLMEngine()
+        self.ai_services = threading.local()
+
+        # fetch -> update -> extract -> AI, each stage with its own workers and
+        # a bounded input queue so a slow stage pushes back on the ones before it
+        pipeline = Pipeline(
+            [
+                Stage(
+                    "update",
+                    self.update_feeds,
+                    workers=settings.FEED_PIPELINE_UPDATE_WORKERS,
+                    queue_size=settings.FEED_PIPELINE_QUEUE_SIZE,
+                ),
+                Stage(
+                    "extract",
+                    self.load_articles,
+                    workers=settings.FEED_PIPELINE_EXTRACT_WORKERS,
+                    queue_size=settings.FEED_PIPELINE_QUEUE_SIZE,
+                    batch_size=settings.FEED_PIPELINE_EXTRACT_BATCH_SIZE,
+                ),
+                Stage(
+                    "ai",
+                    self.process_articles,
+                    workers=settings.FEED_PIPELINE_AI_WORKERS,
+                    queue_size=settings.FEED_PIPELINE_QUEUE_SIZE,
+                    batch_size=settings.FEED_PIPELINE_AI_BATCH_SIZE,
+                ),
+            ]
+        )
+        stats = pipeline.run(self.fetch_feeds(feeds))
 
-            try:
-                self.stdout.write(
-                    f"Updating {feed.get_feed_type_display()}: {feed.title} ({feed.url})"
-                )
-                entries_added, errors = FeedService.update_feed(feed)
+        self.stdout.write("\n=== Pipeline Report ===")
+        for stage_stats in stats:
+            self.stdout.write(stage_stats.report_line())
 
-                if errors:
-                    result["status"] = "error"
-                    result["errors"] = errors
-                    for error in errors:
-                        self.stdout.write(
-                            self.style.ERROR(f"Error in {feed.title}: {error}")
-                        )
-                else:
-                    if entries_added:
-                        self.stdout.write(
-                            f"Added {entries_added} new entries to {feed.title}"
-                        )
-                    else:
-                        self.stdout.write("No new entries found")
+        feed_results = list(self.results_by_feed.values())
+        failed = [r for r in feed_results if r["status"] == "error"]
+        for result in failed:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"\n✗ ERROR - [{result['feed_type']}] {result['feed']}"
+                )
+            )
+            for error in result["errors"][: self.MAX_ERRORS_TO_SHOW]:
+                self.stdout.write(f"   - {error}")
+            if len(result["errors"]) > self.MAX_ERRORS_TO_SHOW:
+                remaining = len(result["errors"]) - self.MAX_ERRORS_TO_SHOW
+                self.stdout.write(f"   ... and {remaining} more errors")
 
-                result["entries_added"] = entries_added
-                total_entries += entries_added
-
-                # Load full article content for new entries
-                if entries_added > 0:
-                    new_entries = feed.entries.filter(article_loaded_at__isnull=True)
-                    for entry in new_entries:
-                        self.stdout.write(f"Loading article content for: {entry.title}")
-                        success, error = FeedService.load_article_content(entry)
-                        if success:
-                            result["articles_loaded"] += 1
-                            total_articles_loaded += 1
-
-                            # Add AI processing here
-                            self.stdout.write(
-                                f"Processing article with AI: {entry.title}"
-                            )
-                            AIService.process_entry_for_all_users(entry)
-
-                        else:
-                            result["article_errors"] += 1
-                            total_article_errors += 1
-                            result["errors"].append(
-                                f"Article load error for {entry.url}: {error}"
-                            )
+        self.stdout.write("\n=== Summary ===")
+        self.stdout.write(
+            f"Feeds updated: {len(feed_results) - len(failed)}, failed: {len(failed)}\n"
+            f"New entries added: {sum(r['entries_added'] for r in feed_results)}\n"
+            f"Articles loaded: {sum(r['articles_loaded'] for r in feed_results)}, "
+            f"load errors: {sum(r['article_errors'] for r in feed_results)}\n"
+            f"{self.ai_cache.stats_line()}"
+        )
 
+    def fetch_feeds(self, feeds):
+        """
+        Source of the pipeline: (feed, fetched document) pairs.
+        Feeds are downloaded concurrently in the background and handed on as
+        they arrive. Websites are downloaded too, to tell from their listing
+        fingerprint whether they need to be scraped by Parsera again.
+        """
+        sources = {feed.url: feed for feed in feeds}
+        fetched = FeedFetcher().iter_fetch(
+            sources,
+            {url: (feed.etag, feed.modified) for url, feed in sources.items()},
+            buffer_size=settings.FEED_PIPELINE_QUEUE_SIZE,
+        )
+        return ((sources[result.url], result) for result in fetched)
+
+    def update_feeds(self, items):
+        """Update stage: parse feeds and pass on the new entries, which need their article loaded."""
+        pending: list[FeedEntry] = []
+        for feed, fetched in items:
+            result = self.results_by_feed[feed.id]
+            update_started = timezone.now()
+            try:
+                entries_added, errors = FeedService.update_feed(feed, fetched=fetched)
             except Exception as e:
-                result["status"] = "error"
-                result["errors"].append(str(e))
+                errors = [str(e)]
+                entries_added = 0
                 logger.error(f"Error updating feed {feed.title}: {str(e)}")
-                self.stdout.write(
-                    self.style.ERROR(f"Failed to update {feed.title}: {str(e)}")
-                )
-
-            feed_results.append(result)
-
-        # Print detailed report
-        self.stdout.write("\n=== Feed Update Report ===")
-        success_count = sum(1 for r in feed_results if r["status"] == "success")
-        error_count = sum(1 for r in feed_results if r["status"] == "error")
-
-        # Group results by feed type
-        rss_feeds = [r for r in feed_results if r["feed_type"] == "RSS Feed"]
-        website_feeds = [r for r in feed_results if r["feed_type"] == "Website"]
 
-        for result in feed_results:
-            status_style = (
-                self.style.SUCCESS
-                if result["status"] == "success"
-                else self.style.ERROR
-            )
-            status_text = "✓ SUCCESS" if result["status"] == "success" else "✗ ERROR"
-
-            self.stdout.write(
-                f"\n{status_style(status_text)} - [{result['feed_type']}] {result['feed']}"
+            with self.results_lock:
+                result["entries_added"] = entries_added
+                if errors:
+                    result["status"] = "error"
+                    result["errors"].extend(errors)
+
+            # Older entries are left to retry_failed_articles, a feed with
+            # nothing new costs no query here
+            if entries_added:
+                pending.extend(
+                    FeedEntry.objects.filter(
+                        feed=feed,
+                        created_at__gte=update_started,
+                        article_loaded_at__isnull=True,
+                        article_load_error="",
+                    )
+                )
+        return pending
+
+    def load_articles(self, entries):
+        """Extract stage: load full article content and pass on the loaded entries."""
+        loaded_entries = []
+        for load_result in ArticleLoader(parse_workers=0).load(entries):
+            entry = load_result.entry
+            result = self.results_by_feed[entry.feed_id]
+            with self.results_lock:
+                if load_result.success:
+                    result["articles_loaded"] += 1
+                    loaded_entries.append(entry)
+                else:
+                    result["article_errors"] += 1
+                    result["errors"].append(
+                        f"Article load error for {entry.url}: {load_result.error}"
+                    )
+        return loaded_entries
+
+    def ai_service(self) -> AIService:
+        """The AIService of the calling worker thread."""
+        if not hasattr(self.ai_services, "service"):
+            self.ai_services.service = AIService(
+                client=self.ai_client, cache=self.ai_cache, engine=self.ai_engine
             )
-            self.stdout.write(f"  Entries added: {result['entries_added']}")
-            self.stdout.write(f"  Articles loaded: {result['articles_loaded']}")
-            self.stdout.write(f"  Article load errors: {result['article_errors']}")
-            if result["errors"]:
-                self.stdout.write("  Errors:")
-                for error in result["errors"][: self.MAX_ERRORS_TO_SHOW]:
-                    self.stdout.write(f"   - {error}")
-                if len(result["errors"]) > self.MAX_ERRORS_TO_SHOW:
-                    remaining = len(result["errors"]) - self.MAX_ERRORS_TO_SHOW
-                    self.stdout.write(f"   ... and {remaining} more errors")
+        return self.ai_services.service
 
-        self.stdout.write("\n=== Summary ===")
-        self.stdout.write(
-            f"Total feeds processed: {len(feed_results)}\n"
-            f"  - RSS Feeds: {len(rss_feeds)}\n"
-            f"  - Website Feeds: {len(website_feeds)}\n"
-            f"Successful updates: {success_count}\n"
-            f"Failed updates: {error_count}\n"
-            f"Total new entries added: {total_entries}\n"
-            f"Total articles loaded: {total_articles_loaded}\n"
-            f"Total article load errors: {total_article_errors}"
-        )
+    def process_articles(self, entries):
+        """AI stage: summarize and score the loaded articles for their subscribers."""
+        AIService.process_entries_for_all_users(entries, ai_service=self.ai_service())
+        return entries
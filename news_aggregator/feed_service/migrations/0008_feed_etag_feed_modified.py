@@ -0,0 +1,23 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0007_remove_feedentry_title_translated_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='etag',
+            field=models.CharField(blank=True, default='', help_text='ETag returned by the last successful fetch, sent back as If-None-Match', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='modified',
+            field=models.CharField(blank=True, default='', help_text='Last-Modified returned by the last successful fetch, sent back as If-Modified-Since', max_length=100),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:17
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    """Keep the oldest entry for every (feed, url) pair so the constraint can be added."""
+    FeedEntry = apps.get_model("feed_service", "FeedEntry")
+    duplicates = (
+        FeedEntry.objects.values("feed_id", "url")
+        .annotate(keep_id=Min("id"), count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        FeedEntry.objects.filter(
+            feed_id=duplicate["feed_id"], url=duplicate["url"]
+        ).exclude(id=duplicate["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0008_feed_etag_feed_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('feed', 'url'), name='unique_feed_entry_url'),
+        ),
+    ]
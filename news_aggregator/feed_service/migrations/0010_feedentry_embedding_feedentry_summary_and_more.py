@@ -0,0 +1,28 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0009_feedentry_unique_feed_entry_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='embedding',
+            field=models.JSONField(blank=True, help_text='Embedding of the translated title and summary, if enabled', null=True),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='summary',
+            field=models.TextField(blank=True, default='', help_text='AI-generated general summary in English, shared by all users'),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='translated_title',
+            field=models.CharField(blank=True, default='', help_text='AI-translated or improved title in English, shared by all users', max_length=200),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0010_feedentry_embedding_feedentry_summary_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedLLMResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 of the model, messages and response format', max_length=64, unique=True)),
+                ('model', models.CharField(max_length=50)),
+                ('response', models.JSONField(help_text='Parsed structured output')),
+                ('hits', models.PositiveIntegerField(default=0, help_text='Number of API calls this entry has saved')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Cached LLM response',
+                'ordering': ['-last_used_at'],
+            },
+        ),
+    ]
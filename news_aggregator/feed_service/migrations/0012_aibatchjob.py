@@ -0,0 +1,34 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0011_cachedllmresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIBatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending submission'), ('submitted', 'Submitted'), ('ingested', 'Results ingested'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('model', models.CharField(max_length=50)),
+                ('requests', models.JSONField(help_text="Maps each request's custom_id to the entry and reader profiles it covers")),
+                ('input_file_id', models.CharField(blank=True, default='', max_length=100)),
+                ('batch_id', models.CharField(blank=True, default='', max_length=100)),
+                ('output_file_id', models.CharField(blank=True, default='', max_length=100)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'AI batch job',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
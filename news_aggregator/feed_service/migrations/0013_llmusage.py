@@ -0,0 +1,34 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0012_aibatchjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('purpose', models.CharField(db_index=True, help_text='Response format of the call', max_length=50)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('content_tokens', models.PositiveIntegerField(default=0, help_text='Article content tokens in the prompt, after trimming')),
+                ('content_truncated', models.BooleanField(default=False, help_text='Whether the article content was cut to the budget')),
+                ('batch', models.BooleanField(default=False, help_text='Whether the call ran through the Batch API')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_usage', to='feed_service.feedentry')),
+            ],
+            options={
+                'verbose_name': 'LLM usage',
+                'verbose_name_plural': 'LLM usage',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
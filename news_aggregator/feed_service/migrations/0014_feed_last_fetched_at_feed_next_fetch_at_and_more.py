@@ -0,0 +1,28 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0013_llmusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='last_fetched_at',
+            field=models.DateTimeField(blank=True, help_text='When the feed was last fetched, successfully or not', null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='next_fetch_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the feed is due to be fetched again, empty for new feeds', null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='publish_rate',
+            field=models.FloatField(blank=True, help_text='Estimated new entries per hour, a moving average over recent fetches', null=True),
+        ),
+    ]
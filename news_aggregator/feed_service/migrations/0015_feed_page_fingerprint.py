@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0014_feed_last_fetched_at_feed_next_fetch_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='page_fingerprint',
+            field=models.CharField(blank=True, default='', help_text='Hash of the news listing of a website feed when it was last scraped', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0015_feed_page_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='listing_selectors',
+            field=models.JSONField(blank=True, help_text='XPath selectors learned from the last Parsera scrape of a website feed', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0016_feed_listing_selectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='latest_entry_at',
+            field=models.DateTimeField(blank=True, help_text="Newest publish date among the feed's entries, its high-water mark", null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='recent_entry_hashes',
+            field=models.JSONField(blank=True, default=list, help_text="Hashes of the URLs of the feed's most recent entries"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.9 on 2026-10-17 04:56
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the entries table against writes
+    atomic = False
+
+    dependencies = [
+        ('feed_service', '0017_feed_latest_entry_at_feed_recent_entry_hashes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(fields=['published_at'], name='feedentry_published_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(fields=['feed', '-published_at'], name='feedentry_feed_published_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(condition=models.Q(('article_load_error', ''), ('article_loaded_at__isnull', True)), fields=['feed'], name='feedentry_pending_load_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(condition=models.Q(('article_load_error__gt', ''), ('article_loaded_at__isnull', True)), fields=['published_at'], name='feedentry_failed_load_idx'),
+        ),
+        # The composite index replaces the plain foreign key index once it's built
+        migrations.AlterField(
+            model_name='feedentry',
+            name='feed',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='feed_service.feed'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.9 on 2026-10-17 05:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the entries table against writes
+    atomic = False
+
+    dependencies = [
+        ('feed_service', '0018_feedentry_indexes'),
+    ]
+
+    # The new indexes are built before the ones they replace are dropped
+    operations = [
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(fields=['-published_at', '-id'], name='feedentry_stream_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='feedentry',
+            index=models.Index(fields=['feed', '-published_at', '-id'], name='feedentry_feed_stream_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='feedentry',
+            name='feedentry_published_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='feedentry',
+            name='feedentry_feed_published_idx',
+        ),
+    ]
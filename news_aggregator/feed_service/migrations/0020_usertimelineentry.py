@@ -0,0 +1,102 @@
+# Generated by Django 5.0.9 on 2026-10-17 05:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# Same as timeline.SNIPPET_WORDS and timeline.BATCH_SIZE
+SNIPPET_WORDS = 50
+BATCH_SIZE = 1000
+
+
+def build_timelines(apps, schema_editor):
+    """
+    Fill the timelines of the existing active subscriptions, the same rows
+    timeline.add_feed writes. rank_score is computed by the next migration.
+    """
+    FeedEntry = apps.get_model("feed_service", "FeedEntry")
+    UserArticleInteraction = apps.get_model("feed_service", "UserArticleInteraction")
+    UserFeedSubscription = apps.get_model("feed_service", "UserFeedSubscription")
+    UserTimelineEntry = apps.get_model("feed_service", "UserTimelineEntry")
+    title_length = UserTimelineEntry._meta.get_field("title").max_length
+
+    subscriptions = UserFeedSubscription.objects.filter(is_active=True)
+    for user_id, feed_id in list(subscriptions.values_list("user_id", "feed_id")):
+        interactions = {
+            interaction.entry_id: interaction
+            for interaction in UserArticleInteraction.objects.filter(
+                user_id=user_id, entry__feed_id=feed_id
+            )
+        }
+        entries = FeedEntry.objects.filter(feed_id=feed_id).only(
+            "feed_id",
+            "published_at",
+            "title",
+            "translated_title",
+            "url",
+            "summary",
+            "full_content",
+        )
+        rows = []
+        for entry in entries.iterator(chunk_size=BATCH_SIZE):
+            interaction = interactions.get(entry.pk)
+            title = (
+                (interaction and interaction.translated_title)
+                or entry.translated_title
+                or entry.title
+            )
+            summary = (
+                (interaction and interaction.custom_summary)
+                or entry.summary
+                or Truncator(entry.full_content).words(SNIPPET_WORDS)
+            )
+            rows.append(
+                UserTimelineEntry(
+                    user_id=user_id,
+                    entry_id=entry.pk,
+                    feed_id=feed_id,
+                    published_at=entry.published_at,
+                    title=title[:title_length],
+                    url=entry.url,
+                    summary=summary,
+                    relevance_score=interaction.relevance_score if interaction else 0,
+                )
+            )
+        UserTimelineEntry.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed_service', '0019_feedentry_stream_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_at', models.DateTimeField()),
+                ('title', models.CharField(help_text='Translated title for the user, or the original one', max_length=200)),
+                ('url', models.URLField()),
+                ('summary', models.TextField(blank=True, default='', help_text='Custom summary, general summary or start of the content, whichever exists')),
+                ('relevance_score', models.IntegerField(default=0, help_text='Relevance score for the user, 0 until analyzed')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='feed_service.feedentry')),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='feed_service.feed')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-published_at'],
+                'indexes': [models.Index(fields=['user', '-published_at', '-id'], name='timeline_stream_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usertimelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'entry'), name='unique_user_timeline_entry'),
+        ),
+        migrations.RunPython(build_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.9 on 2026-10-17 05:12
+
+import math
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.db.models.functions import Extract
+from django.db.models.functions import Ln
+
+
+def compute_rank_scores(apps, schema_editor):
+    """Same formula as timeline.rank_score, computed in the database."""
+    UserTimelineEntry = apps.get_model("feed_service", "UserTimelineEntry")
+    half_life = settings.HOME_TOP_STORIES_HALF_LIFE * 3600
+    UserTimelineEntry.objects.update(
+        rank_score=Ln(Cast(F("relevance_score") + 1, FloatField())) / math.log(2)
+        + Cast(Extract("published_at", "epoch"), FloatField()) / half_life
+    )
+
+
+class Migration(migrations.Migration):
+    # Build the index without locking the timelines against writes
+    atomic = False
+
+    dependencies = [
+        ('feed_service', '0020_usertimelineentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertimelineentry',
+            name='rank_score',
+            field=models.FloatField(default=0, help_text='Time-decayed relevance the top stories are ordered by, see timeline.rank_score'),
+        ),
+        migrations.RunPython(compute_rank_scores, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='usertimelineentry',
+            index=models.Index(fields=['user', '-rank_score', '-id'], name='timeline_rank_idx'),
+        ),
+    ]
@@ -21,6 +21,57 @@ class Feed(models.Model):
         default=FEED_TYPE_RSS,
         help_text="Type of feed source",
     )
+    etag = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="ETag returned by the last successful fetch, sent back as If-None-Match",
+    )
+    modified = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="Last-Modified returned by the last successful fetch, sent back as If-Modified-Since",
+    )
+    page_fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="Hash of the news listing of a website feed when it was last scraped",
+    )
+    listing_selectors = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="XPath selectors learned from the last Parsera scrape of a website feed",
+    )
+    # Known entries are dropped while parsing, see FeedService.known_entries
+    latest_entry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Newest publish date among the feed's entries, its high-water mark",
+    )
+    recent_entry_hashes = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Hashes of the URLs of the feed's most recent entries",
+    )
+    # Adaptive polling, see feed_service.scheduling
+    publish_rate = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Estimated new entries per hour, a moving average over recent fetches",
+    )
+    last_fetched_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the feed was last fetched, successfully or not",
+    )
+    next_fetch_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When the feed is due to be fetched again, empty for new feeds",
+    )
 
     class Meta:
         app_label = "feed_service"
@@ -31,7 +82,10 @@ class Feed(models.Model):
 
 
 class FeedEntry(models.Model):
-    feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name="entries")
+    # Indexed as the leading column of feedentry_feed_stream_idx
+    feed = models.ForeignKey(
+        Feed, on_delete=models.CASCADE, related_name="entries", db_index=False
+    )
     title = models.CharField(max_length=200)
     url = models.URLField()
     full_content = models.TextField(
@@ -53,10 +107,57 @@ class FeedEntry(models.Model):
         blank=True,
         help_text="When the entry was last processed by AI",
     )
+    translated_title = models.CharField(
+        max_length=200,
+        blank=True,
+        default="",
+        help_text="AI-translated or improved title in English, shared by all users",
+    )
+    summary = models.TextField(
+        blank=True,
+        default="",
+        help_text="AI-generated general summary in English, shared by all users",
+    )
+    embedding = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Embedding of the translated title and summary, if enabled",
+    )
 
     class Meta:
         ordering = ["-published_at"]
         verbose_name_plural = "Feed entries"
+        # The unique constraint also serves (feed, url) lookups
+        constraints = [
+            models.UniqueConstraint(
+                fields=["feed", "url"], name="unique_feed_entry_url"
+            ),
+        ]
+        indexes = [
+            # Time windows of the management commands and AI planning
+            models.Index(fields=["-published_at", "-id"], name="feedentry_stream_idx"),
+            # Entries of a feed, newest first (feed pages)
+            models.Index(
+                fields=["feed", "-published_at", "-id"],
+                name="feedentry_feed_stream_idx",
+            ),
+            # Entries whose article still has to be loaded
+            models.Index(
+                fields=["feed"],
+                condition=models.Q(
+                    article_loaded_at__isnull=True, article_load_error=""
+                ),
+                name="feedentry_pending_load_idx",
+            ),
+            # Entries whose article failed to load, for retry_failed_articles
+            models.Index(
+                fields=["published_at"],
+                condition=models.Q(
+                    article_loaded_at__isnull=True, article_load_error__gt=""
+                ),
+                name="feedentry_failed_load_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -110,3 +211,156 @@ class UserArticleInteraction(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.entry.title}"
+
+
+class UserTimelineEntry(models.Model):
+    """
+    An entry of a user's home page, with everything the page shows of it.
+    Rows are written as entries are ingested and analyzed, and as the user
+    subscribes to and unsubscribes from feeds, see feed_service.timeline.
+    """
+
+    # Indexed as the leading column of timeline_stream_idx
+    user = models.ForeignKey(
+        "users.User", on_delete=models.CASCADE, related_name="timeline", db_index=False
+    )
+    entry = models.ForeignKey(
+        FeedEntry, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    feed = models.ForeignKey(
+        Feed, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    published_at = models.DateTimeField()
+    title = models.CharField(
+        max_length=200, help_text="Translated title for the user, or the original one"
+    )
+    url = models.URLField()
+    summary = models.TextField(
+        blank=True,
+        default="",
+        help_text="Custom summary, general summary or start of the content, whichever exists",
+    )
+    relevance_score = models.IntegerField(
+        default=0, help_text="Relevance score for the user, 0 until analyzed"
+    )
+    rank_score = models.FloatField(
+        default=0,
+        help_text="Time-decayed relevance the top stories are ordered by, see timeline.rank_score",
+    )
+
+    class Meta:
+        ordering = ["-published_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "entry"], name="unique_user_timeline_entry"
+            ),
+        ]
+        indexes = [
+            # A user's timeline, newest first, keyed like the news stream cursor
+            models.Index(
+                fields=["user", "-published_at", "-id"], name="timeline_stream_idx"
+            ),
+            # A user's top stories, best first
+            models.Index(
+                fields=["user", "-rank_score", "-id"], name="timeline_rank_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
+
+
+class CachedLLMResponse(models.Model):
+    """Parsed LLM response stored under a hash of the request that produced it."""
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the model, messages and response format",
+    )
+    model = models.CharField(max_length=50)
+    response = models.JSONField(help_text="Parsed structured output")
+    hits = models.PositiveIntegerField(
+        default=0, help_text="Number of API calls this entry has saved"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+        verbose_name = "Cached LLM response"
+
+    def __str__(self):
+        return f"{self.model} - {self.key[:12]}"
+
+
+class AIBatchJob(models.Model):
+    """A set of AI requests submitted through the OpenAI Batch API."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending submission"
+        SUBMITTED = "submitted", "Submitted"
+        INGESTED = "ingested", "Results ingested"
+        FAILED = "failed", "Failed"
+
+    UNFINISHED = (Status.PENDING, Status.SUBMITTED)
+
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    model = models.CharField(max_length=50)
+    requests = models.JSONField(
+        help_text="Maps each request's custom_id to the entry and reader profiles it covers"
+    )
+    input_file_id = models.CharField(max_length=100, blank=True, default="")
+    batch_id = models.CharField(max_length=100, blank=True, default="")
+    output_file_id = models.CharField(max_length=100, blank=True, default="")
+    request_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "AI batch job"
+
+    def __str__(self):
+        return f"{self.batch_id or 'unsubmitted'} ({self.get_status_display()})"
+
+
+class LLMUsage(models.Model):
+    """Tokens used by a single LLM call, to see where the spend goes."""
+
+    model = models.CharField(max_length=50)
+    purpose = models.CharField(
+        max_length=50, help_text="Response format of the call", db_index=True
+    )
+    entry = models.ForeignKey(
+        FeedEntry,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="llm_usage",
+    )
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    content_tokens = models.PositiveIntegerField(
+        default=0, help_text="Article content tokens in the prompt, after trimming"
+    )
+    content_truncated = models.BooleanField(
+        default=False, help_text="Whether the article content was cut to the budget"
+    )
+    batch = models.BooleanField(
+        default=False, help_text="Whether the call ran through the Batch API"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "LLM usage"
+        verbose_name_plural = "LLM usage"
+
+    def __str__(self):
+        return f"{self.model} {self.purpose} - {self.prompt_tokens + self.completion_tokens} tokens"
@@ -0,0 +1,215 @@
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # Tells a worker that its input is exhausted
+
+
+@dataclass
+class Stage:
+    """
+    One step of a Pipeline.
+    func receives a list of up to batch_size items and returns the items to
+    pass on to the next stage (or None). Each stage runs its own worker
+    threads and reads from a bounded queue of queue_size items, so a slow
+    stage blocks the stages before it instead of piling up work in memory.
+    """
+
+    name: str
+    func: Callable[[list], Iterable | None]
+    workers: int = 1
+    queue_size: int = 100
+    batch_size: int = 1
+    # How long a worker waits to fill a batch once it has its first item
+    batch_timeout: float = 0.5
+
+
+@dataclass
+class StageStats:
+    """Counters of a stage, collected while the pipeline runs"""
+
+    name: str
+    workers: int
+    queue_size: int
+    items_in: int = 0
+    items_out: int = 0
+    batches: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0  # Summed over workers, time spent in func
+    blocked_seconds: float = 0.0  # Time spent waiting for room downstream
+    max_queue_depth: int = 0
+    queue_depth_samples: list[int] = field(default_factory=list, repr=False)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def sample_queue(self, depth: int) -> None:
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self.queue_depth_samples.append(depth)
+
+    def record_batch(self, size: int, busy: float, error: bool = False) -> None:
+        with self._lock:
+            self.items_in += size
+            self.batches += 1
+            self.busy_seconds += busy
+            self.errors += int(error)
+
+    def record_output(self, blocked: float) -> None:
+        with self._lock:
+            self.items_out += 1
+            self.blocked_seconds += blocked
+
+    @property
+    def elapsed(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second of wall time."""
+        return self.items_in / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """Share of the workers' time spent doing work, close to 1 for a bottleneck."""
+        capacity = self.elapsed * self.workers
+        return self.busy_seconds / capacity if capacity else 0.0
+
+    @property
+    def average_queue_depth(self) -> float:
+        samples = self.queue_depth_samples
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def report_line(self) -> str:
+        return (
+            f"{self.name:<10} workers={self.workers:<3} in={self.items_in:<6} "
+            f"out={self.items_out:<6} errors={self.errors:<4} "
+            f"{self.throughput:7.2f} items/s  busy={self.utilization:4.0%}  "
+            f"queue avg={self.average_queue_depth:.1f} max={self.max_queue_depth}/{self.queue_size}  "
+            f"blocked={self.blocked_seconds:.1f}s  "
+            f"avg batch time={self.busy_seconds / self.batches if self.batches else 0:.2f}s"
+        )
+
+
+class Pipeline:
+    """
+    Run items through a chain of stages connected by bounded queues.
+    Every stage has its own worker threads, so a slow stage (e.g. LLM calls)
+    doesn't stop the earlier ones until its input queue is full, and a full
+    queue pushes back all the way to the source.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = stages
+        self.queues: list[queue.Queue] = [
+            queue.Queue(maxsize=stage.queue_size) for stage in stages
+        ]
+        self.stats = [
+            StageStats(
+                name=stage.name, workers=stage.workers, queue_size=stage.queue_size
+            )
+            for stage in stages
+        ]
+        self._remaining_workers = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+
+    def _put(self, index: int, item: Any) -> float:
+        """Queue an item for stage `index`. Returns the time spent blocked."""
+        started = time.monotonic()
+        self.queues[index].put(item)
+        blocked = time.monotonic() - started
+        self.stats[index].sample_queue(self.queues[index].qsize())
+        return blocked
+
+    def _next_batch(self, index: int) -> tuple[list, bool]:
+        """Take the next batch for stage `index`. Returns (items, input exhausted)."""
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        item = inbox.get()
+        if item is _DONE:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + stage.batch_timeout
+        while len(batch) < stage.batch_size:
+            try:
+                item = inbox.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, index: int) -> None:
+        stage = self.stages[index]
+        stats = self.stats[index]
+        has_next = index + 1 < len(self.stages)
+        try:
+            exhausted = False
+            while not exhausted:
+                batch, exhausted = self._next_batch(index)
+                if not batch:
+                    continue
+
+                started = time.monotonic()
+                try:
+                    outputs = list(stage.func(batch) or [])
+                except Exception as e:
+                    logger.exception(f"Stage {stage.name} failed on a batch: {str(e)}")
+                    stats.record_batch(len(batch), time.monotonic() - started, True)
+                    continue
+                stats.record_batch(len(batch), time.monotonic() - started)
+
+                for output in outputs:
+                    blocked = self._put(index + 1, output) if has_next else 0.0
+                    stats.record_output(blocked)
+        finally:
+            # Each thread has its own database connection
+            connections.close_all()
+            self._worker_finished(index)
+
+    def _worker_finished(self, index: int) -> None:
+        with self._lock:
+            self._remaining_workers[index] -= 1
+            last = self._remaining_workers[index] == 0
+        if not last:
+            # Pass the end marker on to the other workers of this stage
+            self.queues[index].put(_DONE)
+            return
+
+        self.stats[index].finished_at = time.monotonic()
+        if index + 1 < len(self.stages):
+            self.queues[index + 1].put(_DONE)
+
+    def run(self, source: Iterable) -> list[StageStats]:
+        """Feed every item of source into the first stage and wait until all stages are drained."""
+        threads = []
+        started = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            self.stats[index].started_at = started
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(index,), name=f"{stage.name}-{n}"
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                self._put(0, item)
+        finally:
+            self.queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        return self.stats
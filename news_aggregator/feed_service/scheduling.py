@@ -0,0 +1,95 @@
+"""
+Adaptive polling schedule of feeds.
+
+Every feed keeps an estimate of how many entries it publishes per hour, an
+exponentially weighted moving average of the new entries found by each fetch.
+A feed is polled about once per FEED_POLL_TARGET_ENTRIES expected entries,
+within [FEED_POLL_MIN_INTERVAL, FEED_POLL_MAX_INTERVAL]: busy feeds are polled
+often, quiet and dead ones back off to the maximum interval.
+Caching headers of the response (Cache-Control max-age, Expires, Retry-After)
+push the next fetch back when the publisher asks for it.
+"""
+
+import re
+from collections.abc import Mapping
+from datetime import datetime
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+MAX_AGE_PATTERN = re.compile(r"(?:^|,)\s*(?:s-)?max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def update_publish_rate(
+    rate: float | None, new_entries: int, elapsed: timedelta
+) -> float | None:
+    """
+    Fold the new entries found after `elapsed` time into the publish rate
+    estimate, in entries per hour. The first observation replaces an unknown
+    (None) rate as is.
+    """
+    hours = elapsed.total_seconds() / 3600
+    if hours <= 0:
+        return rate
+    observed = new_entries / hours
+    if rate is None:
+        return observed
+    alpha = settings.FEED_POLL_RATE_SMOOTHING
+    return alpha * observed + (1 - alpha) * rate
+
+
+def poll_interval(rate: float | None) -> timedelta:
+    """Time until a feed publishing `rate` entries per hour is expected to have new entries."""
+    minimum = timedelta(minutes=settings.FEED_POLL_MIN_INTERVAL)
+    maximum = timedelta(minutes=settings.FEED_POLL_MAX_INTERVAL)
+    if rate is None:
+        interval = timedelta(minutes=settings.FEED_POLL_DEFAULT_INTERVAL)
+    elif rate <= 0:
+        interval = maximum
+    else:
+        interval = timedelta(hours=settings.FEED_POLL_TARGET_ENTRIES / rate)
+    return min(max(interval, minimum), maximum)
+
+
+def cache_lifetime(headers: Mapping[str, str], now: datetime) -> timedelta:
+    """
+    How long the response headers ask clients to wait before fetching again:
+    the longest of Cache-Control max-age, Expires and Retry-After.
+    Header names are expected in lower case, as httpx returns them.
+    """
+    lifetimes = [timedelta(0)]
+
+    cache_control = headers.get("cache-control", "")
+    if "no-cache" not in cache_control and "no-store" not in cache_control:
+        if match := MAX_AGE_PATTERN.search(cache_control):
+            lifetimes.append(timedelta(seconds=int(match.group(1))))
+        elif expires := _parse_http_date(headers.get("expires", "")):
+            lifetimes.append(expires - now)
+
+    retry_after = headers.get("retry-after", "").strip()
+    if retry_after.isdigit():
+        lifetimes.append(timedelta(seconds=int(retry_after)))
+    elif retry_at := _parse_http_date(retry_after):
+        lifetimes.append(retry_at - now)
+
+    return max(lifetimes)
+
+
+def _parse_http_date(value: str) -> datetime | None:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # Dates without a zone can't be compared with the aware current time
+    return parsed if parsed.tzinfo is not None else None
+
+
+def next_fetch_time(
+    now: datetime, rate: float | None, headers: Mapping[str, str] | None = None
+) -> datetime:
+    """When to fetch a feed next, never later than FEED_POLL_MAX_INTERVAL from now."""
+    interval = poll_interval(rate)
+    if headers:
+        interval = max(interval, cache_lifetime(headers, now))
+    return now + min(interval, timedelta(minutes=settings.FEED_POLL_MAX_INTERVAL))
@@ -1,24 +1,70 @@
+import hashlib
 import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Sequence
 from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from typing import TYPE_CHECKING
 from typing import Optional
+from typing import TypeVar
+from typing import cast
 from urllib.parse import urlparse
 
 import feedparser
 from django.conf import settings
+from django.db import models
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import F
+from django.db.models import OuterRef
 from django.utils import timezone
 from feedparser import FeedParserDict
-from newspaper import Article
 from openai import OpenAI
 from parsera import Parsera
 from pydantic import BaseModel
 
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.extraction import extract_listing
+from news_aggregator.feed_service.extraction import learn_listing_selectors
+from news_aggregator.feed_service.extraction import listing_fingerprint
+from news_aggregator.feed_service.extraction import normalize_link
+from news_aggregator.feed_service.fetcher import FeedFetcher
+from news_aggregator.feed_service.fetcher import FetchResult
+from news_aggregator.feed_service.interactions import InteractionWriter
+from news_aggregator.feed_service.llm import AsyncLLMEngine
+from news_aggregator.feed_service.llm import BatchAPI
+from news_aggregator.feed_service.llm import LLMResult
+from news_aggregator.feed_service.llm import ResponseCache
+from news_aggregator.feed_service.models import AIBatchJob
 from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import LLMUsage
 from news_aggregator.feed_service.models import UserFeedSubscription
 from news_aggregator.feed_service.models import Feed
 from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.scheduling import next_fetch_time
+from news_aggregator.feed_service.scheduling import update_publish_rate
+from news_aggregator.feed_service.streaming import StreamingFeedParser
+from news_aggregator.feed_service.streaming import UnsupportedFeed
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.tokens import PreparedContent
+from news_aggregator.feed_service.tokens import prepare_content
+
+if TYPE_CHECKING:
+    from news_aggregator.users.models import User
 
 logger = logging.getLogger(__name__)
 
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+def _max_length(model: type[models.Model], field_name: str) -> int:
+    """max_length of a CharField of a model."""
+    field = model._meta.get_field(field_name)
+    assert isinstance(field, models.CharField) and field.max_length is not None
+    return field.max_length
+
 
 @dataclass
 class FeedParseResult:
@@ -28,6 +74,8 @@ class FeedParseResult:
     description: str
     entries: list[dict]
     is_website: bool
+    # Parsing stopped at entries the feed already has, see stream_rss_feed
+    skipped_known: bool = False
 
 
 @dataclass
@@ -45,14 +93,36 @@ class FeedPreview:
 
 
 class FeedService:
+    # Fields set by schedule_next_fetch
+    SCHEDULE_FIELDS = ["publish_rate", "last_fetched_at", "next_fetch_at"]
+
     @staticmethod
-    def parse_rss_feed(url: str) -> FeedParseResult:
+    def parse_rss_feed(
+        url: str,
+        fetched: FetchResult | None = None,
+        is_known: Callable[[dict], bool] | None = None,
+    ) -> FeedParseResult:
         """
-        Parse a URL as an RSS feed using feedparser.
+        Parse a URL as an RSS feed.
+        If a FetchResult is given, its downloaded bytes are parsed instead of
+        letting feedparser fetch the URL itself, and RSS 2.0 and Atom
+        documents are streamed entry by entry, see stream_rss_feed.
+        Entries for which is_known is true are left out.
         Returns a FeedParseResult with normalized feed data.
         Raises ValueError if parsing fails or feed is invalid.
         """
-        parsed = feedparser.parse(url)
+        if fetched is not None and not fetched.error:
+            try:
+                return FeedService.stream_rss_feed(url, fetched.content, is_known)
+            except UnsupportedFeed as e:
+                logger.debug(f"Falling back to feedparser for {url}: {str(e)}")
+
+        if fetched is None:
+            parsed = feedparser.parse(url)
+        elif fetched.error:
+            raise ValueError(fetched.error)
+        else:
+            parsed = feedparser.parse(fetched.content, response_headers=fetched.headers)
         if parsed.bozo and not parsed.entries:
             raise ValueError(
                 "Invalid RSS feed format. If this is a regular website, try unchecking 'This is an RSS feed'"
@@ -83,13 +153,111 @@ class FeedService:
                 "No valid entries found in the RSS feed. If this is a regular website, try unchecking 'This is an RSS feed'"
             )
 
+        skipped_known = False
+        if is_known is not None:
+            new_entries = [entry for entry in entries if not is_known(entry)]
+            skipped_known = len(new_entries) < len(entries)
+            entries = new_entries
+
         return FeedParseResult(
             title=feed_data.get("title") or urlparse(url).netloc,
             description=feed_data.get("description", ""),
             entries=entries,
             is_website=False,
+            skipped_known=skipped_known,
         )
 
+    @staticmethod
+    def stream_rss_feed(
+        url: str, content: bytes, is_known: Callable[[dict], bool] | None = None
+    ) -> FeedParseResult:
+        """
+        Parse an RSS 2.0 or Atom document with the StreamingFeedParser.
+        Feeds list their newest entries first, so reading stops after
+        FEED_STREAM_STOP_AFTER_KNOWN entries in a row for which is_known is
+        true. Known entries are left out.
+        Raises UnsupportedFeed for documents feedparser has to handle.
+        """
+        parser = StreamingFeedParser(content)
+        entries = []
+        known_in_a_row = 0
+        skipped_known = False
+        for entry in parser.entries():
+            if not entry["title"] or not entry["link"]:
+                continue
+            if is_known is not None and is_known(entry):
+                skipped_known = True
+                known_in_a_row += 1
+                if known_in_a_row >= settings.FEED_STREAM_STOP_AFTER_KNOWN:
+                    break
+                continue
+            known_in_a_row = 0
+            entries.append(entry)
+
+        if not entries and not skipped_known:
+            raise ValueError(
+                "No valid entries found in the RSS feed. If this is a regular website, try unchecking 'This is an RSS feed'"
+            )
+
+        return FeedParseResult(
+            title=parser.title or urlparse(url).netloc,
+            description=parser.description,
+            entries=entries,
+            is_website=False,
+            skipped_known=skipped_known,
+        )
+
+    @staticmethod
+    def entry_hash(url: str) -> str:
+        """Short hash of an entry URL, for Feed.recent_entry_hashes."""
+        return hashlib.sha1(url.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def known_entries(feed: Feed) -> Callable[[dict], bool]:
+        """
+        Build the is_known check of parse_rss_feed from the feed's stored
+        state, without querying its entries: an entry is known when its URL
+        hash is among the feed's recent_entry_hashes, or when it was
+        published before latest_entry_at (the feed's high-water mark).
+        Entries published at the mark itself are only known by their hash:
+        date-only pubDates and batches of items often share a timestamp.
+        """
+        known_hashes = set(feed.recent_entry_hashes)
+        high_water_mark = feed.latest_entry_at
+
+        def is_known(entry: dict) -> bool:
+            if FeedService.entry_hash(entry["link"]) in known_hashes:
+                return True
+            published = entry.get("published_parsed")
+            if high_water_mark is None or published is None:
+                return False
+            return datetime(*published[:6]).replace(tzinfo=UTC) < high_water_mark
+
+        return is_known
+
+    @staticmethod
+    def remember_entries(feed: Feed, entries: list[dict]) -> None:
+        """
+        Move the feed's high-water mark and recent URL hashes past new
+        entries (fields are not saved). Dates in the future don't move the
+        mark beyond now, or they would hide every entry until then.
+        """
+        hashes = [FeedService.entry_hash(entry["link"]) for entry in entries]
+        feed.recent_entry_hashes = list(
+            dict.fromkeys([*hashes, *feed.recent_entry_hashes])
+        )[: settings.FEED_RECENT_ENTRY_HASHES]
+
+        now = timezone.now()
+        published = [
+            min(datetime(*entry["published_parsed"][:6]).replace(tzinfo=UTC), now)
+            for entry in entries
+            if entry.get("published_parsed")
+        ]
+        if feed.latest_entry_at is not None:
+            published.append(feed.latest_entry_at)
+        if published:
+            feed.latest_entry_at = max(published)
+
     @staticmethod
     def parse_website(url: str) -> FeedParseResult:
         """
@@ -145,7 +313,8 @@ class FeedService:
                 entries.append(
                     {
                         "title": title,
-                        "link": link,
+                        # The form learned selectors extract, see scrape_website
+                        "link": normalize_link(url, link),
                         "description": (entry.get("subtitle") or "").strip(),
                         "author": (entry.get("author") or "").strip(),
                         "published": (entry.get("publish_date") or "").strip(),
@@ -169,13 +338,17 @@ class FeedService:
             raise ValueError(str(e))
 
     @staticmethod
-    def parse_feed(url: str, is_rss: bool = True) -> FeedParseResult:
+    def parse_feed(
+        url: str, is_rss: bool = True, fetched: FetchResult | None = None
+    ) -> FeedParseResult:
         """
         Parse a URL as either an RSS feed or website based on is_rss parameter.
-        This is the main entry point for feed parsing.
+        This is the main entry point for feed parsing. A pre-downloaded
+        FetchResult is only used for RSS feeds, Parsera loads websites itself
+        in a browser.
         """
         if is_rss:
-            return FeedService.parse_rss_feed(url)
+            return FeedService.parse_rss_feed(url, fetched=fetched)
         return FeedService.parse_website(url)
 
     @staticmethod
@@ -206,11 +379,16 @@ class FeedService:
             )
 
     @staticmethod
-    def create_feed_entry(feed: Feed, entry_data: dict) -> FeedEntry:
+    def build_feed_entry(feed: Feed, entry_data: dict) -> FeedEntry:
         """
-        Create a new FeedEntry from parsed entry data.
+        Build an unsaved FeedEntry from parsed entry data.
         Handles both RSS and website entry formats.
+        Raises ValueError if the entry can't be stored.
         """
+        url = (entry_data.get("link") or "").strip()
+        if len(url) > _max_length(FeedEntry, "url"):
+            raise ValueError("Entry URL is too long")
+
         # Handle the published date based on entry format
         if "published_parsed" in entry_data:
             # RSS format
@@ -227,15 +405,82 @@ class FeedService:
                 else timezone.now()
             )
 
-        return FeedEntry.objects.create(
+        return FeedEntry(
             feed=feed,
-            title=entry_data.get("title", ""),
-            url=entry_data.get("link", ""),
+            title=entry_data.get("title", "")[
+                : FeedEntry._meta.get_field("title").max_length
+            ],
+            url=url,
             full_content=entry_data.get("description", ""),
-            author=entry_data.get("author") or "",
+            author=(entry_data.get("author") or "")[
+                : FeedEntry._meta.get_field("author").max_length
+            ],
             published_at=published_at,
         )
 
+    @staticmethod
+    def create_feed_entry(feed: Feed, entry_data: dict) -> FeedEntry:
+        """
+        Create a new FeedEntry from parsed entry data.
+        Handles both RSS and website entry formats.
+        """
+        entry = FeedService.build_feed_entry(feed, entry_data)
+        entry.save()
+        timeline.fan_out([entry])
+        return entry
+
+    @staticmethod
+    def bulk_create_feed_entries(
+        feed: Feed, entries: list[dict]
+    ) -> tuple[int, list[str]]:
+        """
+        Insert the given parsed entries that the feed doesn't have yet.
+        Existing URLs are looked up with a single query and the new rows are
+        written with a single bulk_create. The unique (feed, url) constraint
+        plus ignore_conflicts keeps concurrent updates of the same feed from
+        creating duplicates, and rows another update inserted first aren't
+        counted. The new entries are added to the timelines of the
+        feed's subscribers.
+        Returns a tuple of (number of new entries added, list of errors if any)
+        """
+        errors: list[str] = []
+        candidates = {}
+        for entry in entries:
+            url = (entry.get("link") or "").strip()
+            if url and url not in candidates:
+                candidates[url] = entry
+
+        if not candidates:
+            return 0, errors
+
+        existing_urls = set(
+            feed.entries.filter(url__in=list(candidates)).values_list("url", flat=True)
+        )
+
+        new_entries = []
+        for url, entry in candidates.items():
+            if url in existing_urls:
+                continue
+            try:
+                new_entries.append(FeedService.build_feed_entry(feed, entry))
+            except Exception as entry_error:
+                errors.append(f"Error adding entry {url}: {str(entry_error)}")
+
+        if not new_entries:
+            return 0, errors
+        FeedEntry.objects.bulk_create(new_entries, ignore_conflicts=True)
+
+        # Rows skipped on conflict get no primary key. Read the rows back and
+        # keep the ones written here, recognized by their creation time.
+        written = {entry.url: entry.created_at for entry in new_entries}
+        created = [
+            entry
+            for entry in feed.entries.filter(url__in=list(written)).defer("embedding")
+            if entry.created_at == written[entry.url]
+        ]
+        timeline.fan_out(created)
+        return len(created), errors
+
     @staticmethod
     def preview_feed(feed_url: str, is_rss: bool = True) -> FeedPreview:
         """
@@ -300,75 +545,153 @@ class FeedService:
         )
 
         # Add up to 10 most recent entries
-        for entry in parsed.entries[:10]:
-            FeedService.create_feed_entry(feed, entry)
+        FeedService.bulk_create_feed_entries(feed, parsed.entries[:10])
 
         return feed
 
     @staticmethod
-    def update_feed(feed: Feed) -> tuple[int, list[str]]:
+    def update_feed(
+        feed: Feed, fetched: FetchResult | None = None
+    ) -> tuple[int, list[str]]:
         """
         Update a feed with new entries.
+        Pass the feed's FetchResult when it was already downloaded by the
+        FeedFetcher, otherwise the feed is fetched synchronously.
+        Feeds are fetched with the stored ETag/Last-Modified validators, a
+        304 Not Modified response skips parsing entirely. Website feeds are
+        only scraped when the fingerprint of their news listing differs from
+        the one of the last scrape, see scrape_website.
         Returns a tuple of (number of new entries added, list of errors if any)
         """
-        errors = []
+        errors: list[str] = []
         new_entries_count = 0
 
         try:
             # Use the feed's stored type to determine parsing method
             is_rss = feed.feed_type == Feed.FEED_TYPE_RSS
-            parsed = FeedService.parse_feed(feed.url, is_rss=is_rss)
-            FeedService.validate_feed_data(
-                {"feed": {"title": parsed.title}, "entries": parsed.entries}
-            )
-
-            for entry in parsed.entries:
-                url = entry.get("link", "").strip()
-                if not url or feed.entries.filter(url=url).exists():
-                    continue
-
-                try:
-                    FeedService.create_feed_entry(feed, entry)
-                    new_entries_count += 1
-                except Exception as entry_error:
-                    errors.append(f"Error adding entry {url}: {str(entry_error)}")
+            if fetched is None:
+                fetched = FeedFetcher().fetch(
+                    [feed.url], {feed.url: (feed.etag, feed.modified)}
+                )[feed.url]
+
+            fingerprint = ""
+            if not is_rss and fetched.ok:
+                fingerprint = listing_fingerprint(fetched.content, feed.url)
+
+            if fetched.not_modified or (
+                fingerprint and fingerprint == feed.page_fingerprint
+            ):
+                feed.last_updated = FeedService.schedule_next_fetch(feed, 0, fetched)
+                feed.save(update_fields=["last_updated", *FeedService.SCHEDULE_FIELDS])
+                return new_entries_count, errors
+
+            if is_rss:
+                parsed = FeedService.parse_rss_feed(
+                    feed.url, fetched=fetched, is_known=FeedService.known_entries(feed)
+                )
+            else:
+                parsed = FeedService.scrape_website(feed, fetched)
+            if not parsed.skipped_known:
+                FeedService.validate_feed_data(
+                    {"feed": {"title": parsed.title}, "entries": parsed.entries}
+                )
 
-            feed.last_updated = timezone.now()
+            new_entries_count, entry_errors = FeedService.bulk_create_feed_entries(
+                feed, parsed.entries
+            )
+            errors.extend(entry_errors)
+            if is_rss:
+                FeedService.remember_entries(feed, parsed.entries)
+
+            feed.etag = FeedService.validator(fetched.etag, "etag")
+            feed.modified = FeedService.validator(fetched.modified, "modified")
+            feed.page_fingerprint = fingerprint
+            feed.last_updated = FeedService.schedule_next_fetch(
+                feed, new_entries_count, fetched
+            )
             feed.save()
 
         except Exception as e:
             errors.append(f"Error updating feed: {str(e)}")
+            # A failing feed backs off like a feed without new entries
+            FeedService.schedule_next_fetch(feed, 0, fetched)
+            feed.save(update_fields=FeedService.SCHEDULE_FIELDS)
 
         return new_entries_count, errors
 
     @staticmethod
-    def load_article_content(entry: FeedEntry) -> tuple[bool, str]:
+    def validator(value: str, field_name: str) -> str:
         """
-        Load the full article content for a feed entry using newspaper3k.
-        Returns a tuple of (success, error_message).
+        A cache validator response header to store on the feed, or "" if it
+        doesn't fit its field, which makes the next fetch unconditional
+        instead of failing to save the feed.
         """
-        if entry.article_loaded_at:
-            return True, ""
+        if len(value) > _max_length(Feed, field_name):
+            return ""
+        return value
 
-        try:
-            article = Article(entry.url)
-            article.download()
-            article.parse()
+    @staticmethod
+    def scrape_website(feed: Feed, fetched: FetchResult) -> FeedParseResult:
+        """
+        Extract the entries of a website feed.
+        The feed's learned selectors are tried on the downloaded page first;
+        when it has none, or they stop finding enough entries, the site is
+        scraped by Parsera and selectors are learned from its results.
+        feed.listing_selectors is updated but not saved.
+        """
+        if feed.listing_selectors and fetched.ok:
+            entries = extract_listing(fetched.content, feed.url, feed.listing_selectors)
+            if len(entries) >= settings.WEBSITE_SELECTOR_MIN_ENTRIES:
+                return FeedParseResult(
+                    title=feed.title,
+                    description=feed.description,
+                    entries=entries,
+                    is_website=True,
+                )
+            logger.info(f"Learned selectors of {feed.url} stopped matching")
 
-            if not article.text:
-                return False, "No article text could be extracted"
+        parsed = FeedService.parse_website(feed.url)
+        feed.listing_selectors = None
+        if fetched.ok:
+            feed.listing_selectors = learn_listing_selectors(
+                fetched.content, feed.url, [entry["link"] for entry in parsed.entries]
+            )
+        return parsed
+
+    @staticmethod
+    def schedule_next_fetch(
+        feed: Feed, new_entries: int, fetched: FetchResult | None = None
+    ) -> datetime:
+        """
+        Update the publish rate estimate of a feed that was just fetched and
+        found new_entries, and set when it's due next (fields are not saved).
+        The first fetch of a feed only starts the clock: it imports the
+        feed's whole backlog, which says nothing about its publish rate.
+        Returns the time of the fetch.
+        """
+        now = timezone.now()
+        if feed.last_fetched_at is not None:
+            feed.publish_rate = update_publish_rate(
+                feed.publish_rate, new_entries, now - feed.last_fetched_at
+            )
+        feed.last_fetched_at = now
+        feed.next_fetch_at = next_fetch_time(
+            now, feed.publish_rate, fetched.headers if fetched is not None else None
+        )
+        return now
 
-            entry.full_content = article.text
-            entry.article_loaded_at = timezone.now()
-            entry.article_load_error = ""  # Clear the error message on success
-            entry.save()
+    @staticmethod
+    def load_article_content(entry: FeedEntry) -> tuple[bool, str]:
+        """
+        Load the full article content for a single feed entry using newspaper.
+        Use ArticleLoader directly to load many entries in parallel.
+        Returns a tuple of (success, error_message).
+        """
+        if entry.article_loaded_at:
             return True, ""
 
-        except Exception as e:
-            error_msg = f"Failed to load article: {str(e)}"
-            entry.article_load_error = error_msg
-            entry.save()
-            return False, error_msg
+        result = ArticleLoader(parse_workers=0).load([entry])[0]
+        return result.success, result.error
 
 
 class ArticleAnalysis(BaseModel):
@@ -380,92 +703,625 @@ class ArticleAnalysis(BaseModel):
     error: Optional[str] = None
 
 
-class AIService:
-    def __init__(self):
-        self.client = OpenAI()
+class EntryAnalysis(BaseModel):
+    """Structured output format for the user-independent part of article analysis."""
 
-    def process_article_for_user(
-        self, entry: FeedEntry, user: "User"
-    ) -> ArticleAnalysis:
-        """Summarize and translate an article for a specific user, generating a custom summary, relevance score and translated title."""
-        try:
-            # Create system message with clear instructions
-            system_message = """You are a precise article summarizer and translator that processes content
+    translated_title: str
+    summary: str
+
+
+class ReaderAnalysis(BaseModel):
+    """Relevance score and focused summary for one reader profile."""
+
+    reader_id: int
+    relevance_score: int
+    summary: str
+
+
+class MultiReaderArticleAnalysis(BaseModel):
+    """Structured output format for analyzing one article for several readers at once."""
+
+    readers: list[ReaderAnalysis]
+
+
+class AIService:
+    SYSTEM_MESSAGE = """You are a precise article summarizer and translator that processes content
             and provides summaries focused on user interests. You also create impactful, meaningful and relevant titles in English."""
 
-            # Create user message with article content
-            user_message = f"""Consider the user's interests: "{user.interests}"
+    MODEL = "gpt-4o"
+    # Entries whose prepared content is kept, see _prepared_content
+    PREPARED_CONTENT_CACHE_SIZE = 256
+
+    def __init__(
+        self,
+        client: OpenAI | None = None,
+        cache: ResponseCache | None = None,
+        engine: AsyncLLMEngine | None = None,
+        batch_api: BatchAPI | None = None,
+    ):
+        self.client = client or OpenAI()
+        self.cache = cache or ResponseCache()
+        self.engine = engine or AsyncLLMEngine()
+        self.batch_api = batch_api or BatchAPI(self.client)
+        self._prepared: OrderedDict[tuple[int, int], PreparedContent] = OrderedDict()
+
+    def complete_many(
+        self,
+        requests: Sequence[tuple[list[dict], type[ResponseT]]],
+        entries: Sequence[Optional[FeedEntry]] | None = None,
+    ) -> list[ResponseT | BaseException]:
+        """
+        Run many (messages, response_format) structured-output requests.
+        Identical requests are served from the response cache, the rest run
+        concurrently on the async engine within the configured rate limits.
+        entries optionally gives the entry each request is about, to attribute
+        the recorded token usage.
+        Returns the parsed responses, or the exception of failed requests, in order.
+        """
+        entries = entries or [None] * len(requests)
+        keys = [
+            self.cache.make_key(self.MODEL, messages, response_format)
+            for messages, response_format in requests
+        ]
+        results: list = [
+            self.cache.get(key, response_format)
+            for key, (_, response_format) in zip(keys, requests)
+        ]
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        outcomes = self.engine.run(self.MODEL, [requests[index] for index in pending])
+        usage = []
+        for index, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                results[index] = outcome
+                continue
+            self.cache.set(keys[index], self.MODEL, outcome.parsed)
+            usage.append((entries[index], requests[index][1], outcome))
+            results[index] = outcome.parsed
+        self._record_usage(usage)
+        return results
+
+    def _record_usage(
+        self,
+        usage: Sequence[tuple[Optional[FeedEntry], type[BaseModel], LLMResult]],
+        batch: bool = False,
+    ) -> None:
+        records = []
+        for entry, response_format, result in usage:
+            content = self._prepared_content(entry) if entry is not None else None
+            records.append(
+                LLMUsage(
+                    model=self.MODEL,
+                    purpose=response_format.__name__,
+                    entry=entry,
+                    prompt_tokens=result.prompt_tokens,
+                    completion_tokens=result.completion_tokens,
+                    content_tokens=content.tokens if content else 0,
+                    content_truncated=content.truncated if content else False,
+                    batch=batch,
+                )
+            )
+        LLMUsage.objects.bulk_create(records)
 
-Article Title: {entry.title}
-Article Content: {entry.full_content}
+    def _prepared_content(self, entry: FeedEntry) -> PreparedContent:
+        """
+        Article content stripped and trimmed to the token budget of the model.
+        It's kept for the PREPARED_CONTENT_CACHE_SIZE most recently used
+        entries, by the content it was prepared from, so a reloaded article
+        is prepared again.
+        """
+        key = (entry.pk, hash(entry.full_content))
+        if key in self._prepared:
+            self._prepared.move_to_end(key)
+            return self._prepared[key]
+
+        max_tokens = settings.AI_CONTENT_MAX_TOKENS_PER_MODEL.get(
+            self.MODEL, settings.AI_CONTENT_MAX_TOKENS
+        )
+        content = prepare_content(entry.full_content, max_tokens, self.MODEL)
+        self._prepared[key] = content
+        if len(self._prepared) > self.PREPARED_CONTENT_CACHE_SIZE:
+            self._prepared.popitem(last=False)
+        return content
+
+    def _entry_messages(self, entry: FeedEntry) -> list[dict]:
+        user_message = f"""Article Title: {entry.title}
+Article Content: {self._prepared_content(entry).text}
 
 Please provide:
-1. A very short summary (TLDR, no more than two sentences) of this content
-2. A relevance score (0-100) based on user interests
-3. A concise, impactful title in English that captures the essence of the article. If the original title is already in English and good, you can keep it or improve it.
+1. A concise, impactful title in English that captures the essence of the article. If the original title is already in English and good, you can keep it or improve it.
+2. A very short general summary (TLDR, no more than two sentences) of this content in English.
 
-Focus on aspects matching user interests in the summary. If the content is not relevant to the user, provide a general summary.
 The title should be attention-grabbing but accurate - no clickbait."""
+        return [
+            {"role": "system", "content": self.SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message},
+        ]
 
-            # Use the parse method with structured outputs
-            completion = self.client.beta.chat.completions.parse(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message},
-                ],
-                response_format=ArticleAnalysis,
+    def _reader_messages(self, entry: FeedEntry, profiles: list[str]) -> list[dict]:
+        readers = "\n".join(
+            f'Reader {reader_id}: "{interests}"'
+            for reader_id, interests in enumerate(profiles, start=1)
+        )
+        user_message = f"""Consider the interests of the following readers:
+{readers}
+
+Article Title: {entry.translated_title or entry.title}
+Article Content: {self._prepared_content(entry).text}
+
+For every reader, using their reader number as reader_id, please provide:
+1. A very short summary (TLDR, no more than two sentences) of this content
+2. A relevance score (0-100) based on the reader's interests
+
+Focus on aspects matching each reader's interests in their summary. If the content is not relevant to a reader, provide a general summary."""
+        return [
+            {"role": "system", "content": self.SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message},
+        ]
+
+    def _store_entry_analysis(self, entry: FeedEntry, result: EntryAnalysis) -> None:
+        entry.translated_title = result.translated_title[
+            : FeedEntry._meta.get_field("translated_title").max_length
+        ]
+        entry.summary = result.summary
+        update_fields = ["translated_title", "summary", "last_processed"]
+
+        if settings.AI_ENTRY_EMBEDDING_MODEL:
+            embedding = self.client.embeddings.create(
+                model=settings.AI_ENTRY_EMBEDDING_MODEL,
+                input=f"{entry.translated_title}\n\n{entry.summary}",
             )
+            entry.embedding = embedding.data[0].embedding
+            update_fields.append("embedding")
 
-            # Get the parsed response
-            result = completion.choices[0].message.parsed
+        entry.last_processed = timezone.now()
+        entry.save(update_fields=update_fields)
+        timeline.update_entry(entry)
+
+    def analyze_entries(self, entries: list[FeedEntry]) -> dict[int, str]:
+        """
+        Generate the canonical English title, general English summary and
+        (if AI_ENTRY_EMBEDDING_MODEL is set) embedding of entries.
+        These don't depend on the reader, so they are computed once and stored
+        on the entry; entries that already have them are skipped.
+        Returns a dict mapping entry ids to an error message for failed entries.
+        """
+        pending = [
+            entry for entry in entries if not (entry.translated_title and entry.summary)
+        ]
+        results = self.complete_many(
+            [(self._entry_messages(entry), EntryAnalysis) for entry in pending],
+            entries=pending,
+        )
 
-            # Check for refusal
-            if completion.choices[0].message.refusal:
-                return ArticleAnalysis(
-                    summary="",
-                    relevance_score=0,
-                    translated_title=entry.title,  # Fallback to original title
-                    error=f"AI refused to process: {completion.choices[0].message.refusal}",
+        errors = {}
+        for entry, result in zip(pending, results):
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+                self._store_entry_analysis(entry, result)
+            except Exception as e:
+                errors[entry.pk] = f"Error analyzing article {entry.pk}: {str(e)}"
+                logger.error(errors[entry.pk])
+        return errors
+
+    def analyze_entry(self, entry: FeedEntry) -> Optional[str]:
+        """Analyze a single entry, see analyze_entries. Returns an error message if it failed."""
+        return self.analyze_entries([entry]).get(entry.pk)
+
+    def process_article_for_user(
+        self, entry: FeedEntry, user: "User"
+    ) -> ArticleAnalysis:
+        """Summarize and translate an article for a specific user, generating a custom summary, relevance score and translated title."""
+        return self.process_article_for_users(entry, [user])[user.pk]
+
+    def process_article_for_users(
+        self, entry: FeedEntry, users: list["User"]
+    ) -> dict[int, ArticleAnalysis]:
+        """
+        Summarize and translate an article for several users at once.
+        Returns a dict mapping each user id to their ArticleAnalysis.
+        """
+        return self.process_articles_for_users([(entry, users)])[entry.pk]
+
+    def process_articles_for_users(
+        self, work: list[tuple[FeedEntry, list["User"]]]
+    ) -> dict[int, dict[int, ArticleAnalysis]]:
+        """
+        Summarize and translate many articles for their users concurrently.
+        The translated title comes from the entry-level analysis, which is
+        computed at most once per entry. Users with identical interests share
+        one reader profile, and up to AI_READERS_PER_REQUEST profiles are
+        scored by a single request, so the article content is sent once per
+        batch instead of once per user. All requests of a phase run
+        concurrently on the async engine.
+        Returns a dict mapping entry ids to dicts mapping user ids to their ArticleAnalysis.
+        """
+        results: dict[int, dict[int, ArticleAnalysis]] = {
+            entry.pk: {} for entry, _ in work
+        }
+        entry_errors = self.analyze_entries([entry for entry, users in work if users])
+
+        batches = []  # (entry, users of every profile in the batch)
+        requests: list[tuple[list[dict], type[MultiReaderArticleAnalysis]]] = []
+        for entry, users in work:
+            if entry.pk in entry_errors:
+                for user, analysis in zip(
+                    users,
+                    self._failed_analyses(entry, len(users), entry_errors[entry.pk]),
+                ):
+                    results[entry.pk][user.pk] = analysis
+                continue
+
+            for profiles, profile_users in self._reader_batches(users):
+                batches.append((entry, profile_users))
+                requests.append(
+                    (self._reader_messages(entry, profiles), MultiReaderArticleAnalysis)
                 )
 
-            return result
+        for (entry, profile_users), result in zip(
+            batches,
+            self.complete_many(requests, entries=[entry for entry, _ in batches]),
+        ):
+            for users, analysis in zip(
+                profile_users, self._reader_analyses(entry, len(profile_users), result)
+            ):
+                for user in users:
+                    results[entry.pk][user.pk] = analysis
+        return results
 
-        except Exception as e:
-            error_msg = f"Error processing article {entry.pk}: {str(e)}"
+    @staticmethod
+    def _reader_batches(users: list["User"]) -> list[tuple[list[str], list[list]]]:
+        """
+        Group users with identical interests into reader profiles and split
+        the profiles into batches of AI_READERS_PER_REQUEST.
+        Returns (interests of each profile, users of each profile) per batch.
+        """
+        users_by_interests: dict[str, list] = {}
+        for user in users:
+            users_by_interests.setdefault(user.interests.strip(), []).append(user)
+
+        profiles = list(users_by_interests)
+        batch_size = settings.AI_READERS_PER_REQUEST
+        return [
+            (
+                profiles[start : start + batch_size],
+                [
+                    users_by_interests[interests]
+                    for interests in profiles[start : start + batch_size]
+                ],
+            )
+            for start in range(0, len(profiles), batch_size)
+        ]
+
+    def _reader_analyses(
+        self,
+        entry: FeedEntry,
+        profile_count: int,
+        result: MultiReaderArticleAnalysis | BaseException,
+    ) -> list[ArticleAnalysis]:
+        """Turn a multi-reader response into one ArticleAnalysis per profile."""
+        if isinstance(result, BaseException):
+            error_msg = f"Error processing article {entry.pk}: {str(result)}"
             logger.error(error_msg)
-            return ArticleAnalysis(
+            return self._failed_analyses(entry, profile_count, error_msg)
+
+        by_reader = {reader.reader_id: reader for reader in result.readers}
+        analyses = []
+        for reader_id in range(1, profile_count + 1):
+            reader = by_reader.get(reader_id)
+            if reader is None:
+                analyses.extend(
+                    self._failed_analyses(
+                        entry,
+                        1,
+                        f"AI returned no analysis for reader {reader_id} of article {entry.pk}",
+                    )
+                )
+                continue
+            analyses.append(
+                ArticleAnalysis(
+                    summary=reader.summary,
+                    relevance_score=reader.relevance_score,
+                    translated_title=entry.translated_title or entry.title,
+                )
+            )
+        return analyses
+
+    @staticmethod
+    def _failed_analyses(
+        entry: FeedEntry, count: int, error: str
+    ) -> list[ArticleAnalysis]:
+        return [
+            ArticleAnalysis(
                 summary="",
                 relevance_score=0,
                 translated_title=entry.title,  # Fallback to original title
-                error=error_msg,
+                error=error,
             )
+            for _ in range(count)
+        ]
 
-    @classmethod
-    def process_entry_for_all_users(cls, entry: FeedEntry) -> None:
-        """Process a feed entry for all subscribed users."""
-        ai_service = cls()
+    def submit_batch(
+        self, work: list[tuple[FeedEntry, list["User"]]]
+    ) -> Optional[AIBatchJob]:
+        """
+        Submit the analysis of many articles for their users through the
+        OpenAI Batch API. Pairs of entries and users already covered by an
+        unfinished job are left out, so an interrupted run can be repeated.
+        The job is recorded before it's uploaded, so a job that never made it
+        to the API is resubmitted by submit_job.
+        Returns the job, or None if there was nothing left to submit.
+        """
+        covered_entries: set[int] = set()
+        covered_pairs: set[tuple[int, int]] = set()
+        for job in AIBatchJob.objects.filter(status__in=AIBatchJob.UNFINISHED):
+            for spec in job.requests.values():
+                covered_entries.add(spec["entry"])
+                for profile_users in spec.get("users", []):
+                    covered_pairs.update(
+                        (spec["entry"], user_id) for user_id in profile_users
+                    )
+
+        requests: dict[str, dict] = {}
+        for entry, users in work:
+            users = [user for user in users if (entry.pk, user.pk) not in covered_pairs]
+            if not users:
+                continue
+            if not (entry.translated_title and entry.summary) and (
+                entry.pk not in covered_entries
+            ):
+                requests[f"entry-{entry.pk}"] = {"entry": entry.pk}
+            for n, (profiles, profile_users) in enumerate(self._reader_batches(users)):
+                requests[f"readers-{entry.pk}-{n}"] = {
+                    "entry": entry.pk,
+                    "interests": profiles,
+                    "users": [[user.pk for user in users] for users in profile_users],
+                }
 
-        # Get all active subscribers for this feed
-        subscriptions = UserFeedSubscription.objects.filter(
-            feed=entry.feed, is_active=True
-        ).select_related("user")
+        if not requests:
+            return None
 
-        for subscription in subscriptions:
-            result = ai_service.process_article_for_user(entry, subscription.user)
+        job = AIBatchJob.objects.create(
+            model=self.MODEL, requests=requests, request_count=len(requests)
+        )
+        self.submit_job(job)
+        return job
+
+    def _batch_prompts(
+        self, job: AIBatchJob, entries: dict[int, FeedEntry]
+    ) -> dict[str, tuple[list[dict], type[BaseModel]]]:
+        prompts: dict[str, tuple[list[dict], type[BaseModel]]] = {}
+        for custom_id, spec in job.requests.items():
+            entry = entries[spec["entry"]]
+            if "interests" in spec:
+                prompts[custom_id] = (
+                    self._reader_messages(entry, spec["interests"]),
+                    MultiReaderArticleAnalysis,
+                )
+            else:
+                prompts[custom_id] = (self._entry_messages(entry), EntryAnalysis)
+        return prompts
 
-            if not result.error:
-                # Create or update the user's interaction with this article
-                UserArticleInteraction.objects.update_or_create(
-                    user=subscription.user,
-                    entry=entry,
-                    defaults={
-                        "custom_summary": result.summary,
-                        "relevance_score": result.relevance_score,
-                        "translated_title": result.translated_title,
-                    },
+    def _batch_entries(self, job: AIBatchJob) -> dict[int, FeedEntry]:
+        return FeedEntry.objects.in_bulk(
+            {spec["entry"] for spec in job.requests.values()}
+        )
+
+    def submit_job(self, job: AIBatchJob) -> None:
+        """Upload a pending job's requests and create its batch."""
+        entries = self._batch_entries(job)
+        # Entries deleted since the job was recorded are dropped
+        job.requests = {
+            custom_id: spec
+            for custom_id, spec in job.requests.items()
+            if spec["entry"] in entries
+        }
+        job.request_count = len(job.requests)
+        try:
+            job.input_file_id, job.batch_id = self.batch_api.submit(
+                job.model,
+                self._batch_prompts(job, entries),
+                metadata={"job": str(job.pk)},
+            )
+        except Exception as e:
+            logger.error(f"Error submitting batch job {job.pk}: {str(e)}")
+            job.error = str(e)
+            job.save(update_fields=["requests", "request_count", "error"])
+            raise
+
+        job.status = AIBatchJob.Status.SUBMITTED
+        job.submitted_at = timezone.now()
+        job.error = ""
+        job.save()
+
+    def collect_batch(
+        self, job: AIBatchJob
+    ) -> Optional[dict[int, dict[int, ArticleAnalysis]]]:
+        """
+        Check a submitted job and, once its batch has finished, store the
+        entry analyses and return the results like process_articles_for_users.
+        Returns None while the batch is still running.
+        """
+        batch = self.batch_api.retrieve(job.batch_id)
+        if batch.status not in self.batch_api.FINISHED_STATUSES:
+            return None
+
+        entries = self._batch_entries(job)
+        formats = {
+            custom_id: response_format
+            for custom_id, (_, response_format) in self._batch_prompts(
+                job, entries
+            ).items()
+        }
+        responses = self.batch_api.results(batch, formats)
+        self._record_usage(
+            [
+                (
+                    entries.get(job.requests[custom_id]["entry"]),
+                    formats[custom_id],
+                    result,
+                )
+                for custom_id, result in responses.items()
+                if not isinstance(result, BaseException)
+            ],
+            batch=True,
+        )
+        # Parsed with the format of their request, see BatchAPI.results
+        parsed = {
+            custom_id: result if isinstance(result, BaseException) else result.parsed
+            for custom_id, result in responses.items()
+        }
+        missing = ValueError(
+            f"No result in batch {job.batch_id} (status {batch.status})"
+        )
+
+        entry_errors = {}
+        for custom_id, spec in job.requests.items():
+            if "interests" in spec or spec["entry"] not in entries:
+                continue
+            entry = entries[spec["entry"]]
+            try:
+                result = parsed.get(custom_id, missing)
+                if isinstance(result, BaseException):
+                    raise result
+                self._store_entry_analysis(entry, cast(EntryAnalysis, result))
+            except Exception as e:
+                entry_errors[entry.pk] = f"Error analyzing article {entry.pk}: {str(e)}"
+                logger.error(entry_errors[entry.pk])
+
+        results: dict[int, dict[int, ArticleAnalysis]] = {}
+        for custom_id, spec in job.requests.items():
+            if "interests" not in spec or spec["entry"] not in entries:
+                continue
+            entry = entries[spec["entry"]]
+            if entry.pk in entry_errors:
+                analyses = self._failed_analyses(
+                    entry, len(spec["users"]), entry_errors[entry.pk]
                 )
             else:
-                logger.error(
-                    f"Failed to process entry {entry.pk} for user {subscription.user.pk}: {result.error}"
+                analyses = self._reader_analyses(
+                    entry,
+                    len(spec["users"]),
+                    cast(
+                        MultiReaderArticleAnalysis | BaseException,
+                        parsed.get(custom_id, missing),
+                    ),
+                )
+            for user_ids, analysis in zip(spec["users"], analyses):
+                for user_id in user_ids:
+                    results.setdefault(entry.pk, {})[user_id] = analysis
+
+        job.output_file_id = batch.output_file_id or ""
+        job.completed_at = timezone.now()
+        if batch.status != "completed":
+            job.error = f"Batch ended with status {batch.status}"
+        return results
+
+    def ingest_batch(self, job: AIBatchJob) -> Optional[tuple[int, list[str]]]:
+        """
+        Collect a submitted job and save its results as user interactions.
+        Returns (interactions saved, errors) or None while the batch is still running.
+        """
+        with transaction.atomic():
+            results = self.collect_batch(job)
+            if results is None:
+                return None
+
+            count, errors = self.save_interactions(results)
+            job.status = (
+                AIBatchJob.Status.INGESTED
+                if job.output_file_id
+                else AIBatchJob.Status.FAILED
+            )
+            job.save()
+        return count, errors
+
+    @staticmethod
+    def save_interactions(
+        results: dict[int, dict[int, ArticleAnalysis]],
+        writer: Optional[InteractionWriter] = None,
+    ) -> tuple[int, list[str]]:
+        """
+        Queue the successful results of process_articles_for_users on an
+        InteractionWriter, or write them with a writer of their own.
+        Returns (interactions saved, errors of failed analyses).
+        """
+        errors = []
+        count = 0
+        own_writer = writer is None
+        writer = writer or InteractionWriter()
+        for entry_id, user_results in results.items():
+            for user_id, analysis in user_results.items():
+                if analysis.error:
+                    errors.append(analysis.error)
+                    continue
+                writer.add(user_id, entry_id, analysis)
+                count += 1
+        if own_writer:
+            writer.close()
+        return count, errors
+
+    @staticmethod
+    def pending_interactions(since: datetime, reprocess: bool = False):
+        """
+        (entry_id, user_id) pairs of the entries published since a given time
+        and the active subscribers of their feed that have no interaction with
+        them yet (every subscriber if reprocess is set).
+        This is a single anti-join query ordered by entry, meant to be streamed
+        with .iterator().
+        """
+        pairs = FeedEntry.objects.filter(
+            published_at__gte=since,
+            article_load_error="",
+            feed__subscribers__is_active=True,
+        ).annotate(user_id=F("feed__subscribers__user_id"))
+        if not reprocess:
+            pairs = pairs.filter(
+                ~Exists(
+                    UserArticleInteraction.objects.filter(
+                        entry_id=OuterRef("pk"), user_id=OuterRef("user_id")
+                    )
                 )
+            )
+        return pairs.order_by("feed_id", "pk", "user_id").values_list("pk", "user_id")
+
+    @classmethod
+    def process_entry_for_all_users(
+        cls, entry: FeedEntry, ai_service: Optional["AIService"] = None
+    ) -> None:
+        """
+        Process a feed entry for all subscribed users.
+        Pass an AIService to share its client and response cache across entries.
+        """
+        cls.process_entries_for_all_users([entry], ai_service=ai_service)
+
+    @classmethod
+    def process_entries_for_all_users(
+        cls, entries: list[FeedEntry], ai_service: Optional["AIService"] = None
+    ) -> None:
+        """Process feed entries for all their subscribed users, running the AI requests concurrently."""
+        ai_service = ai_service or cls()
+
+        # Get all active subscribers of the feeds
+        users_by_feed: dict[int, list] = {}
+        subscriptions = UserFeedSubscription.objects.filter(
+            feed__in={entry.feed_id for entry in entries}, is_active=True
+        ).select_related("user")
+        for subscription in subscriptions:
+            users_by_feed.setdefault(subscription.feed_id, []).append(subscription.user)
+
+        work = [(entry, users_by_feed.get(entry.feed_id, [])) for entry in entries]
+        results = ai_service.process_articles_for_users(work)
+        with InteractionWriter() as writer:
+            for entry, users in work:
+                for user in users:
+                    result = results[entry.pk][user.pk]
+
+                    if not result.error:
+                        # Create or update the user's interaction with this article
+                        writer.add(user.pk, entry.pk, result)
+                    else:
+                        logger.error(
+                            f"Failed to process entry {entry.pk} for user {user.pk}: {result.error}"
+                        )
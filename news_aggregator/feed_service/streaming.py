@@ -0,0 +1,148 @@
+"""
+Incremental parser for RSS 2.0 and Atom documents.
+
+Entries are parsed one at a time with lxml's iterparse and every element is
+freed once it has been read, so the parser never holds more than a single
+entry of the document, however long the feed is. Documents in any other
+format raise UnsupportedFeed, for feedparser to handle instead.
+"""
+
+import io
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from lxml import etree
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+
+RSS_ITEM = "item"
+ATOM_ENTRY = f"{ATOM}entry"
+
+
+class UnsupportedFeed(ValueError):
+    """The document isn't well-formed RSS 2.0 or Atom."""
+
+
+def _text(element, *tags: str) -> str:
+    """Stripped text of the first of tags found under element."""
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and child.text and child.text.strip():
+            return child.text.strip()
+    return ""
+
+
+def _rss_date(value: str) -> time.struct_time | None:
+    try:
+        return parsedate_to_datetime(value).utctimetuple()
+    except (TypeError, ValueError):
+        return None
+
+
+def _atom_date(value: str) -> time.struct_time | None:
+    try:
+        return datetime.fromisoformat(value).utctimetuple()
+    except ValueError:
+        return None
+
+
+def _rss_entry(item) -> dict:
+    link = _text(item, "link")
+    guid = item.find("guid")
+    if not link and guid is not None and guid.get("isPermaLink", "true") == "true":
+        link = (guid.text or "").strip()
+    # pubDate is RFC 2822, dc:date is ISO 8601 (W3CDTF)
+    published = _rss_date(_text(item, "pubDate")) or _atom_date(
+        _text(item, f"{DC}date")
+    )
+    return {
+        "title": _text(item, "title"),
+        "link": link,
+        "description": _text(item, "description", f"{CONTENT}encoded"),
+        "author": _text(item, "author", f"{DC}creator"),
+        "published_parsed": published,
+    }
+
+
+def _atom_entry(entry) -> dict:
+    link = ""
+    for candidate in entry.iterfind(f"{ATOM}link"):
+        if candidate.get("rel", "alternate") == "alternate":
+            link = (candidate.get("href") or "").strip()
+            break
+    author = entry.find(f"{ATOM}author")
+    return {
+        "title": _text(entry, f"{ATOM}title"),
+        "link": link,
+        "description": _text(entry, f"{ATOM}summary", f"{ATOM}content"),
+        "author": _text(author, f"{ATOM}name") if author is not None else "",
+        "published_parsed": _atom_date(
+            _text(entry, f"{ATOM}published", f"{ATOM}updated")
+        ),
+    }
+
+
+class StreamingFeedParser:
+    """
+    Iterate over the entries of an RSS 2.0 or Atom document.
+    title and description are filled in as the feed header is read, which
+    both formats put before the entries. Entries are dicts in the format of
+    FeedService.parse_rss_feed.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.title = ""
+        self.description = ""
+
+    def entries(self) -> Iterator[dict]:
+        events = etree.iterparse(
+            io.BytesIO(self.content),
+            events=("start", "end"),
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=True,
+        )
+        parse_entry: Callable[[etree._Element], dict]
+        try:
+            _, root = next(events)
+            if root.tag == "rss":
+                entry_tag, header_tags, parse_entry = (
+                    RSS_ITEM,
+                    ("title", "description"),
+                    _rss_entry,
+                )
+            elif root.tag == f"{ATOM}feed":
+                entry_tag, header_tags, parse_entry = (
+                    ATOM_ENTRY,
+                    (f"{ATOM}title", f"{ATOM}subtitle"),
+                    _atom_entry,
+                )
+            else:
+                raise UnsupportedFeed(f"Unsupported root element {root.tag}")
+
+            depth = 0  # Depth inside the current entry, 0 outside of entries
+            for event, element in events:
+                if element.tag == entry_tag:
+                    depth += 1 if event == "start" else -1
+                if event != "end":
+                    continue
+                if element.tag == entry_tag and depth == 0:
+                    yield parse_entry(element)
+                    # Free the entry and the references lxml keeps to it
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                elif depth == 0 and element.tag in header_tags:
+                    text = (element.text or "").strip()
+                    if element.tag == header_tags[0] and not self.title:
+                        self.title = text
+                    elif element.tag == header_tags[1] and not self.description:
+                        self.description = text
+        except etree.XMLSyntaxError as e:
+            raise UnsupportedFeed(f"Malformed XML: {str(e)}") from e
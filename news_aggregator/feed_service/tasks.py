@@ -0,0 +1,186 @@
+"""
+Celery task graph for feed updates.
+
+    update_due_feeds (every few minutes) or update_all_feeds
+      └─ chord(fetch_feed(feed_id) for every active feed) → log_feed_updates
+           fetch_feed fans out, for every entry the fetch created:
+             load_article(entry_id) → group(analyze(entry_id, user_ids) per chunk of subscribers)
+
+Every stage is routed to its own queue (feeds, articles, ai, see
+CELERY_TASK_ROUTES), so each can be scaled with its own workers.
+"""
+
+import logging
+from datetime import timedelta
+from functools import cache
+
+from celery import chord
+from celery import group
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.models import Feed
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import UserFeedSubscription
+from news_aggregator.feed_service.services import AIService
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def ai_service() -> AIService:
+    """One AIService per worker process, sharing its response cache and rate limiter across tasks."""
+    return AIService()
+
+
+def article_workflow(entry_id: int, user_ids: list[int]):
+    """Load an entry's article, then analyze it for its subscribers in parallel chunks."""
+    load = load_article.s(entry_id)
+    if not user_ids:
+        return load
+    chunk_size = settings.AI_USERS_PER_TASK
+    return load | group(
+        analyze.s(user_ids=user_ids[start : start + chunk_size])
+        for start in range(0, len(user_ids), chunk_size)
+    )
+
+
+def fetch_feeds(feed_ids: list[int]) -> None:
+    """Fetch feeds in parallel and log a summary once all are done."""
+    if not feed_ids:
+        return
+    chord(fetch_feed.s(feed_id) for feed_id in feed_ids)(log_feed_updates.s())
+
+
+@shared_task()
+def update_all_feeds():
+    """Fetch every active feed, whether it's due or not."""
+    fetch_feeds(list(Feed.objects.filter(is_active=True).values_list("pk", flat=True)))
+
+
+@shared_task()
+def update_due_feeds():
+    """
+    Fetch the active feeds whose next_fetch_at has passed, and feeds never
+    fetched before. Dispatched feeds are leased for FEED_POLL_LEASE minutes
+    so the next tick doesn't queue them again while they're being fetched.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        feed_ids = list(
+            Feed.objects.filter(is_active=True)
+            .filter(Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=now))
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)
+        )
+        Feed.objects.filter(pk__in=feed_ids).update(
+            next_fetch_at=now + timedelta(minutes=settings.FEED_POLL_LEASE)
+        )
+    logger.info(f"{len(feed_ids)} feeds due for update")
+    fetch_feeds(feed_ids)
+
+
+@shared_task()
+def fetch_feed(feed_id: int) -> dict:
+    """
+    Update a feed and queue the article workflow of the entries it created.
+    Older entries without an article are either still queued from an earlier
+    fetch or left to retry_failed_articles and process_unprocessed_articles,
+    so a slow queue doesn't get the same work again on every tick.
+    """
+    try:
+        feed = Feed.objects.get(pk=feed_id, is_active=True)
+    except Feed.DoesNotExist:
+        return {"feed_id": feed_id, "entries_added": 0, "errors": ["Feed not found"]}
+
+    fetch_started = timezone.now()
+    try:
+        entries_added, errors = FeedService.update_feed(feed)
+    except Exception as e:
+        logger.error(f"Error updating feed {feed.title}: {str(e)}")
+        entries_added, errors = 0, [str(e)]
+
+    pending = list(
+        feed.entries.filter(
+            created_at__gte=fetch_started,
+            article_loaded_at__isnull=True,
+            article_load_error="",
+        ).values_list("pk", flat=True)
+    )
+    user_ids = list(
+        UserFeedSubscription.objects.filter(feed=feed, is_active=True).values_list(
+            "user_id", flat=True
+        )
+    )
+    if pending:
+        group(article_workflow(entry_id, user_ids) for entry_id in pending)()
+
+    return {
+        "feed_id": feed_id,
+        "entries_added": entries_added,
+        "errors": errors,
+        "articles_queued": len(pending),
+    }
+
+
+@shared_task()
+def log_feed_updates(results: list[dict]) -> dict:
+    """Chord callback of update_all_feeds."""
+    summary = {
+        "feeds": len(results),
+        "failed": sum(1 for result in results if result["errors"]),
+        "entries_added": sum(result["entries_added"] for result in results),
+        "articles_queued": sum(result.get("articles_queued", 0) for result in results),
+    }
+    logger.info(
+        "Updated {feeds} feeds ({failed} failed), {entries_added} new entries, "
+        "{articles_queued} articles queued".format(**summary)
+    )
+    return summary
+
+
+@shared_task(soft_time_limit=120, time_limit=180)
+def load_article(entry_id: int) -> int | None:
+    """Load the full article of an entry. Returns the entry id, or None if it couldn't be loaded."""
+    entry = FeedEntry.objects.filter(pk=entry_id).first()
+    if entry is None:
+        return None
+    if entry.article_loaded_at is None:
+        [result] = ArticleLoader(parse_workers=0).load([entry])
+        if not result.success:
+            logger.warning(f"Article load error for {entry.url}: {result.error}")
+            return None
+    return entry_id
+
+
+@shared_task(soft_time_limit=300, time_limit=360)
+def analyze(entry_id: int | None, user_ids: list[int]) -> int:
+    """
+    Summarize and score an entry for those of the given subscribers who don't
+    have an interaction with it yet. Returns the number of interactions saved.
+    """
+    if entry_id is None:
+        return 0
+    entry = FeedEntry.objects.filter(pk=entry_id).first()
+    if entry is None:
+        return 0
+
+    users = list(
+        User.objects.filter(pk__in=user_ids).exclude(
+            article_interactions__entry_id=entry_id
+        )
+    )
+    if not users:
+        return 0
+    service = ai_service()
+    results = service.process_articles_for_users([(entry, users)])
+    count, errors = service.save_interactions(results)
+    for error in errors:
+        logger.error(f"Failed to process entry {entry_id}: {error}")
+    return count
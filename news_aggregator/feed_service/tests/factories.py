@@ -0,0 +1,39 @@
+from django.utils import timezone
+from factory import Faker
+from factory import LazyFunction
+from factory import Sequence
+from factory import SubFactory
+from factory.django import DjangoModelFactory
+
+from news_aggregator.feed_service.models import Feed
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import UserFeedSubscription
+from news_aggregator.users.tests.factories import UserFactory
+
+
+class FeedFactory(DjangoModelFactory[Feed]):
+    title = Faker("company")
+    url = Sequence(lambda n: f"https://feeds{n}.example.com/rss.xml")
+    description = Faker("sentence")
+
+    class Meta:
+        model = Feed
+
+
+class FeedEntryFactory(DjangoModelFactory[FeedEntry]):
+    feed = SubFactory(FeedFactory)
+    title = Faker("sentence")
+    url = Sequence(lambda n: f"https://news.example.com/articles/{n}")
+    full_content = Faker("paragraph")
+    published_at = LazyFunction(timezone.now)
+
+    class Meta:
+        model = FeedEntry
+
+
+class UserFeedSubscriptionFactory(DjangoModelFactory[UserFeedSubscription]):
+    user = SubFactory(UserFactory)
+    feed = SubFactory(FeedFactory)
+
+    class Meta:
+        model = UserFeedSubscription
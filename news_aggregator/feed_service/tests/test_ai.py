@@ -0,0 +1,539 @@
+import asyncio
+import json
+from io import StringIO
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any
+from typing import cast
+
+import httpx
+import openai
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from news_aggregator.feed_service.llm import AsyncLLMEngine
+from news_aggregator.feed_service.management.commands.update_feeds import (
+    Command as UpdateFeedsCommand,
+)
+from news_aggregator.feed_service.llm import BatchAPI
+from news_aggregator.feed_service.llm import RateLimiter
+from news_aggregator.feed_service.llm import ResponseCache
+from news_aggregator.feed_service.llm import TokenBucket
+from news_aggregator.feed_service.llm import response_format_param
+from news_aggregator.feed_service.models import AIBatchJob
+from news_aggregator.feed_service.models import CachedLLMResponse
+from news_aggregator.feed_service.models import LLMUsage
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.services import AIService
+from news_aggregator.feed_service.services import ArticleAnalysis
+from news_aggregator.feed_service.services import EntryAnalysis
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.services import MultiReaderArticleAnalysis
+from news_aggregator.feed_service.services import ReaderAnalysis
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.feed_service.tests.factories import UserFeedSubscriptionFactory
+from news_aggregator.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeCompletions:
+    """
+    Answers structured-output requests like the raw-response AsyncOpenAI
+    client, scoring reader N with N * 10.
+    The first `rate_limited` requests fail with a 429.
+    """
+
+    def __init__(self, rate_limited=0):
+        self.requests = []
+        self.rate_limited = rate_limited
+
+    async def parse(self, model, messages, response_format):
+        if self.rate_limited:
+            self.rate_limited -= 1
+            response = httpx.Response(
+                429,
+                headers={"retry-after-ms": "10"},
+                request=httpx.Request("POST", "https://api.openai.com/v1"),
+            )
+            raise openai.RateLimitError("Rate limited", response=response, body=None)
+
+        self.requests.append(response_format)
+        prompt = messages[-1]["content"]
+        reader_count = prompt.count("Reader ")
+        if response_format is EntryAnalysis:
+            parsed = EntryAnalysis(
+                translated_title="Translated title", summary="General summary"
+            )
+        else:
+            parsed = self._readers(reader_count)
+        message = SimpleNamespace(parsed=parsed, refusal=None)
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=50),
+        )
+        return SimpleNamespace(
+            headers={"x-ratelimit-remaining-requests": "100"},
+            parse=lambda: completion,
+        )
+
+    @staticmethod
+    def _readers(reader_count):
+        return MultiReaderArticleAnalysis(
+            readers=[
+                ReaderAnalysis(
+                    reader_id=reader_id,
+                    relevance_score=reader_id * 10,
+                    summary=f"Summary for reader {reader_id}",
+                )
+                for reader_id in range(1, reader_count + 1)
+            ],
+        )
+
+
+class FakeBatchClient:
+    """Local stand-in for the files and batches endpoints of the OpenAI client."""
+
+    def __init__(self):
+        self.uploads = {}
+        self.outputs = {}
+        self.batches = SimpleNamespace(create=self._create, retrieve=self._retrieve)
+        self.files = SimpleNamespace(create=self._upload, content=self._content)
+        self.status = "in_progress"
+        self.fail_uploads = 0
+
+    def _upload(self, file, purpose):
+        if self.fail_uploads:
+            self.fail_uploads -= 1
+            raise openai.APIConnectionError(
+                request=httpx.Request("POST", "https://api.openai.com/v1/files")
+            )
+        file_id = f"file-{len(self.uploads) + len(self.outputs)}"
+        self.uploads[file_id] = file[1].decode()
+        return SimpleNamespace(id=file_id)
+
+    def _create(self, input_file_id, endpoint, completion_window, metadata):
+        lines = []
+        for line in self.uploads[input_file_id].splitlines():
+            request = json.loads(line)
+            prompt = request["body"]["messages"][-1]["content"]
+            if request["body"]["response_format"]["json_schema"]["name"] == (
+                "EntryAnalysis"
+            ):
+                parsed = EntryAnalysis(
+                    translated_title="Batch title", summary="Batch summary"
+                )
+            else:
+                parsed = FakeCompletions._readers(prompt.count("Reader "))
+            body = {
+                "choices": [
+                    {"message": {"content": parsed.model_dump_json(), "refusal": None}}
+                ],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+            }
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": body},
+                        "error": None,
+                    }
+                )
+            )
+        batch_id = f"batch-{input_file_id}"
+        self.outputs[f"output-{batch_id}"] = "\n".join(lines)
+        return SimpleNamespace(id=batch_id)
+
+    def _retrieve(self, batch_id):
+        return SimpleNamespace(
+            id=batch_id,
+            status=self.status,
+            output_file_id=f"output-{batch_id}" if self.status == "completed" else None,
+            error_file_id=None,
+        )
+
+    def _content(self, file_id):
+        return SimpleNamespace(text=self.outputs[file_id])
+
+
+class FakeAsyncClient:
+    def __init__(self, completions):
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(
+                completions=SimpleNamespace(with_raw_response=completions)
+            )
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+@pytest.fixture
+def completions():
+    return FakeCompletions()
+
+
+@pytest.fixture
+def ai_service(completions):
+    engine = AsyncLLMEngine(
+        client_factory=lambda: cast(Any, FakeAsyncClient(completions))
+    )
+    return AIService(
+        client=cast(Any, SimpleNamespace()), cache=ResponseCache(), engine=engine
+    )
+
+
+def test_process_article_for_users_batches_readers(ai_service, completions, settings):
+    settings.AI_READERS_PER_REQUEST = 2
+    entry = FeedEntryFactory()
+    robotics = UserFactory(interests="robotics")
+    robotics_too = UserFactory(interests="robotics")
+    finance = UserFactory(interests="finance")
+    biology = UserFactory(interests="biology")
+
+    results = ai_service.process_article_for_users(
+        entry, [robotics, robotics_too, finance, biology]
+    )
+
+    assert completions.requests == [
+        EntryAnalysis,
+        MultiReaderArticleAnalysis,
+        MultiReaderArticleAnalysis,
+    ]
+    assert results[robotics.pk] == results[robotics_too.pk]
+    assert results[robotics.pk].relevance_score == 10
+    assert results[finance.pk].relevance_score == 20
+    assert results[biology.pk].relevance_score == 10
+    assert all(result.error is None for result in results.values())
+    assert results[finance.pk].translated_title == "Translated title"
+
+
+def test_entry_analysis_is_computed_once(ai_service, completions):
+    entry = FeedEntryFactory()
+
+    ai_service.process_article_for_users(entry, [UserFactory(interests="robotics")])
+    ai_service.process_article_for_users(entry, [UserFactory(interests="finance")])
+
+    assert completions.requests.count(EntryAnalysis) == 1
+    entry.refresh_from_db()
+    assert entry.translated_title == "Translated title"
+    assert entry.summary == "General summary"
+    assert entry.last_processed is not None
+
+
+def test_identical_requests_are_served_from_cache(ai_service, completions):
+    entry = FeedEntryFactory()
+    user = UserFactory(interests="robotics")
+
+    first = ai_service.process_article_for_users(entry, [user])
+    second = ai_service.process_article_for_users(entry, [user])
+
+    assert completions.requests == [EntryAnalysis, MultiReaderArticleAnalysis]
+    assert first == second
+    assert ai_service.cache.hits == 1
+    assert ai_service.cache.misses == 2
+    assert CachedLLMResponse.objects.get(hits=1)
+
+
+def test_cache_evicts_expired_and_least_recently_used_entries():
+    cache = ResponseCache(ttl=60, max_entries=1)
+    for n in range(3):
+        cache.set(
+            f"key-{n}", "gpt-4o", EntryAnalysis(translated_title=str(n), summary="")
+        )
+    CachedLLMResponse.objects.filter(key="key-2").update(
+        expires_at=timezone.now() - timedelta(seconds=1)
+    )
+
+    assert cache.evict() == 2
+    assert list(CachedLLMResponse.objects.values_list("key", flat=True)) == ["key-1"]
+    assert cache.get("key-2", EntryAnalysis) is None
+
+
+def test_articles_are_processed_concurrently(ai_service, completions):
+    entries = FeedEntryFactory.create_batch(3)
+    user = UserFactory(interests="robotics")
+
+    results = ai_service.process_articles_for_users(
+        [(entry, [user]) for entry in entries]
+    )
+
+    assert completions.requests.count(EntryAnalysis) == 3
+    assert completions.requests.count(MultiReaderArticleAnalysis) == 3
+    assert all(results[entry.pk][user.pk].relevance_score == 10 for entry in entries)
+
+
+def test_rate_limited_requests_are_retried(ai_service, completions):
+    completions.rate_limited = 2
+    entry = FeedEntryFactory()
+
+    assert ai_service.analyze_entry(entry) is None
+    assert completions.requests == [EntryAnalysis]
+    assert ai_service.engine.limiter.paused_until > 0
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(capacity=60, period=60)
+    bucket.consume(60)
+
+    assert bucket.wait_time(30) == pytest.approx(30, abs=0.1)
+    # Oversized requests only wait for a full bucket
+    assert bucket.wait_time(600) == pytest.approx(60, abs=0.1)
+
+
+def test_rate_limiter_is_shared_by_threads():
+    limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=10_000)
+    granted = []
+
+    async def acquire_all():
+        for _ in range(5):
+            try:
+                await asyncio.wait_for(limiter.acquire(1), timeout=0.5)
+            except TimeoutError:
+                return
+            granted.append(1)
+
+    # Every thread runs its own event loop, like the update_feeds AI workers
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: asyncio.run(acquire_all()), range(4)))
+
+    assert len(granted) == 10
+
+
+def test_update_feeds_gives_each_ai_worker_its_own_service():
+    command = UpdateFeedsCommand()
+    command.ai_client = cast(Any, SimpleNamespace())
+    command.ai_cache = ResponseCache()
+    command.ai_engine = AsyncLLMEngine(client_factory=lambda: cast(Any, None))
+    command.ai_services = threading.local()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        services = list(pool.map(lambda _: command.ai_service(), range(2)))
+    services.append(command.ai_service())
+
+    assert len({id(service) for service in services}) >= 2
+    assert {id(service.cache) for service in services} == {id(command.ai_cache)}
+    assert {id(service.engine) for service in services} == {id(command.ai_engine)}
+
+
+def test_update_feeds_passes_on_only_new_entries(
+    monkeypatch, django_assert_num_queries
+):
+    old = FeedEntryFactory(article_loaded_at=None)
+    unchanged = FeedEntryFactory(article_loaded_at=None).feed
+    new = []
+
+    def update_feed(feed, fetched=None):
+        if feed != old.feed:
+            return 0, []
+        new.append(FeedEntryFactory(feed=feed, article_loaded_at=None))
+        return 1, []
+
+    monkeypatch.setattr(FeedService, "update_feed", update_feed)
+    command = UpdateFeedsCommand()
+    command.results_lock = threading.Lock()
+    command.results_by_feed = {
+        feed.id: {"entries_added": 0, "status": "success", "errors": []}
+        for feed in (old.feed, unchanged)
+    }
+
+    with django_assert_num_queries(0):
+        assert command.update_feeds([(unchanged, None)]) == []
+    assert command.update_feeds([(old.feed, None)]) == new
+
+
+def test_rate_limiter_follows_response_headers():
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+
+    limiter.observe(
+        {
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "1m30s",
+            "x-ratelimit-remaining-tokens": "10",
+        }
+    )
+
+    assert limiter.requests.level <= 0.1
+    assert limiter.tokens.level <= 11
+    assert limiter.paused_until - time.monotonic() == pytest.approx(90, abs=1)
+
+
+@pytest.fixture
+def batch_client():
+    return FakeBatchClient()
+
+
+@pytest.fixture
+def batch_service(batch_client):
+    return AIService(
+        client=cast(Any, SimpleNamespace()),
+        cache=ResponseCache(),
+        engine=AsyncLLMEngine(client_factory=lambda: cast(Any, None)),
+        batch_api=BatchAPI(batch_client),
+    )
+
+
+def test_batch_results_are_ingested_once_finished(batch_service, batch_client):
+    entry = FeedEntryFactory()
+    robotics = UserFactory(interests="robotics")
+    finance = UserFactory(interests="finance")
+    UserArticleInteraction.objects.create(user=finance, entry=entry, relevance_score=1)
+    work = [(entry, [robotics, finance])]
+
+    job = batch_service.submit_batch(work)
+
+    assert job.status == AIBatchJob.Status.SUBMITTED
+    assert set(job.requests) == {f"entry-{entry.pk}", f"readers-{entry.pk}-0"}
+    # Work covered by an unfinished job isn't submitted twice
+    assert batch_service.submit_batch(work) is None
+    assert batch_service.ingest_batch(job) is None
+
+    batch_client.status = "completed"
+    assert batch_service.ingest_batch(job) == (2, [])
+
+    job.refresh_from_db()
+    assert job.status == AIBatchJob.Status.INGESTED
+    assert LLMUsage.objects.filter(batch=True, prompt_tokens=100).count() == 2
+    entry.refresh_from_db()
+    assert entry.translated_title == "Batch title"
+    interactions = {
+        interaction.user_id: interaction
+        for interaction in UserArticleInteraction.objects.filter(entry=entry)
+    }
+    assert interactions[robotics.pk].relevance_score == 10
+    assert interactions[finance.pk].relevance_score == 20
+    assert interactions[finance.pk].translated_title == "Batch title"
+
+
+def test_batch_requests_use_strict_json_schemas():
+    param = response_format_param(MultiReaderArticleAnalysis)
+    reader = param["json_schema"]["schema"]["$defs"]["ReaderAnalysis"]
+    assert param["json_schema"]["name"] == "MultiReaderArticleAnalysis"
+    assert param["json_schema"]["strict"] is True
+    assert reader["additionalProperties"] is False
+    assert reader["required"] == ["reader_id", "relevance_score", "summary"]
+
+    schema = response_format_param(ArticleAnalysis)["json_schema"]["schema"]
+    assert schema["required"] == [
+        "summary",
+        "relevance_score",
+        "translated_title",
+        "error",
+    ]
+    assert "default" not in schema["properties"]["error"]
+
+
+def test_batch_job_is_resubmitted_after_failed_upload(batch_service, batch_client):
+    entry = FeedEntryFactory(translated_title="Title", summary="Summary")
+    batch_client.fail_uploads = 1
+
+    with pytest.raises(openai.APIConnectionError):
+        batch_service.submit_batch([(entry, [UserFactory()])])
+
+    job = AIBatchJob.objects.get()
+    assert job.status == AIBatchJob.Status.PENDING
+    # Entries that were already analyzed only need their reader requests
+    assert list(job.requests) == [f"readers-{entry.pk}-0"]
+
+    batch_service.submit_job(job)
+    assert job.status == AIBatchJob.Status.SUBMITTED
+    assert job.batch_id
+
+
+def test_long_content_is_trimmed_and_usage_recorded(ai_service, completions, settings):
+    settings.AI_CONTENT_MAX_TOKENS = 50
+    paragraphs = [f"Paragraph {n} " + "word " * 40 for n in range(20)]
+    entry = FeedEntryFactory(full_content="\n\n".join(paragraphs))
+
+    ai_service.process_article_for_users(entry, [UserFactory(interests="robotics")])
+
+    usage = LLMUsage.objects.filter(entry=entry).order_by("purpose")
+    assert [record.purpose for record in usage] == [
+        "EntryAnalysis",
+        "MultiReaderArticleAnalysis",
+    ]
+    assert all(record.content_truncated for record in usage)
+    assert all(0 < record.content_tokens <= 50 for record in usage)
+    assert all(record.completion_tokens == 50 for record in usage)
+
+
+def test_prepared_content_follows_reloaded_content(ai_service, monkeypatch):
+    monkeypatch.setattr(AIService, "PREPARED_CONTENT_CACHE_SIZE", 2)
+    entry = FeedEntryFactory(full_content="First version")
+    assert ai_service._prepared_content(entry).text == "First version"
+
+    entry.full_content = "Reloaded version"
+    assert ai_service._prepared_content(entry).text == "Reloaded version"
+    ai_service._prepared_content(FeedEntryFactory())
+    assert len(ai_service._prepared) == 2
+
+
+def test_process_unprocessed_articles_reports_feeds_added_during_the_run(
+    monkeypatch,
+):
+    subscription = UserFeedSubscriptionFactory()
+    FeedEntryFactory(feed=subscription.feed)
+    pending_interactions = AIService.pending_interactions
+    late = {}
+
+    def add_feed_then_plan(since, reprocess=False):
+        # The feed shows up after the report was initialized
+        late["subscription"] = UserFeedSubscriptionFactory(feed__title="Late feed")
+        FeedEntryFactory(feed=late["subscription"].feed)
+        return pending_interactions(since, reprocess)
+
+    def analyze(self, work):
+        return {
+            entry.pk: {
+                user.pk: ArticleAnalysis(
+                    summary="Summary", relevance_score=50, translated_title="Title"
+                )
+                for user in users
+            }
+            for entry, users in work
+        }
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(
+        AIService, "pending_interactions", staticmethod(add_feed_then_plan)
+    )
+    monkeypatch.setattr(AIService, "process_articles_for_users", analyze)
+    out = StringIO()
+
+    call_command("process_unprocessed_articles", stdout=out)
+
+    assert UserArticleInteraction.objects.filter(
+        user=late["subscription"].user
+    ).exists()
+    assert UserArticleInteraction.objects.filter(user=subscription.user).exists()
+    assert "Late feed" in out.getvalue()
+
+
+def test_pending_interactions_is_a_single_anti_join(django_assert_num_queries):
+    subscription = UserFeedSubscriptionFactory()
+    other = UserFeedSubscriptionFactory(feed=subscription.feed)
+    UserFeedSubscriptionFactory(feed=subscription.feed, is_active=False)
+    done, pending = FeedEntryFactory.create_batch(2, feed=subscription.feed)
+    FeedEntryFactory(feed=subscription.feed, article_load_error="Timed out")
+    FeedEntryFactory(
+        feed=subscription.feed, published_at=timezone.now() - timedelta(days=3)
+    )
+    UserArticleInteraction.objects.create(user=subscription.user, entry=done)
+    since = timezone.now() - timedelta(hours=48)
+
+    with django_assert_num_queries(1):
+        pairs = list(AIService.pending_interactions(since).iterator())
+
+    assert pairs == [
+        (done.pk, other.user_id),
+        (pending.pk, subscription.user_id),
+        (pending.pk, other.user_id),
+    ]
+    assert len(list(AIService.pending_interactions(since, reprocess=True))) == 4
@@ -0,0 +1,65 @@
+import pytest
+
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+
+pytestmark = pytest.mark.django_db
+
+ARTICLE_HTML = """
+<html>
+  <head><title>Quantum leap</title></head>
+  <body>
+    <article>
+      <h1>Quantum leap</h1>
+      <p>Researchers announced a new error-correction scheme for quantum
+      computers on Monday, saying it cuts the number of physical qubits needed
+      per logical qubit by an order of magnitude.</p>
+      <p>The team expects the first hardware demonstration to follow next year,
+      once the control electronics have been redesigned for the new layout.</p>
+    </article>
+  </body>
+</html>
+"""
+
+
+@pytest.fixture
+def fake_downloads(monkeypatch):
+    def download_html(url: str) -> str:
+        if url.endswith("/broken"):
+            raise ValueError("Status code 500")
+        return ARTICLE_HTML
+
+    monkeypatch.setattr(ArticleLoader, "download_html", staticmethod(download_html))
+
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_load_updates_entries_in_bulk(fake_downloads, parse_workers):
+    loaded = FeedEntryFactory(url="https://news.example.com/quantum")
+    broken = FeedEntryFactory(url="https://news.example.com/broken")
+
+    results = ArticleLoader(download_workers=2, parse_workers=parse_workers).load(
+        [loaded, broken]
+    )
+
+    outcomes = {result.entry.pk: result for result in results}
+    assert outcomes[loaded.pk].success
+    assert not outcomes[broken.pk].success
+
+    loaded.refresh_from_db()
+    broken.refresh_from_db()
+    assert "error-correction scheme" in loaded.full_content
+    assert loaded.article_loaded_at is not None
+    assert loaded.article_load_error == ""
+    assert broken.article_loaded_at is None
+    assert "Status code 500" in broken.article_load_error
+
+
+def test_parse_processes_are_reused_by_every_load(fake_downloads):
+    with ArticleLoader(download_workers=2, parse_workers=1) as loader:
+        loader.load([FeedEntryFactory()])
+        parser = loader._parser
+        results = loader.load([FeedEntryFactory()])
+
+        assert loader._parser is parser
+        assert results[0].success
+    assert loader._parser is None
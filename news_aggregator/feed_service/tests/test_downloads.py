@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from news_aggregator.feed_service import articles
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.downloads import PoliteSession
+
+
+class FakeAdapter(BaseAdapter):
+    """Serves canned responses and records the requests made per host."""
+
+    def __init__(self, robots: str = "", status_code: int = 200, latency: float = 0):
+        super().__init__()
+        self.robots = robots
+        self.status_code = status_code
+        self.latency = latency
+        self.requests: list[tuple[str, float]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        if request.url.endswith("/robots.txt"):
+            response.status_code = 200 if self.robots else 404
+            response._content = self.robots.encode()
+            return response
+
+        with self.lock:
+            self.requests.append((request.url, time.monotonic()))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        response.status_code = self.status_code
+        response._content = b"<html><body><p>Article</p></body></html>"
+        return response
+
+    def close(self):
+        pass
+
+
+def polite_session(adapter: FakeAdapter, **kwargs) -> PoliteSession:
+    session = PoliteSession(timeout=5, **kwargs)
+    session.session.mount("https://", adapter)
+    return session
+
+
+def test_requests_are_spaced_by_crawl_delay():
+    adapter = FakeAdapter(robots="User-agent: *\nCrawl-delay: 1\n")
+    # The delay is capped to keep the test short
+    session = polite_session(adapter, per_host_concurrency=4, max_crawl_delay=0.2)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(session.get, [f"https://a.example.com/{n}" for n in range(3)]))
+
+    times = sorted(started for _, started in adapter.requests)
+    assert min(b - a for a, b in zip(times, times[1:])) >= 0.19
+    assert session.crawl_delay("https://a.example.com") == 0.2
+
+
+def test_crawl_delay_is_capped():
+    adapter = FakeAdapter(robots="User-agent: *\nCrawl-delay: 3600\n")
+    session = polite_session(adapter, max_crawl_delay=1.5)
+
+    assert session.crawl_delay("https://a.example.com") == 1.5
+
+
+def test_concurrency_is_limited_per_host():
+    adapter = FakeAdapter(latency=0.05)
+    session = polite_session(adapter, per_host_concurrency=2)
+    urls = [f"https://a.example.com/{n}" for n in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(session.get, urls))
+    assert adapter.max_in_flight == 2
+
+    adapter.max_in_flight = 0
+    urls = [f"https://host{n}.example.com/" for n in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(session.get, urls))
+    assert adapter.max_in_flight > 2
+
+
+def test_download_html_rejects_error_responses():
+    session = polite_session(FakeAdapter(status_code=404))
+    loader = ArticleLoader(session=session)
+
+    with pytest.raises(ValueError, match="Status code 404"):
+        loader.download_html("https://a.example.com/missing")
+
+    session = polite_session(FakeAdapter())
+    loader = ArticleLoader(session=session)
+    assert "Article" in loader.download_html("https://a.example.com/article")
+
+
+def test_download_html_decodes_byte_bodies(monkeypatch):
+    html = "<html><body><p>Café</p></body></html>"
+    monkeypatch.setattr(
+        articles,
+        "get_html_status",
+        lambda url, response: (html.encode("utf-8"), 200, []),
+    )
+    loader = ArticleLoader(session=polite_session(FakeAdapter()))
+
+    assert loader.download_html("https://a.example.com/article") == html
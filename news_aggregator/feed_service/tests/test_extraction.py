@@ -0,0 +1,74 @@
+from news_aggregator.feed_service.extraction import extract_listing
+from news_aggregator.feed_service.extraction import learn_listing_selectors
+from news_aggregator.feed_service.extraction import listing_fingerprint
+
+URL = "https://news.example.com/"
+
+
+def listing_page(stories: list[str], chrome: str = "") -> str:
+    links = "\n".join(
+        f'<li><a href="/{n}?utm_source=home#top">{story}</a></li>'
+        for n, story in enumerate(stories)
+    )
+    return f"""
+<html>
+  <head><script>var rendered = "{chrome}";</script></head>
+  <body>
+    <nav><a href="/about">About {chrome}</a></nav>
+    <main><ul>{links}</ul><p>Updated {chrome}</p></main>
+    <footer><a href="/privacy">Privacy</a></footer>
+  </body>
+</html>
+"""
+
+
+def test_fingerprint_ignores_page_chrome():
+    stories = ["Budget approved", "Rail strike ends", "New mayor sworn in"]
+
+    first = listing_fingerprint(listing_page(stories, "09:00"), URL)
+    assert first
+    assert listing_fingerprint(listing_page(stories, "09:05").encode(), URL) == first
+    assert listing_fingerprint(listing_page(["Storm warning", *stories]), URL) != first
+
+
+def test_fingerprint_needs_enough_links():
+    assert listing_fingerprint(listing_page(["Only story"]), URL) == ""
+    assert listing_fingerprint("", URL) == ""
+
+
+def news_page(stories: list[str]) -> str:
+    items = "\n".join(
+        f"""<article class="story">
+              <h2 class="headline"><a href="/news/{n}">{story}</a></h2>
+              <time datetime="2025-01-0{n + 1}T10:00:00">Jan {n + 1}</time>
+              <a href="/news/{n}#comments">Comments</a>
+            </article>"""
+        for n, story in enumerate(stories)
+    )
+    return f"""
+<html><body>
+  <div class="sidebar"><a href="/about">About us</a><a href="/jobs">Jobs</a></div>
+  <section>{items}</section>
+</body></html>
+"""
+
+
+STORIES = ["Budget approved", "Rail strike ends", "New mayor sworn in"]
+
+
+def test_learned_selectors_extract_later_versions_of_the_page():
+    links = [f"{URL}news/{n}" for n in range(len(STORIES))]
+    selectors = learn_listing_selectors(news_page(STORIES), URL, links)
+    assert selectors is not None
+
+    entries = extract_listing(news_page(["Storm warning", *STORIES]), URL, selectors)
+
+    assert [entry["title"] for entry in entries] == ["Storm warning", *STORIES]
+    assert entries[0]["link"] == f"{URL}news/0"
+    assert entries[0]["published"] == "2025-01-01T10:00:00"
+
+
+def test_no_selectors_are_learned_for_links_not_on_the_page():
+    links = [f"{URL}elsewhere/{n}" for n in range(3)]
+
+    assert learn_listing_selectors(news_page(STORIES), URL, links) is None
@@ -0,0 +1,126 @@
+import asyncio
+
+import httpx
+import pytest
+
+from news_aggregator.feed_service.fetcher import FeedFetcher
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.tests.factories import FeedFactory
+
+RSS_DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Example News</title>
+    <description>All the news</description>
+    <item>
+      <title>First story</title>
+      <link>https://news.example.com/first</link>
+      <description>First summary</description>
+      <pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate>
+    </item>
+    <item>
+      <title>Second story</title>
+      <link>https://news.example.com/second</link>
+      <description>Second summary</description>
+      <pubDate>Sun, 05 Jan 2025 10:00:00 GMT</pubDate>
+    </item>
+  </channel>
+</rss>
+"""
+
+
+def test_fetch_respects_per_host_limit():
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, content=RSS_DOCUMENT)
+
+    urls = [f"https://a.example.com/{i}.xml" for i in range(6)] + [
+        f"https://b.example.com/{i}.xml" for i in range(6)
+    ]
+    fetcher = FeedFetcher(
+        max_concurrency=10,
+        per_host_concurrency=2,
+        transport=httpx.MockTransport(handler),
+    )
+
+    results = fetcher.fetch(urls)
+
+    assert set(results) == set(urls)
+    assert all(result.ok for result in results.values())
+    assert peak == {"a.example.com": 2, "b.example.com": 2}
+
+
+def test_fetch_reports_http_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/broken.xml":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(404)
+
+    fetcher = FeedFetcher(transport=httpx.MockTransport(handler))
+    results = fetcher.fetch(
+        ["https://a.example.com/broken.xml", "https://a.example.com/missing.xml"]
+    )
+
+    assert "connection refused" in results["https://a.example.com/broken.xml"].error
+    missing = results["https://a.example.com/missing.xml"]
+    assert missing.status_code == 404
+    assert not missing.ok
+
+
+@pytest.mark.django_db
+def test_update_feed_parses_fetched_content():
+    feed = FeedFactory()
+    fetcher = FeedFetcher(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=RSS_DOCUMENT)
+        )
+    )
+    fetched = fetcher.fetch([feed.url])[feed.url]
+
+    entries_added, errors = FeedService.update_feed(feed, fetched=fetched)
+
+    assert errors == []
+    assert entries_added == 2
+    assert set(feed.entries.values_list("url", flat=True)) == {
+        "https://news.example.com/first",
+        "https://news.example.com/second",
+    }
+
+
+@pytest.mark.django_db
+def test_update_feed_uses_conditional_get():
+    feed = FeedFactory()
+    seen_headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_headers.append(request.headers)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            content=RSS_DOCUMENT,
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 06 Jan 2025 10:00:00 GMT"},
+        )
+
+    fetcher = FeedFetcher(transport=httpx.MockTransport(handler))
+
+    fetched = fetcher.fetch([feed.url])[feed.url]
+    assert FeedService.update_feed(feed, fetched=fetched) == (2, [])
+    feed.refresh_from_db()
+    assert feed.etag == '"v1"'
+    assert feed.modified == "Mon, 06 Jan 2025 10:00:00 GMT"
+
+    fetched = fetcher.fetch([feed.url], {feed.url: (feed.etag, feed.modified)})[
+        feed.url
+    ]
+    assert fetched.not_modified
+    assert FeedService.update_feed(feed, fetched=fetched) == (0, [])
+    assert seen_headers[1]["if-modified-since"] == feed.modified
+    assert feed.entries.count() == 2
@@ -0,0 +1,57 @@
+import pytest
+
+from news_aggregator.feed_service.interactions import InteractionWriter
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.services import ArticleAnalysis
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _analysis(score: int) -> ArticleAnalysis:
+    return ArticleAnalysis(
+        summary=f"Summary {score}", relevance_score=score, translated_title="Title"
+    )
+
+
+def test_writer_upserts_in_bulk(django_assert_num_queries):
+    user = UserFactory()
+    entries = FeedEntryFactory.create_batch(5)
+    UserArticleInteraction.objects.create(
+        user=user, entry=entries[0], relevance_score=1, custom_summary="Old"
+    )
+
+    # Per flush: the upsert, then the entries and subscriptions of the timelines
+    with django_assert_num_queries(6):
+        with InteractionWriter(flush_rows=3, flush_seconds=60) as writer:
+            for score, entry in enumerate(entries, start=1):
+                writer.add(user.pk, entry.pk, _analysis(score * 10))
+            assert writer.flushes == 1
+
+    assert writer.written == 5
+    scores = dict(
+        UserArticleInteraction.objects.values_list("entry_id", "relevance_score")
+    )
+    assert scores == {entry.pk: n * 10 for n, entry in enumerate(entries, start=1)}
+    assert UserArticleInteraction.objects.get(entry=entries[0]).custom_summary == (
+        "Summary 10"
+    )
+
+
+def test_writer_flushes_after_timeout_and_keeps_latest_result():
+    user = UserFactory()
+    entry = FeedEntryFactory()
+    writer = InteractionWriter(flush_rows=100, flush_seconds=60)
+
+    writer.add(user.pk, entry.pk, _analysis(10))
+    writer.add(user.pk, entry.pk, _analysis(20))
+    assert writer.flushes == 0
+    writer.close()
+
+    assert UserArticleInteraction.objects.get().relevance_score == 20
+
+    writer.flush_seconds = 0
+    writer.add(user.pk, entry.pk, _analysis(30))
+    assert writer.flushes == 2
+    assert UserArticleInteraction.objects.get().relevance_score == 30
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import httpx
+
+from news_aggregator.feed_service.fetcher import FeedFetcher
+from news_aggregator.feed_service.pipeline import Pipeline
+from news_aggregator.feed_service.pipeline import Stage
+
+
+def test_pipeline_runs_items_through_every_stage():
+    seen = []
+
+    def double(items):
+        return [item * 2 for item in items]
+
+    def collect(items):
+        seen.extend(items)
+
+    pipeline = Pipeline(
+        [
+            Stage("double", double, workers=3),
+            Stage("collect", collect, batch_size=4, batch_timeout=0.01),
+        ]
+    )
+    stats = pipeline.run(range(20))
+
+    assert sorted(seen) == [n * 2 for n in range(20)]
+    assert [s.items_in for s in stats] == [20, 20]
+    assert stats[0].items_out == 20
+    assert stats[1].batches < 20
+
+
+def test_slow_stage_pushes_back_on_the_source():
+    produced = []
+    consumed: list[int] = []
+    leads = []
+
+    def source():
+        for n in range(30):
+            produced.append(n)
+            yield n
+
+    def slow(items):
+        time.sleep(0.005)
+        leads.append(len(produced) - len(consumed))
+        consumed.extend(items)
+
+    pipeline = Pipeline(
+        [
+            Stage("pass", lambda items: items, queue_size=2),
+            Stage("slow", slow, queue_size=2),
+        ]
+    )
+    stats = pipeline.run(source())
+
+    assert len(consumed) == 30
+    # Two queues of two, an item in hand per worker and one blocked in the source
+    assert max(leads) <= 7
+    assert stats[0].max_queue_depth <= 2
+    assert stats[1].max_queue_depth <= 2
+    assert stats[0].blocked_seconds > 0
+
+
+def test_stage_errors_are_counted_and_skipped():
+    def flaky(items):
+        if items[0] % 2:
+            raise ValueError("odd item")
+        return items
+
+    stats = Pipeline([Stage("flaky", flaky)]).run(range(10))
+
+    assert stats[0].errors == 5
+    assert stats[0].items_out == 5
+
+
+def test_iter_fetch_yields_results_as_they_complete():
+    fetcher = FeedFetcher(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b""))
+    )
+    urls = [f"https://a.example.com/{n}.xml" for n in range(10)]
+
+    results = list(fetcher.iter_fetch(urls, buffer_size=2))
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.ok for result in results)
+
+
+def test_iter_fetch_stops_when_the_consumer_does():
+    fetcher = FeedFetcher(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b""))
+    )
+    urls = [f"https://a.example.com/{n}.xml" for n in range(10)]
+
+    results = fetcher.iter_fetch(urls, buffer_size=1)
+    next(results)
+    results.close()
+
+    for thread in threading.enumerate():
+        if thread.name == "feed-fetcher":
+            thread.join(timeout=5)
+            assert not thread.is_alive()
@@ -0,0 +1,117 @@
+"""
+Query-plan regression tests: the queries of the dashboard and the feed
+pipeline must be able to use the FeedEntry indexes built for them.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import UserTimelineEntry
+from news_aggregator.feed_service.services import AIService
+from news_aggregator.feed_service.tests.factories import FeedFactory
+from news_aggregator.feed_service.tests.factories import UserFeedSubscriptionFactory
+
+pytestmark = pytest.mark.django_db
+
+FEEDS = 20
+ENTRIES_PER_FEED = 250
+
+
+@pytest.fixture
+def seeded():
+    """A few thousand entries, most of them old and loaded, then fresh statistics."""
+    now = timezone.now()
+    feeds = FeedFactory.create_batch(FEEDS)
+    entries = []
+    for feed in feeds:
+        for n in range(ENTRIES_PER_FEED):
+            pending = n < 5
+            failed = 5 <= n < 10
+            entries.append(
+                FeedEntry(
+                    feed=feed,
+                    title=f"Story {n}",
+                    url=f"{feed.url}/{n}",
+                    full_content="",
+                    published_at=now - timedelta(hours=n),
+                    article_loaded_at=None if pending or failed else now,
+                    article_load_error="Timeout" if failed else "",
+                )
+            )
+    FeedEntry.objects.bulk_create(entries)
+    subscription = UserFeedSubscriptionFactory(feed=feeds[0])
+    UserFeedSubscriptionFactory(feed=feeds[1], user=subscription.user)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE feed_service_feedentry")
+        # The seeded tables are still small, make sure an index is preferred
+        # whenever one applies
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    return feeds, subscription.user
+
+
+def test_home_timeline_reads_timeline_index(seeded):
+    feeds, user = seeded
+    for feed in feeds[:2]:
+        timeline.add_feed(user.pk, feed.pk)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE feed_service_usertimelineentry")
+    oldest = timezone.now() - timedelta(hours=100)
+
+    plan = (
+        UserTimelineEntry.objects.filter(user=user, published_at__lte=oldest)
+        .order_by("-published_at", "-pk")[:20]
+        .explain()
+    )
+
+    assert "timeline_stream_idx" in plan
+    assert "Sort" not in plan
+
+    plan = (
+        UserTimelineEntry.objects.filter(user=user)
+        .order_by("-rank_score", "-pk")[:20]
+        .explain()
+    )
+
+    assert "timeline_rank_idx" in plan
+    assert "Sort" not in plan
+
+
+def test_pending_articles_use_partial_index(seeded):
+    feeds, _ = seeded
+    plan = FeedEntry.objects.filter(
+        feed=feeds[0], article_loaded_at__isnull=True, article_load_error=""
+    ).explain()
+
+    assert "feedentry_pending_load_idx" in plan
+
+
+def test_failed_articles_use_partial_index(seeded):
+    plan = FeedEntry.objects.filter(
+        article_load_error__gt="",
+        article_loaded_at__isnull=True,
+        published_at__gte=timezone.now() - timedelta(hours=48),
+    ).explain()
+
+    assert "feedentry_failed_load_idx" in plan
+
+
+def test_recent_entries_use_stream_index(seeded):
+    since = timezone.now() - timedelta(hours=3)
+
+    plan = AIService.pending_interactions(since).explain()
+
+    assert "feedentry_stream_idx" in plan
+
+
+def test_feed_page_reads_entries_in_index_order(seeded):
+    feeds, _ = seeded
+    plan = feeds[0].entries.order_by("-published_at")[:20].explain()
+
+    assert "feedentry_feed_stream_idx" in plan
+    assert "Sort" not in plan
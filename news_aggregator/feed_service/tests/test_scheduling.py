@@ -0,0 +1,105 @@
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from news_aggregator.feed_service import tasks
+from news_aggregator.feed_service.fetcher import FetchResult
+from news_aggregator.feed_service.scheduling import cache_lifetime
+from news_aggregator.feed_service.scheduling import next_fetch_time
+from news_aggregator.feed_service.scheduling import poll_interval
+from news_aggregator.feed_service.scheduling import update_publish_rate
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.tests.factories import FeedFactory
+
+NOW = datetime(2025, 1, 6, 10, 0, tzinfo=UTC)
+
+
+@pytest.fixture(autouse=True)
+def poll_settings(settings):
+    settings.FEED_POLL_MIN_INTERVAL = 15
+    settings.FEED_POLL_MAX_INTERVAL = 24 * 60
+    settings.FEED_POLL_DEFAULT_INTERVAL = 60
+    settings.FEED_POLL_TARGET_ENTRIES = 1.0
+    settings.FEED_POLL_RATE_SMOOTHING = 0.5
+
+
+def test_publish_rate_is_a_moving_average():
+    assert update_publish_rate(None, 6, timedelta(hours=2)) == 3.0
+    assert update_publish_rate(3.0, 0, timedelta(hours=2)) == 1.5
+    assert update_publish_rate(1.5, 1, timedelta(0)) == 1.5
+
+
+def test_poll_interval_follows_the_publish_rate():
+    assert poll_interval(None) == timedelta(hours=1)
+    assert poll_interval(2.0) == timedelta(minutes=30)
+    # Busy feeds are capped at the minimum, dead ones at the maximum interval
+    assert poll_interval(100.0) == timedelta(minutes=15)
+    assert poll_interval(0.0) == timedelta(hours=24)
+
+
+def test_cache_lifetime_reads_caching_headers():
+    assert cache_lifetime({"cache-control": "public, max-age=7200"}, NOW) == (
+        timedelta(hours=2)
+    )
+    assert cache_lifetime({"cache-control": "no-cache, max-age=7200"}, NOW) == (
+        timedelta(0)
+    )
+    assert cache_lifetime({"expires": "Mon, 06 Jan 2025 13:00:00 GMT"}, NOW) == (
+        timedelta(hours=3)
+    )
+    assert cache_lifetime({"retry-after": "600"}, NOW) == timedelta(minutes=10)
+    assert cache_lifetime({"expires": "0"}, NOW) == timedelta(0)
+
+
+def test_next_fetch_time_honours_caching_headers_up_to_the_maximum():
+    assert next_fetch_time(NOW, 2.0) == NOW + timedelta(minutes=30)
+    assert next_fetch_time(NOW, 2.0, {"cache-control": "max-age=3600"}) == (
+        NOW + timedelta(hours=1)
+    )
+    assert next_fetch_time(NOW, 2.0, {"cache-control": "max-age=864000"}) == (
+        NOW + timedelta(hours=24)
+    )
+
+
+@pytest.mark.django_db
+def test_schedule_next_fetch_learns_from_new_entries():
+    feed = FeedFactory()
+
+    # The first fetch imports the backlog and only starts the clock
+    FeedService.schedule_next_fetch(feed, 20)
+    assert feed.publish_rate is None
+    assert feed.next_fetch_at - feed.last_fetched_at == timedelta(hours=1)
+
+    feed.last_fetched_at -= timedelta(hours=1)
+    FeedService.schedule_next_fetch(
+        feed,
+        8,
+        FetchResult(url=feed.url, headers={"cache-control": "max-age=60"}),
+    )
+    assert feed.publish_rate == pytest.approx(8.0, rel=0.01)
+    assert feed.next_fetch_at - feed.last_fetched_at == timedelta(minutes=15)
+
+
+@pytest.mark.django_db
+def test_update_due_feeds_dispatches_only_due_feeds(monkeypatch, settings):
+    settings.FEED_POLL_LEASE = 30
+    now = timezone.now()
+    due = FeedFactory(next_fetch_at=now - timedelta(minutes=1))
+    new = FeedFactory(next_fetch_at=None)
+    later = FeedFactory(next_fetch_at=now + timedelta(hours=1))
+    FeedFactory(next_fetch_at=None, is_active=False)
+    dispatched: list[int] = []
+    monkeypatch.setattr(tasks, "fetch_feeds", dispatched.extend)
+
+    tasks.update_due_feeds()
+    # Dispatched feeds are leased until they have been fetched
+    tasks.update_due_feeds()
+
+    assert sorted(dispatched) == sorted([due.pk, new.pk])
+    due.refresh_from_db()
+    later.refresh_from_db()
+    assert due.next_fetch_at > now + timedelta(minutes=29)
+    assert later.next_fetch_at < now + timedelta(minutes=61)
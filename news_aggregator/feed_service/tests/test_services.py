@@ -0,0 +1,172 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from news_aggregator.feed_service import services
+from news_aggregator.feed_service.extraction import extract_listing
+from news_aggregator.feed_service.fetcher import FetchResult
+from news_aggregator.feed_service.models import Feed
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.services import FeedParseResult
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.feed_service.tests.factories import FeedFactory
+from news_aggregator.feed_service.tests.test_fetcher import RSS_DOCUMENT
+
+pytestmark = pytest.mark.django_db
+
+
+def _entry(n: int) -> dict:
+    return {
+        "title": f"Story {n}",
+        "link": f"https://news.example.com/{n}",
+        "description": f"Summary {n}",
+        "author": "",
+        "published_parsed": (2025, 1, n, 10, 0, 0),
+    }
+
+
+def test_bulk_create_feed_entries_skips_known_urls():
+    feed = FeedFactory()
+    FeedEntryFactory(feed=feed, url="https://news.example.com/1")
+    entries = [_entry(n) for n in range(1, 6)] + [_entry(2)]
+
+    with CaptureQueriesContext(connection) as queries:
+        added, errors = FeedService.bulk_create_feed_entries(feed, entries)
+
+    assert (added, errors) == (4, [])
+    # Known URLs, the insert, reading the new rows back and the subscribers
+    # to fan them out to
+    assert len(queries) == 4
+    assert feed.entries.count() == 5
+
+
+def test_bulk_create_feed_entries_ignores_concurrent_duplicates(monkeypatch):
+    feed = FeedFactory()
+    build_feed_entry = FeedService.build_feed_entry
+
+    def build_while_racing(feed, entry_data):
+        # Another update inserts the entry after the known URLs were read
+        if entry_data["link"] == "https://news.example.com/1":
+            build_feed_entry(feed, entry_data).save()
+        return build_feed_entry(feed, entry_data)
+
+    monkeypatch.setattr(FeedService, "build_feed_entry", build_while_racing)
+    added, errors = FeedService.bulk_create_feed_entries(feed, [_entry(1), _entry(2)])
+
+    assert (added, errors) == (1, [])
+    assert feed.entries.filter(url="https://news.example.com/1").count() == 1
+    assert feed.entries.count() == 2
+
+
+def test_bulk_create_feed_entries_reports_invalid_entries():
+    feed = FeedFactory()
+    too_long = _entry(2) | {"link": "https://news.example.com/" + "a" * 300}
+
+    added, errors = FeedService.bulk_create_feed_entries(feed, [_entry(1), too_long])
+
+    assert added == 1
+    assert len(errors) == 1
+    assert "too long" in errors[0]
+
+
+def test_update_feed_drops_oversized_validators():
+    feed = FeedFactory(etag='"old"')
+    fetched = FetchResult(
+        url=feed.url,
+        content=RSS_DOCUMENT,
+        status_code=200,
+        headers={"etag": '"' + "x" * 300 + '"', "last-modified": "Mon, 06 Jan 2025"},
+    )
+
+    assert FeedService.update_feed(feed, fetched=fetched) == (2, [])
+
+    feed.refresh_from_db()
+    assert (feed.etag, feed.modified) == ("", "Mon, 06 Jan 2025")
+    assert feed.latest_entry_at is not None
+
+
+def test_update_feed_skips_unchanged_websites(monkeypatch):
+    feed = FeedFactory(feed_type=Feed.FEED_TYPE_WEBSITE)
+    page = b"<main>" + b"".join(
+        b'<a href="/%d">Story %d</a>' % (n, n) for n in range(5)
+    )
+    scrapes = []
+
+    def parse_website(url):
+        scrapes.append(url)
+        return FeedParseResult(
+            title="News",
+            description="",
+            entries=[_entry(len(scrapes))],
+            is_website=True,
+        )
+
+    monkeypatch.setattr(FeedService, "parse_website", parse_website)
+
+    def fetched(content):
+        return FetchResult(url=feed.url, content=content, status_code=200)
+
+    assert FeedService.update_feed(feed, fetched=fetched(page)) == (1, [])
+    assert FeedService.update_feed(feed, fetched=fetched(page)) == (0, [])
+    assert len(scrapes) == 1
+
+    page += b'<a href="/new">Breaking story</a>'
+    assert FeedService.update_feed(feed, fetched=fetched(page)) == (1, [])
+    assert len(scrapes) == 2
+
+
+def test_scraped_and_extracted_links_match(monkeypatch):
+    link = "HTTPS://News.Example.com/story?id=1&utm_source=home#comments"
+
+    class FakeParsera:
+        def run(self, url, elements):
+            return {"site_title": "News", "news": [{"title": "Story", "link": link}]}
+
+    monkeypatch.setattr(services, "Parsera", FakeParsera)
+
+    scraped = FeedService.parse_website("https://news.example.com/")
+    extracted = extract_listing(
+        f'<a href="{link}">Story</a>', "https://news.example.com/", {"link": "//a"}
+    )
+
+    assert scraped.entries[0]["link"] == "https://news.example.com/story?id=1"
+    assert extracted[0]["link"] == scraped.entries[0]["link"]
+
+
+def test_update_feed_extracts_websites_with_learned_selectors(monkeypatch):
+    feed = FeedFactory(feed_type=Feed.FEED_TYPE_WEBSITE)
+    scrapes = []
+
+    def page(count):
+        return b"<ul>" + b"".join(
+            b'<li><a href="/%d">Story %d</a></li>' % (n, n) for n in range(count)
+        )
+
+    def parse_website(url):
+        scrapes.append(url)
+        return FeedParseResult(
+            title="News",
+            description="",
+            entries=[
+                _entry(n) | {"link": f"https://{feed.url.split('/')[2]}/{n}"}
+                for n in range(1, 4)
+            ],
+            is_website=True,
+        )
+
+    monkeypatch.setattr(FeedService, "parse_website", parse_website)
+
+    def fetched(content):
+        return FetchResult(url=feed.url, content=content, status_code=200)
+
+    assert FeedService.update_feed(feed, fetched=fetched(page(4))) == (3, [])
+    assert feed.listing_selectors is not None
+
+    assert FeedService.update_feed(feed, fetched=fetched(page(6))) == (3, [])
+    assert len(scrapes) == 1
+    assert feed.entries.count() == 6
+
+    # Parsera takes over again when the selectors stop matching
+    FeedService.update_feed(feed, fetched=fetched(b"<p>Redesigned</p>" * 3))
+    assert len(scrapes) == 2
@@ -0,0 +1,177 @@
+from datetime import UTC
+from datetime import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from news_aggregator.feed_service.fetcher import FetchResult
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.streaming import StreamingFeedParser
+from news_aggregator.feed_service.streaming import UnsupportedFeed
+from news_aggregator.feed_service.tests.factories import FeedFactory
+from news_aggregator.feed_service.tests.test_fetcher import RSS_DOCUMENT
+
+ATOM_DOCUMENT = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Example Blog</title>
+  <subtitle>Notes</subtitle>
+  <entry>
+    <title>Hello Atom</title>
+    <link rel="replies" href="https://blog.example.com/hello#comments"/>
+    <link href="https://blog.example.com/hello"/>
+    <author><name>Ada</name></author>
+    <updated>2025-01-06T10:00:00Z</updated>
+    <summary>Atom summary</summary>
+  </entry>
+</feed>
+"""
+
+RDF_DOCUMENT = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://purl.org/rss/1.0/">
+  <channel rdf:about="https://old.example.com/">
+    <title>Old News</title>
+    <link>https://old.example.com/</link>
+    <description>RSS 1.0</description>
+  </channel>
+  <item rdf:about="https://old.example.com/1">
+    <title>Vintage story</title>
+    <link>https://old.example.com/1</link>
+  </item>
+</rdf:RDF>
+"""
+
+
+def rss_document(count: int) -> bytes:
+    items = "".join(
+        f"""<item>
+              <title>Story {n}</title>
+              <link>https://news.example.com/{n}</link>
+              <pubDate>Mon, {20 - n:02d} Jan 2025 10:00:00 GMT</pubDate>
+            </item>"""
+        for n in range(count)
+    )
+    return f'<rss version="2.0"><channel><title>Archive</title>{items}</channel></rss>'.encode()
+
+
+def test_streaming_parser_reads_rss():
+    parser = StreamingFeedParser(RSS_DOCUMENT)
+    entries = list(parser.entries())
+
+    assert (parser.title, parser.description) == ("Example News", "All the news")
+    assert [entry["link"] for entry in entries] == [
+        "https://news.example.com/first",
+        "https://news.example.com/second",
+    ]
+    assert entries[0]["description"] == "First summary"
+    assert tuple(entries[0]["published_parsed"][:6]) == (2025, 1, 6, 10, 0, 0)
+
+
+def test_streaming_parser_reads_dublin_core_dates():
+    document = b"""<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">
+      <channel>
+        <title>Dublin Core</title>
+        <item>
+          <title>Dated</title>
+          <link>https://dc.example.com/1</link>
+          <dc:date>2025-01-06T10:00:00+01:00</dc:date>
+          <dc:creator>Ada</dc:creator>
+        </item>
+      </channel>
+    </rss>"""
+
+    [entry] = StreamingFeedParser(document).entries()
+
+    assert entry["author"] == "Ada"
+    assert tuple(entry["published_parsed"][:6]) == (2025, 1, 6, 9, 0, 0)
+
+
+def test_streaming_parser_reads_atom():
+    parser = StreamingFeedParser(ATOM_DOCUMENT)
+    [entry] = parser.entries()
+
+    assert parser.title == "Example Blog"
+    assert entry["link"] == "https://blog.example.com/hello"
+    assert entry["author"] == "Ada"
+    assert tuple(entry["published_parsed"][:6]) == (2025, 1, 6, 10, 0, 0)
+
+
+@pytest.mark.parametrize("document", [RDF_DOCUMENT, b"<rss><channel><item>"])
+def test_streaming_parser_rejects_other_documents(document):
+    with pytest.raises(UnsupportedFeed):
+        list(StreamingFeedParser(document).entries())
+
+
+def test_parse_rss_feed_falls_back_to_feedparser():
+    fetched = FetchResult(url="https://old.example.com/rss", content=RDF_DOCUMENT)
+    fetched.status_code = 200
+
+    parsed = FeedService.parse_rss_feed(fetched.url, fetched=fetched)
+
+    assert parsed.title == "Old News"
+    assert [entry["link"] for entry in parsed.entries] == ["https://old.example.com/1"]
+
+
+def test_stream_rss_feed_stops_at_known_entries(settings):
+    settings.FEED_STREAM_STOP_AFTER_KNOWN = 2
+    known = {"https://news.example.com/3", "https://news.example.com/4"}
+
+    parsed = FeedService.stream_rss_feed(
+        "https://news.example.com/rss",
+        rss_document(1000),
+        is_known=lambda entry: entry["link"] in known,
+    )
+
+    assert parsed.skipped_known
+    assert [entry["title"] for entry in parsed.entries] == [
+        "Story 0",
+        "Story 1",
+        "Story 2",
+    ]
+
+
+@pytest.mark.django_db
+def test_known_entries_uses_the_high_water_mark():
+    feed = FeedFactory(
+        latest_entry_at=datetime(2025, 1, 15, 10, 0, tzinfo=UTC),
+        recent_entry_hashes=[FeedService.entry_hash("https://news.example.com/1")],
+    )
+    is_known = FeedService.known_entries(feed)
+
+    entries = list(StreamingFeedParser(rss_document(8)).entries())
+
+    # Story 1 by its URL, stories 6 and 7 by their dates. Story 5 was
+    # published exactly at the mark but its URL is unseen, so it's new.
+    assert [is_known(entry) for entry in entries] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+        True,
+        True,
+    ]
+
+    # Ties with the mark are known once their URL is remembered
+    feed.recent_entry_hashes.append(
+        FeedService.entry_hash("https://news.example.com/5")
+    )
+    assert FeedService.known_entries(feed)(entries[5])
+
+
+@pytest.mark.django_db
+def test_update_feed_without_new_entries_skips_entry_queries():
+    feed = FeedFactory()
+
+    def fetched():
+        return FetchResult(url=feed.url, content=rss_document(5), status_code=200)
+
+    assert FeedService.update_feed(feed, fetched=fetched()) == (5, [])
+    assert feed.latest_entry_at == datetime(2025, 1, 20, 10, 0, tzinfo=UTC)
+    assert len(feed.recent_entry_hashes) == 5
+
+    with CaptureQueriesContext(connection) as queries:
+        assert FeedService.update_feed(feed, fetched=fetched()) == (0, [])
+    assert not [query for query in queries if "feed_service_feedentry" in query["sql"]]
@@ -0,0 +1,111 @@
+from typing import Any
+from typing import cast
+
+import httpx
+import pytest
+
+from news_aggregator.feed_service import tasks
+from news_aggregator.feed_service.articles import ArticleLoader
+from news_aggregator.feed_service.fetcher import FeedFetcher
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.services import AIService
+from news_aggregator.feed_service.services import ArticleAnalysis
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.feed_service.tests.factories import FeedFactory
+from news_aggregator.feed_service.tests.factories import UserFeedSubscriptionFactory
+from news_aggregator.feed_service.tests.test_fetcher import RSS_DOCUMENT
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def analyzed(monkeypatch, settings):
+    """Run the task graph eagerly with canned feeds, articles and AI results."""
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    build_client = FeedFetcher._build_client
+
+    def mock_client(fetcher):
+        fetcher.transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=RSS_DOCUMENT)
+        )
+        return build_client(fetcher)
+
+    monkeypatch.setattr(FeedFetcher, "_build_client", mock_client)
+    monkeypatch.setattr(
+        ArticleLoader, "_download_and_extract", lambda self, url: f"Article at {url}"
+    )
+
+    calls = []
+
+    def process_articles_for_users(self, work):
+        calls.append([(entry.pk, [user.pk for user in users]) for entry, users in work])
+        return {
+            entry.pk: {
+                user.pk: ArticleAnalysis(
+                    summary="Summary", relevance_score=50, translated_title="Title"
+                )
+                for user in users
+            }
+            for entry, users in work
+        }
+
+    monkeypatch.setattr(
+        AIService, "process_articles_for_users", process_articles_for_users
+    )
+    monkeypatch.setattr(
+        tasks, "ai_service", lambda: AIService(client=cast(Any, object()))
+    )
+    return calls
+
+
+def test_update_all_feeds_runs_the_whole_graph(analyzed, settings):
+    settings.AI_USERS_PER_TASK = 2
+    feed = FeedFactory()
+    subscriptions = UserFeedSubscriptionFactory.create_batch(3, feed=feed)
+    FeedFactory(is_active=False)
+
+    tasks.update_all_feeds.delay()
+
+    assert feed.entries.filter(article_loaded_at__isnull=False).count() == 2
+    # Each article is analyzed in chunks of AI_USERS_PER_TASK subscribers
+    assert sorted(len(call[0][1]) for call in analyzed) == [1, 1, 2, 2]
+    assert UserArticleInteraction.objects.count() == 2 * len(subscriptions)
+
+
+def test_fetch_feed_only_queues_new_entries(analyzed):
+    feed = FeedFactory()
+    UserFeedSubscriptionFactory(feed=feed)
+    # Still waiting for its article from an earlier fetch
+    FeedEntryFactory(feed=feed)
+
+    assert tasks.fetch_feed(feed.pk)["articles_queued"] == 2
+    assert len(analyzed) == 2
+
+    # The second fetch finds nothing new
+    assert tasks.fetch_feed(feed.pk)["articles_queued"] == 0
+    assert len(analyzed) == 2
+
+
+def test_analyze_skips_users_with_an_interaction(analyzed):
+    entry = FeedEntryFactory()
+    done, pending = UserFeedSubscriptionFactory.create_batch(2, feed=entry.feed)
+    UserArticleInteraction.objects.create(user=done.user, entry=entry)
+
+    assert tasks.analyze.delay(entry.pk, [done.user_id, pending.user_id]).get() == 1
+    assert analyzed == [[(entry.pk, [pending.user_id])]]
+    assert tasks.analyze.delay(entry.pk, [done.user_id]).get() == 0
+    assert len(analyzed) == 1
+
+
+def test_analyze_skips_entries_that_failed_to_load(analyzed):
+    entry = FeedEntryFactory()
+
+    assert tasks.analyze.delay(None, [1]).get() == 0
+    assert tasks.load_article.delay(entry.pk).get() == entry.pk
+    assert analyzed == []
+
+
+def test_fetch_feed_reports_missing_feeds(analyzed):
+    result = tasks.fetch_feed.delay(0).get()
+
+    assert result["errors"] == ["Feed not found"]
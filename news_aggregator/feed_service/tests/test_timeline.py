@@ -0,0 +1,138 @@
+from datetime import timedelta
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from news_aggregator.feed_service import timeline
+from news_aggregator.feed_service.interactions import InteractionWriter
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.models import UserTimelineEntry
+from news_aggregator.feed_service.services import ArticleAnalysis
+from news_aggregator.feed_service.services import FeedService
+from news_aggregator.feed_service.tests.factories import FeedEntryFactory
+from news_aggregator.feed_service.tests.factories import UserFeedSubscriptionFactory
+from news_aggregator.feed_service.tests.test_services import _entry
+
+pytestmark = pytest.mark.django_db
+
+
+def timeline_of(user) -> dict[int, UserTimelineEntry]:
+    return {row.entry_id: row for row in UserTimelineEntry.objects.filter(user=user)}
+
+
+def test_new_entries_fan_out_to_active_subscribers():
+    subscription = UserFeedSubscriptionFactory()
+    inactive = UserFeedSubscriptionFactory(feed=subscription.feed, is_active=False)
+
+    FeedService.bulk_create_feed_entries(subscription.feed, [_entry(1), _entry(2)])
+
+    rows = timeline_of(subscription.user)
+    assert sorted(row.title for row in rows.values()) == ["Story 1", "Story 2"]
+    assert {row.summary for row in rows.values()} == {"Summary 1", "Summary 2"}
+    assert not timeline_of(inactive.user)
+
+
+def test_interactions_update_the_timeline():
+    subscription = UserFeedSubscriptionFactory()
+    entry = FeedEntryFactory(feed=subscription.feed, title="Original")
+    timeline.fan_out([entry])
+    stranger = UserFeedSubscriptionFactory().user
+
+    with InteractionWriter() as writer:
+        for user in (subscription.user, stranger):
+            writer.add(
+                user.pk,
+                entry.pk,
+                ArticleAnalysis(
+                    summary="For you", relevance_score=80, translated_title="Translated"
+                ),
+            )
+
+    row = timeline_of(subscription.user)[entry.pk]
+    assert (row.title, row.summary, row.relevance_score) == (
+        "Translated",
+        "For you",
+        80,
+    )
+    # The stranger isn't subscribed to the entry's feed
+    assert not timeline_of(stranger)
+
+
+def test_entry_analysis_updates_rows_without_interactions():
+    subscription = UserFeedSubscriptionFactory()
+    analyzed = UserFeedSubscriptionFactory(feed=subscription.feed)
+    entry = FeedEntryFactory(feed=subscription.feed)
+    timeline.fan_out([entry])
+    UserArticleInteraction.objects.create(
+        user=analyzed.user, entry=entry, custom_summary="Mine"
+    )
+    timeline.update_interactions(list(UserArticleInteraction.objects.all()))
+
+    entry.translated_title = "Translated"
+    entry.summary = "General summary"
+    assert timeline.update_entry(entry) == 1
+
+    assert timeline_of(subscription.user)[entry.pk].summary == "General summary"
+    assert timeline_of(analyzed.user)[entry.pk].summary == "Mine"
+
+
+def test_subscribing_backfills_and_unsubscribing_clears(client):
+    subscription = UserFeedSubscriptionFactory()
+    entries = FeedEntryFactory.create_batch(3, feed=subscription.feed)
+    UserArticleInteraction.objects.create(
+        user=subscription.user, entry=entries[0], relevance_score=55
+    )
+    feed_id = subscription.feed_id
+    client.force_login(subscription.user)
+
+    client.post(reverse("dashboard:unsubscribe_feed", args=[feed_id]))
+    assert not timeline_of(subscription.user)
+
+    client.post(reverse("dashboard:subscribe_feed", args=[feed_id]))
+    rows = timeline_of(subscription.user)
+    assert set(rows) == {entry.pk for entry in entries}
+    assert rows[entries[0].pk].relevance_score == 55
+
+
+def test_rank_score_halves_relevance_every_half_life(settings):
+    settings.HOME_TOP_STORIES_HALF_LIFE = 12
+    now = timezone.now()
+
+    fresh = timeline.rank_score(49, now)
+    # (99 + 1) halved is 49 + 1, the older story ties with the fresh one
+    older = timeline.rank_score(99, now - timedelta(hours=12))
+    assert older == pytest.approx(fresh, abs=0.01)
+    assert timeline.rank_score(0, now) > timeline.rank_score(
+        0, now - timedelta(hours=1)
+    )
+
+
+def test_rebuild_timelines_command():
+    subscription = UserFeedSubscriptionFactory()
+    FeedEntryFactory.create_batch(2, feed=subscription.feed)
+
+    call_command("rebuild_timelines", "--clear")
+
+    assert len(timeline_of(subscription.user)) == 2
+
+
+def test_migration_builds_timelines_of_existing_subscriptions():
+    subscription = UserFeedSubscriptionFactory()
+    entries = FeedEntryFactory.create_batch(2, feed=subscription.feed)
+    UserFeedSubscriptionFactory(feed=subscription.feed, is_active=False)
+    UserArticleInteraction.objects.create(
+        user=subscription.user, entry=entries[0], custom_summary="Mine"
+    )
+    UserTimelineEntry.objects.all().delete()
+    migration = import_module(
+        "news_aggregator.feed_service.migrations.0020_usertimelineentry"
+    )
+
+    migration.build_timelines(apps, None)
+
+    assert UserTimelineEntry.objects.count() == 2
+    assert timeline_of(subscription.user)[entries[0].pk].summary == "Mine"
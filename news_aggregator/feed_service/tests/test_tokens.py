@@ -0,0 +1,51 @@
+from news_aggregator.feed_service.tokens import count_tokens
+from news_aggregator.feed_service.tokens import prepare_content
+from news_aggregator.feed_service.tokens import strip_boilerplate
+
+MODEL = "gpt-4o"
+
+
+def test_strip_boilerplate_drops_chrome_and_repeated_lines():
+    text = """Advertisement
+The council approved the new budget on Monday.
+
+Share this article
+Subscribe to our newsletter for daily updates
+The council approved the new budget on Monday.
+   Spending   on schools rises by 4%.
+Read more: Council elections
+© 2025 Example News. All rights reserved."""
+
+    assert strip_boilerplate(text) == (
+        "The council approved the new budget on Monday.\n\n"
+        "Spending on schools rises by 4%."
+    )
+
+
+def test_prepare_content_keeps_whole_paragraphs_within_budget():
+    paragraphs = [
+        f"Paragraph {n}: " + " ".join(["lorem ipsum"] * 20) for n in range(10)
+    ]
+    text = "\n\n".join(paragraphs)
+    budget = count_tokens(paragraphs[0], MODEL) * 3
+
+    prepared = prepare_content(text, budget, MODEL)
+
+    assert prepared.truncated
+    assert prepared.tokens <= budget
+    assert prepared.text.startswith(paragraphs[0])
+    assert prepared.text.split("\n\n") == paragraphs[: len(prepared.text.split("\n\n"))]
+
+
+def test_prepare_content_cuts_a_single_oversized_paragraph():
+    prepared = prepare_content("word " * 1000, 20, MODEL)
+
+    assert prepared.truncated
+    assert 0 < prepared.tokens <= 20
+
+
+def test_prepare_content_leaves_short_content_alone():
+    prepared = prepare_content("A short article.", 100, MODEL)
+
+    assert prepared.text == "A short article."
+    assert not prepared.truncated
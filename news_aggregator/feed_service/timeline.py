@@ -0,0 +1,192 @@
+"""
+Per-user home timelines, written ahead of time ("fan-out on write").
+
+Every user has a UserTimelineEntry row for each entry of the feeds they are
+subscribed to, holding what the home page shows of it, so a page of the home
+page is a single range scan of timeline_stream_idx. Rows are added when
+entries are ingested and when the user subscribes, updated when entries and
+interactions are analyzed, and deleted when the user unsubscribes.
+
+Rows also carry the rank_score of the user's top stories, which only changes
+when an analysis lands, so ranking a timeline is a range scan of
+timeline_rank_idx as well.
+"""
+
+import logging
+import math
+from collections.abc import Iterable
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.utils.text import Truncator
+
+from news_aggregator.feed_service.models import FeedEntry
+from news_aggregator.feed_service.models import UserArticleInteraction
+from news_aggregator.feed_service.models import UserFeedSubscription
+from news_aggregator.feed_service.models import UserTimelineEntry
+
+logger = logging.getLogger(__name__)
+
+# Length of the content shown for entries without a summary
+SNIPPET_WORDS = 50
+BATCH_SIZE = 1000
+
+# Fields an interaction changes, see update_interactions
+INTERACTION_FIELDS = ["title", "summary", "relevance_score", "rank_score"]
+
+
+def rank_score(relevance_score: int, published_at: datetime) -> float:
+    """
+    Score of an entry in the top stories: its relevance, halved every
+    HOME_TOP_STORIES_HALF_LIFE hours since it was published.
+    The score is stored as log2(relevance * 2 ** (published_at / half-life)),
+    which orders entries the same way at any later time, so stored scores
+    never have to be decayed.
+    """
+    half_life = settings.HOME_TOP_STORIES_HALF_LIFE * 3600
+    return math.log2(relevance_score + 1) + published_at.timestamp() / half_life
+
+
+def timeline_entry(
+    user_id: int,
+    entry: FeedEntry,
+    interaction: UserArticleInteraction | None = None,
+) -> UserTimelineEntry:
+    """Build the unsaved timeline row of an entry for a user."""
+    title = (
+        (interaction and interaction.translated_title)
+        or entry.translated_title
+        or entry.title
+    )
+    summary = (
+        (interaction and interaction.custom_summary)
+        or entry.summary
+        or Truncator(entry.full_content).words(SNIPPET_WORDS)
+    )
+    relevance_score = interaction.relevance_score if interaction else 0
+    return UserTimelineEntry(
+        user_id=user_id,
+        entry_id=entry.pk,
+        feed_id=entry.feed_id,
+        published_at=entry.published_at,
+        title=title[: UserTimelineEntry._meta.get_field("title").max_length],
+        url=entry.url,
+        summary=summary,
+        relevance_score=relevance_score,
+        rank_score=rank_score(relevance_score, entry.published_at),
+    )
+
+
+def fan_out(entries: Iterable[FeedEntry]) -> int:
+    """
+    Add new entries to the timelines of the active subscribers of their feeds.
+    Returns the number of rows written.
+    """
+    entries = list(entries)
+    if not entries:
+        return 0
+
+    subscribers: dict[int, list[int]] = {}
+    subscriptions = UserFeedSubscription.objects.filter(
+        feed__in={entry.feed_id for entry in entries}, is_active=True
+    ).values_list("feed_id", "user_id")
+    for feed_id, user_id in subscriptions:
+        subscribers.setdefault(feed_id, []).append(user_id)
+
+    rows = [
+        timeline_entry(user_id, entry)
+        for entry in entries
+        for user_id in subscribers.get(entry.feed_id, [])
+    ]
+    UserTimelineEntry.objects.bulk_create(
+        rows, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    return len(rows)
+
+
+def add_feed(user_id: int, feed_id: int) -> int:
+    """
+    Add all entries of a feed to a user's timeline, with the user's existing
+    interactions. Returns the number of rows written.
+    """
+    interactions = {
+        interaction.entry_id: interaction
+        for interaction in UserArticleInteraction.objects.filter(
+            user_id=user_id, entry__feed_id=feed_id
+        )
+    }
+    entries = FeedEntry.objects.filter(feed_id=feed_id).defer("embedding")
+
+    count = 0
+    rows = []
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        rows.append(timeline_entry(user_id, entry, interactions.get(entry.pk)))
+        if len(rows) >= BATCH_SIZE:
+            UserTimelineEntry.objects.bulk_create(rows, ignore_conflicts=True)
+            count += len(rows)
+            rows = []
+    UserTimelineEntry.objects.bulk_create(rows, ignore_conflicts=True)
+    count += len(rows)
+    logger.debug(f"Added {count} entries of feed {feed_id} to user {user_id}")
+    return count
+
+
+def remove_feed(user_id: int, feed_id: int) -> int:
+    """Remove the entries of a feed from a user's timeline. Returns the number of rows deleted."""
+    deleted, _ = UserTimelineEntry.objects.filter(
+        user_id=user_id, feed_id=feed_id
+    ).delete()
+    return deleted
+
+
+def update_interactions(interactions: list[UserArticleInteraction]) -> int:
+    """
+    Write the results of reader analyses to the timelines of their users.
+    Users who are no longer subscribed to the entry's feed are left out.
+    Returns the number of rows written.
+    """
+    if not interactions:
+        return 0
+
+    entries = FeedEntry.objects.defer("embedding").in_bulk(
+        {interaction.entry_id for interaction in interactions}
+    )
+    subscribed = set(
+        UserFeedSubscription.objects.filter(
+            user__in={interaction.user_id for interaction in interactions},
+            feed__in={entry.feed_id for entry in entries.values()},
+            is_active=True,
+        ).values_list("user_id", "feed_id")
+    )
+
+    rows = []
+    for interaction in interactions:
+        entry = entries.get(interaction.entry_id)
+        if entry and (interaction.user_id, entry.feed_id) in subscribed:
+            rows.append(timeline_entry(interaction.user_id, entry, interaction))
+    # Rows missing from the timeline are added on the way
+    UserTimelineEntry.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["user", "entry"],
+        update_fields=INTERACTION_FIELDS,
+    )
+    return len(rows)
+
+
+def update_entry(entry: FeedEntry) -> int:
+    """
+    Show the general translated title and summary of an entry to the users
+    who have no analysis of their own yet. Returns the number of rows updated.
+    """
+    rows = UserTimelineEntry.objects.filter(entry=entry).filter(
+        ~Exists(
+            UserArticleInteraction.objects.filter(
+                user_id=OuterRef("user_id"), entry_id=OuterRef("entry_id")
+            )
+        )
+    )
+    row = timeline_entry(0, entry)
+    return rows.update(title=row.title, summary=row.summary)
@@ -0,0 +1,121 @@
+"""
+Token counting and article content preparation for LLM prompts.
+
+Tokens are counted locally with tiktoken. When the encoding of a model can't
+be loaded (unknown model, or no network to download the encoding on first
+use), counts fall back to an estimate of four characters per token.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Lines matching these are navigation, sharing and subscription chrome that
+# newspaper sometimes keeps in the extracted text
+BOILERPLATE_PATTERNS = re.compile(
+    r"^("
+    r"advertisement|sponsored( content)?|"
+    r"(share|tweet|email|print)( this( article| story)?)?( on \w+)?|"
+    r"(read|see) (more|also|next)\b.*|related (articles|stories|posts)\b.*|"
+    r"(sign up|subscribe)\b.*(newsletter|updates|inbox).*|"
+    r"follow us\b.*|click here\b.*|"
+    r".*\b(cookies?|cookie policy|privacy policy)\b.*\b(accept|agree|use|consent)\b.*|"
+    r"(copyright|©).*|.*all rights reserved\.?"
+    r")$",
+    re.IGNORECASE,
+)
+# Boilerplate lines are short, longer lines are kept even when they match
+MAX_BOILERPLATE_LINE_LENGTH = 200
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> tiktoken.Encoding | None:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning(
+            f"No tiktoken encoding for {model}, estimating token counts: {str(e)}"
+        )
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut text down to its first max_tokens tokens."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[:max_tokens]) if len(tokens) > max_tokens else text
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop boilerplate and repeated lines and collapse whitespace."""
+    seen = set()
+    paragraphs = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line or line in seen:
+            continue
+        if len(line) <= MAX_BOILERPLATE_LINE_LENGTH and BOILERPLATE_PATTERNS.match(
+            line
+        ):
+            continue
+        seen.add(line)
+        paragraphs.append(line)
+    return "\n\n".join(paragraphs)
+
+
+@dataclass
+class PreparedContent:
+    """Article content ready to be put into a prompt"""
+
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+def prepare_content(text: str, max_tokens: int, model: str) -> PreparedContent:
+    """
+    Strip boilerplate and trim the content to max_tokens tokens.
+    Whole paragraphs are kept from the start of the article, which carries
+    most of the information in news writing; a single paragraph longer than
+    the remaining budget is cut mid-paragraph.
+    """
+    original_tokens = count_tokens(text, model)
+    text = strip_boilerplate(text)
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return PreparedContent(text, original_tokens, tokens)
+
+    kept: list[str] = []
+    budget = max_tokens
+    for paragraph in text.split("\n\n"):
+        # The paragraph separator costs about one token
+        paragraph_tokens = count_tokens(paragraph, model) + 1
+        if paragraph_tokens > budget:
+            if not kept:
+                kept.append(truncate_to_tokens(paragraph, budget, model))
+            break
+        kept.append(paragraph)
+        budget -= paragraph_tokens
+
+    text = "\n\n".join(kept)
+    return PreparedContent(text, original_tokens, count_tokens(text, model))
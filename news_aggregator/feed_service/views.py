@@ -10,6 +10,7 @@ from django.shortcuts import redirect
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from . import timeline
 from .forms import AddFeedForm
 from .models import Feed
 from .models import UserFeedSubscription
@@ -76,6 +77,7 @@ def handle_feed_subscription(request, url, is_rss=True):
             feed = FeedService.create_feed_from_url(url, is_rss=is_rss)
 
         UserFeedSubscription.objects.create(user=request.user, feed=feed)
+        timeline.add_feed(request.user.pk, feed.pk)
         messages.success(request, "Successfully subscribed to feed")
         return redirect("dashboard:feed_list")
 